@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+CLI untuk membuat proposal PDF secara massal dari file CSV atau Parquet.
+
+Setiap baris berisi field yang sama dengan sidebar aplikasi Streamlit
+(cs_staff, avg_monthly_salary, automation_rate, dst.) ditambah data
+administrasi (prospect_name, prospect_location, agent_name, agent_email,
+agent_phone, proposal_number opsional). File dibaca per potongan (chunk),
+ROI dihitung secara vektor per potongan, lalu grafik dan PDF dirender paralel
+di ProcessPoolExecutor. Input dan hasil setiap baris disimpan ke
+scenario_store (kecuali --no-store).
+
+Contoh:
+    python batch_proposals.py prospek.csv --output-dir proposals/
+    python batch_proposals.py prospek.csv --zip proposals.zip
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from roi_engine import (
+    INPUT_FIELDS, DEFAULT_INPUTS, DEFAULT_RAMP_CURVE, OPTION_FIELDS, PROJECTION_YEARS, compute_roi, result_row,
+)
+from roi_cashflow import CASHFLOW_DEFAULTS
+from proposal_pdf import build_pdf_data, render_pdf, pdf_filename
+from roi_charts import PDF_DPI, PDF_FORMAT, render_roi_chart, chart_data_uri
+from scenario_store import get_scenario_store
+from proposal_numbers import day_prefix, get_proposal_number_allocator
+from warmup import warm_up
+
+ADMIN_FIELDS = ("proposal_number", "prospect_name", "prospect_location", "agent_name", "agent_email", "agent_phone")
+# Opsi yang berlaku per panggilan compute_roi: baris dikelompokkan per kombinasi nilainya
+GROUP_DEFAULTS = {"horizon_years": PROJECTION_YEARS, "ramp_curve": DEFAULT_RAMP_CURVE}
+
+# --- Pembacaan Input (streaming) ---
+def iter_input_chunks(path, chunk_size):
+    """Membaca CSV/Parquet per potongan DataFrame agar memori tetap datar pada file besar.
+    `path` boleh berupa file object bernama (mis. file upload Streamlit).
+    """
+    ext = os.path.splitext(getattr(path, "name", path))[1].lower()
+    if ext in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Input Parquet membutuhkan paket 'pyarrow' (pip install pyarrow).")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+def _cell(chunk, field, i, default=""):
+    """Mengambil satu nilai teks dari DataFrame potongan; kosong/NaN diganti default."""
+    if field not in chunk.columns:
+        return default
+    value = chunk[field].iat[i]
+    if value is None or value != value:
+        return default
+    return str(value)
+
+def _row_inputs(chunk, i):
+    """Input ROI satu baris sebagai skalar Python (untuk tabel asumsi di PDF)."""
+    inputs = {}
+    for field in INPUT_FIELDS:
+        value = chunk[field].iat[i] if field in chunk.columns else DEFAULT_INPUTS[field]
+        inputs[field] = value.item() if hasattr(value, "item") else value
+    # Kolom arus kas opsional (per baris, termasuk horizon_years & ramp_curve)
+    for field in OPTION_FIELDS:
+        if field in chunk.columns:
+            value = chunk[field].iat[i]
+            inputs[field] = value.item() if hasattr(value, "item") else value
+    return inputs
+
+def iter_proposals(input_path, chunk_size=500, defaults=None, start_number=None, stats=None, store=None):
+    """Membaca skenario prospek dan menghitung ROI per potongan secara vektor.
+    Yield (pdf_data, roi, filename) per baris; waktu kalkulasi ditambahkan ke stats["compute_seconds"].
+    Baris tanpa proposal_number mendapat nomor dari counter harian bersama aplikasi
+    (satu blok per potongan), kecuali `start_number` diberikan secara eksplisit.
+    Jika `store` (scenario_store.ScenarioStore) diberikan, setiap potongan disimpan dalam satu transaksi.
+    """
+    defaults = defaults or {}
+    date_prefix = day_prefix()
+    analysis_date = datetime.now().strftime("%d %B %Y")
+    sequence = start_number
+    for chunk in iter_input_chunks(input_path, chunk_size):
+        # Sel numerik kosong dan kolom yang tidak ada memakai nilai default sidebar. Kolom yang hilang
+        # ditambahkan agar compute_roi selalu berjalan dalam mode array (hasil per baris), walau file
+        # hanya berisi kolom admin.
+        numeric_defaults = {**DEFAULT_INPUTS, **CASHFLOW_DEFAULTS}
+        chunk = chunk.fillna({field: value for field, value in {**numeric_defaults, **GROUP_DEFAULTS}.items()
+                              if field in chunk.columns})
+        chunk = chunk.assign(**{field: value for field, value in numeric_defaults.items() if field not in chunk.columns})
+        if "horizon_years" in chunk.columns:
+            chunk["horizon_years"] = chunk["horizon_years"].astype(int)
+        started = time.perf_counter()
+        # Satu compute_roi per kombinasi horizon/kurva ramp-up; hasil per baris = (hasil kelompok, posisi)
+        group_columns = [field for field in GROUP_DEFAULTS if field in chunk.columns]
+        groups = chunk.groupby(group_columns, sort=False).indices.values() if group_columns else [range(len(chunk))]
+        row_results = [None] * len(chunk)
+        for positions in groups:
+            results = compute_roi(chunk.iloc[positions])
+            for j, i in enumerate(positions):
+                row_results[i] = (results, j)
+        if stats is not None:
+            stats["compute_seconds"] = stats.get("compute_seconds", 0.0) + time.perf_counter() - started
+
+        admins = [{field: _cell(chunk, field, i, defaults.get(field, "")) for field in ADMIN_FIELDS}
+                  for i in range(len(chunk))]
+        missing = [admin for admin in admins if not admin["proposal_number"]]
+        if sequence is None:
+            # Blok dari allocator yang sama dengan proposal interaktif: nomor tidak pernah dobel
+            numbers = get_proposal_number_allocator().allocate_block(len(missing))
+        else:
+            numbers = [f"{date_prefix}{n:03d}" for n in range(sequence, sequence + len(missing))]
+            sequence += len(missing)
+        for admin, number in zip(missing, numbers):
+            admin["proposal_number"] = number
+
+        rows = []
+        for i, admin in enumerate(admins):
+            if not admin["prospect_name"]:
+                admin["prospect_name"] = "Prospek Tanpa Nama"
+            admin["analysis_date"] = analysis_date
+            roi = result_row(*row_results[i])
+            roi_inputs = _row_inputs(chunk, i)
+            rows.append((admin, roi_inputs, roi))
+        if store is not None:
+            saved = store.save_many(rows, source="batch")
+            if stats is not None:
+                stats["store_skipped"] = stats.get("store_skipped", 0) + len(rows) - saved
+        for admin, roi_inputs, roi in rows:
+            pdf_data = build_pdf_data(admin, roi_inputs, roi)
+            yield pdf_data, roi, pdf_filename(admin["proposal_number"], admin["prospect_name"], admin["prospect_location"])
+
+# --- Worker ---
+def render_proposal_bytes(pdf_data, roi, chart_dpi, chart_format="png"):
+    """Dijalankan di proses worker: render grafik + PDF. Return (durasi grafik, durasi PDF, pdf_bytes)."""
+    started = time.perf_counter()
+    chart_bytes = render_roi_chart(roi, dpi=chart_dpi, fmt=chart_format)
+    pdf_data["chart_path"] = chart_data_uri(chart_bytes, chart_format)
+    chart_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pdf_bytes = render_pdf(pdf_data)
+    return chart_seconds, time.perf_counter() - started, pdf_bytes
+
+def render_proposal(pdf_data, roi, output_path, chart_dpi, chart_format="png"):
+    """Dijalankan di proses worker: render grafik + PDF, tulis ke disk, kembalikan durasi per tahap."""
+    chart_seconds, pdf_seconds, pdf_bytes = render_proposal_bytes(pdf_data, roi, chart_dpi, chart_format)
+    started = time.perf_counter()
+    with open(output_path, "wb") as f:
+        f.write(pdf_bytes)
+    return chart_seconds, pdf_seconds + time.perf_counter() - started, len(pdf_bytes)
+
+# --- Orkestrasi ---
+def run_batch(input_path, output_dir, workers=None, chunk_size=500, chart_dpi=PDF_DPI,
+              chart_format=PDF_FORMAT, defaults=None, start_number=None, store=None):
+    """Memproses seluruh file input dan mengembalikan statistik per tahap."""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    stats = {"rows": 0, "done": 0, "failed": 0, "compute_seconds": 0.0,
+             "chart_seconds": 0.0, "pdf_seconds": 0.0, "pdf_bytes": 0}
+    wall_started = time.perf_counter()
+
+    def collect(done_futures):
+        for future in done_futures:
+            try:
+                chart_seconds, pdf_seconds, size = future.result()
+                stats["chart_seconds"] += chart_seconds
+                stats["pdf_seconds"] += pdf_seconds
+                stats["pdf_bytes"] += size
+                stats["done"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"Gagal membuat proposal {pending[future]}: {e}", file=sys.stderr)
+            del pending[future]
+
+    pending = {}
+    # Worker memuat WeasyPrint/matplotlib saat start agar waktu per tahap tidak memuat biaya import
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as pool:
+        for pdf_data, roi, filename in iter_proposals(input_path, chunk_size, defaults, start_number, stats, store):
+            output_path = os.path.join(output_dir, filename)
+            # Back-pressure: batasi jumlah job yang menunggu agar memori tetap datar
+            while len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(render_proposal, pdf_data, roi, output_path, chart_dpi, chart_format)
+            pending[future] = filename
+            stats["rows"] += 1
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    stats["wall_seconds"] = time.perf_counter() - wall_started
+    stats["workers"] = workers
+    return stats
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+def format_report(stats):
+    """Laporan throughput per tahap (proposal/detik)."""
+    lines = [
+        f"Proposal: {stats['done']} berhasil, {stats['failed']} gagal dari {stats['rows']} baris ({stats['workers']} worker)",
+        f"Kalkulasi ROI : {_rate(stats['rows'], stats['compute_seconds']):,.1f} proposal/detik ({stats['compute_seconds']:.3f} d)",
+        f"Grafik        : {_rate(stats['done'], stats['chart_seconds']):,.2f} proposal/detik per worker ({stats['chart_seconds']:.1f} d total)",
+        f"PDF           : {_rate(stats['done'], stats['pdf_seconds']):,.2f} proposal/detik per worker ({stats['pdf_seconds']:.1f} d total)",
+        f"Keseluruhan   : {_rate(stats['done'], stats['wall_seconds']):,.2f} proposal/detik ({stats['wall_seconds']:.1f} d wall clock, {stats['pdf_bytes'] / 1e6:,.1f} MB PDF)",
+    ]
+    if stats.get("store_skipped"):
+        lines.append(f"Skenario      : {stats['store_skipped']} baris tidak disimpan (nomor proposal sudah dipakai)")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat proposal PDF ROI AI Voice secara massal dari CSV/Parquet.")
+    parser.add_argument("input", help="File CSV atau Parquet berisi data prospek")
+    parser.add_argument("--output-dir", default="proposals", help="Folder tujuan PDF (default: proposals)")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses worker (default: jumlah core)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Jumlah baris per potongan baca (default: 500)")
+    parser.add_argument("--chart-dpi", type=int, default=PDF_DPI, help=f"DPI grafik di PDF (default: {PDF_DPI})")
+    parser.add_argument("--chart-format", choices=("png", "svg"), default=PDF_FORMAT, help=f"Format grafik di PDF (default: {PDF_FORMAT})")
+    parser.add_argument("--start-number", type=int, default=None,
+                        help="Nomor urut awal untuk baris tanpa proposal_number (default: counter harian bersama aplikasi)")
+    parser.add_argument("--agent-name", default="", help="Nama konsultan default")
+    parser.add_argument("--agent-email", default="", help="Email konsultan default")
+    parser.add_argument("--agent-phone", default="", help="No. HP/WA konsultan default")
+    parser.add_argument("--zip", help="Tulis semua PDF ke satu arsip ZIP (bersama daftar_proposal.csv) alih-alih ke --output-dir")
+    parser.add_argument("--no-store", action="store_true", help="Jangan simpan skenario ke penyimpanan skenario lokal")
+    args = parser.parse_args(argv)
+    store = None if args.no_store else get_scenario_store()
+
+    defaults = {"agent_name": args.agent_name, "agent_email": args.agent_email, "agent_phone": args.agent_phone}
+    if args.zip:
+        from proposal_export import export_zip
+
+        proposals = iter_proposals(args.input, args.chunk_size, defaults, args.start_number, store=store)
+        with open(args.zip, "wb") as f:
+            _, stats = export_zip(proposals, workers=args.workers or os.cpu_count() or 1, chart_dpi=args.chart_dpi,
+                                  chart_format=args.chart_format, target=f)
+        for error in stats["errors"]:
+            print(f"Gagal membuat proposal {error}", file=sys.stderr)
+        print(f"Arsip {args.zip}: {stats['done']} berhasil, {stats['failed']} gagal dari {stats['rows']} baris "
+              f"({stats['zip_bytes'] / 1e6:,.1f} MB, {stats['wall_seconds']:.1f} d)")
+        return 0 if stats["failed"] == 0 else 1
+    stats = run_batch(args.input, args.output_dir, workers=args.workers, chunk_size=args.chunk_size,
+                      chart_dpi=args.chart_dpi, chart_format=args.chart_format, defaults=defaults, start_number=args.start_number,
+                      store=store)
+    print(format_report(stats))
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
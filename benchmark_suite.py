@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark per tahap pembuatan proposal dengan input representatif yang tetap:
+kalkulasi ROI (skalar, batch & arus kas 120 bulan), format angka 1 juta nilai (per nilai dan
+vektor), grafik di
+setiap DPI, PDF end-to-end, serta upload Drive / log Sheets / nomor proposal
+terhadap tiruan in-process (google_fakes). Setiap tahap dijalankan di proses
+baru agar peak RSS terukur per tahap. Hasil (p50/p95 latensi, peak RSS)
+dapat disimpan sebagai baseline JSON dan dibandingkan pada run berikutnya;
+skrip keluar dengan kode 1 jika ada regresi melebihi ambang.
+
+Contoh:
+    python benchmark_suite.py --save-baseline data/benchmark_baseline.json
+    python benchmark_suite.py --baseline data/benchmark_baseline.json --threshold 0.25
+    python benchmark_suite.py --only roi_scalar roi_batch
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import functools
+import subprocess
+
+import numpy as np
+
+# --- Konfigurasi ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THRESHOLD = float(os.environ.get("ROI_BENCH_THRESHOLD", "0.2"))
+BATCH_SIZE = 10_000
+CASHFLOW_SCENARIOS = 1_000  # Skenario x 120 bulan (horizon 10 tahun, ramp-up, inflasi gaji & kurs bervariasi)
+FORMAT_VOLUME = 1_000_000
+SEED = 42
+# Selisih absolut minimum agar derau pada tahap mikrodetik tidak dihitung sebagai regresi
+MIN_DELTA = {"p50_ms": 0.05, "p95_ms": 0.1, "peak_rss_mb": 5.0}
+
+SAMPLE_ADMIN = {
+    "proposal_number": "PROP-250101-001",
+    "analysis_date": "01 January 2025",
+    "prospect_name": "PT Contoh Broker",
+    "prospect_location": "Jakarta",
+    "agent_name": "Konsultan Benchmark",
+    "agent_email": "benchmark@example.com",
+    "agent_phone": "08123456789",
+}
+
+
+# --- Tahap benchmark: setiap fungsi menyiapkan data lalu mengembalikan (callable, iterasi) ---
+def _roi_scalar():
+    from roi_engine import DEFAULT_INPUTS, compute_roi
+    return functools.partial(compute_roi, DEFAULT_INPUTS), 2000
+
+def _roi_batch():
+    from roi_engine import DEFAULT_INPUTS, INPUT_FIELDS, compute_roi
+    rng = np.random.default_rng(SEED)
+    inputs = {f: np.full(BATCH_SIZE, float(DEFAULT_INPUTS[f])) * rng.uniform(0.8, 1.2, BATCH_SIZE) for f in INPUT_FIELDS}
+    return functools.partial(compute_roi, inputs), 50
+
+def _roi_cashflow():
+    from roi_engine import DEFAULT_INPUTS, INPUT_FIELDS, compute_roi
+    rng = np.random.default_rng(SEED)
+    inputs = {f: np.full(CASHFLOW_SCENARIOS, float(DEFAULT_INPUTS[f])) * rng.uniform(0.8, 1.2, CASHFLOW_SCENARIOS) for f in INPUT_FIELDS}
+    inputs.update({
+        "ramp_up_months": rng.uniform(0, 12, CASHFLOW_SCENARIOS),
+        "salary_inflation": rng.uniform(0, 8, CASHFLOW_SCENARIOS),
+        "fx_drift": rng.uniform(-2, 5, CASHFLOW_SCENARIOS),
+        "horizon_years": 10,
+        "ramp_curve": "s_curve",
+    })
+    return functools.partial(compute_roi, inputs), 50
+
+def _format_numbers():
+    from number_format import format_number_id
+    values = np.random.default_rng(SEED).uniform(-1e9, 1e9, FORMAT_VOLUME).tolist()
+
+    def run():
+        for value in values:
+            format_number_id(value)
+    return run, 3
+
+def _format_array():
+    from number_format import format_array_id
+    values = np.random.default_rng(SEED).uniform(-1e9, 1e9, FORMAT_VOLUME)
+    return functools.partial(format_array_id, values), 3
+
+def _chart(dpi, fmt="png"):
+    from roi_engine import DEFAULT_INPUTS, compute_roi
+    from roi_charts import render_roi_chart
+    roi = compute_roi(DEFAULT_INPUTS)
+    return functools.partial(render_roi_chart, roi, dpi=dpi, fmt=fmt), 10
+
+def _pdf():
+    from roi_engine import DEFAULT_INPUTS, compute_roi
+    from roi_charts import PDF_DPI, PDF_FORMAT, render_roi_chart, chart_data_uri
+    from proposal_pdf import build_pdf_data, render_pdf
+    roi = compute_roi(DEFAULT_INPUTS)
+    chart_uri = chart_data_uri(render_roi_chart(roi, dpi=PDF_DPI, fmt=PDF_FORMAT), PDF_FORMAT)
+
+    def run():
+        # Tanpa cache proposal: mengukur render Jinja2 + WeasyPrint sungguhan
+        return render_pdf(build_pdf_data(SAMPLE_ADMIN, DEFAULT_INPUTS, roi, chart_uri))
+    return run, 5
+
+def _upload_to_drive():
+    from google_fakes import FakeDriveService
+    from google_services import find_or_create_folder, upload_to_drive
+    service = FakeDriveService()
+    pdf_bytes = b"%PDF-1.7\n" + os.urandom(200 * 1024)
+
+    def run():
+        folder_id = find_or_create_folder(service, SAMPLE_ADMIN["prospect_name"], "benchmark-parent")
+        return upload_to_drive(service, pdf_bytes, "benchmark.pdf", folder_id)
+    return run, 200
+
+def _log_to_gsheet():
+    from google_fakes import FakeSheetsService
+    from google_services import log_to_gsheet
+    service = FakeSheetsService()
+    return functools.partial(log_to_gsheet, service, "benchmark-sheet", SAMPLE_ADMIN), 500
+
+def _proposal_number():
+    from google_fakes import FakeSheetsService
+    from proposal_numbers import ProposalNumberAllocator, highest_logged_number
+    service = FakeSheetsService()
+    # Sheet log berisi 5.000 baris lama agar sinkronisasi awal hari tidak trivial
+    service.rows.extend([["2025-01-01 00:00:00", f"PROP-250101-{i:03d}"] for i in range(1, 5001)])
+    allocator = ProposalNumberAllocator(os.path.join(tempfile.mkdtemp(prefix="roi_bench_"), "counter.sqlite3"))
+    seed = functools.partial(highest_logged_number, service, "benchmark-sheet")
+    return functools.partial(allocator.allocate, seed=seed), 200
+
+
+def _stages():
+    from roi_charts import SCREEN_DPI, PDF_DPI
+    return {
+        "roi_scalar": _roi_scalar,
+        "roi_batch": _roi_batch,
+        "roi_cashflow_120m": _roi_cashflow,
+        "format_number_id": _format_numbers,
+        "format_array_id": _format_array,
+        f"chart_png_dpi{SCREEN_DPI}": functools.partial(_chart, SCREEN_DPI),
+        f"chart_png_dpi{PDF_DPI}": functools.partial(_chart, PDF_DPI),
+        "chart_svg": functools.partial(_chart, PDF_DPI, "svg"),
+        "pdf_end_to_end": _pdf,
+        "upload_to_drive_fake": _upload_to_drive,
+        "log_to_gsheet_fake": _log_to_gsheet,
+        "proposal_number_fake": _proposal_number,
+    }
+
+
+def run_stage(name, iterations=None, warmup=2):
+    """Menjalankan satu tahap di proses ini. Return dict p50_ms, p95_ms, mean_ms, iterations, peak_rss_mb."""
+    func, default_iterations = _stages()[name]()
+    iterations = iterations or default_iterations
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations = np.asarray(durations)
+    return {
+        "p50_ms": float(np.percentile(durations, 50)),
+        "p95_ms": float(np.percentile(durations, 95)),
+        "mean_ms": float(durations.mean()),
+        "iterations": iterations,
+        # ru_maxrss dalam KB di Linux (byte di macOS)
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def run_stage_subprocess(name, iterations=None):
+    """Menjalankan tahap di proses Python baru (peak RSS terpisah per tahap)."""
+    command = [sys.executable, os.path.abspath(__file__), "--run-stage", name]
+    if iterations:
+        command += ["--iterations", str(iterations)]
+    completed = subprocess.run(command, cwd=SCRIPT_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "gagal"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """Daftar regresi: p50/p95/peak RSS yang naik lebih dari `threshold` (rasio) dan MIN_DELTA dibanding baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result or "error" in base:
+            continue
+        for metric, min_delta in MIN_DELTA.items():
+            if base[metric] > 0 and result[metric] - base[metric] > max(base[metric] * threshold, min_delta):
+                regressions.append(f"{name}.{metric}: {result[metric]:.2f} vs baseline {base[metric]:.2f} (+{(result[metric] / base[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def format_report(results):
+    lines = [f"{'tahap':<24}{'p50 (ms)':>12}{'p95 (ms)':>12}{'peak RSS (MB)':>15}{'iterasi':>9}"]
+    for name, result in results.items():
+        if "error" in result:
+            lines.append(f"{name:<24}  GAGAL: {result['error']}")
+        else:
+            lines.append(f"{name:<24}{result['p50_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['peak_rss_mb']:>15.1f}{result['iterations']:>9}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per tahap pembuatan proposal ROI.")
+    parser.add_argument("--only", nargs="+", help="Hanya jalankan tahap tertentu.")
+    parser.add_argument("--iterations", type=int, help="Override jumlah iterasi semua tahap.")
+    parser.add_argument("--baseline", help="File baseline JSON untuk deteksi regresi.")
+    parser.add_argument("--save-baseline", help="Simpan hasil sebagai baseline JSON.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Ambang regresi (rasio, mis. 0.2 = 20%%).")
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.iterations)))
+        return 0
+
+    names = args.only or list(_stages())
+    unknown = [name for name in names if name not in _stages()]
+    if unknown:
+        parser.error(f"Tahap tidak dikenal: {', '.join(unknown)}")
+    results = {}
+    for name in names:
+        print(f"Menjalankan {name}...", file=sys.stderr)
+        results[name] = run_stage_subprocess(name, args.iterations)
+    print(format_report(results))
+
+    failed = any("error" in result for result in results.values())
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline disimpan ke {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nGAGAL: regresi melebihi {args.threshold * 100:.0f}%:")
+            print("\n".join(f"  {line}" for line in regressions))
+            failed = True
+        else:
+            print(f"\nOK: tidak ada regresi melebihi {args.threshold * 100:.0f}% dibanding baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
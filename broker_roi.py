@@ -7,76 +7,113 @@ dan nomor proposal otomatis. Versi final dengan UX disempurnakan untuk marketing
 Versi ini menambahkan debugging detail untuk Google Sheets dan memperbaiki syntax error.
 """
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import os
 from datetime import datetime
 import locale # Tetap import untuk jaga-jaga jika ada penggunaan lain, tapi format utama manual
 import io
 import base64
 import json
-import toml # Untuk membaca secrets jika dalam format dict/toml
-from weasyprint import HTML
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-
-# Import Google API libraries
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from googleapiclient.errors import HttpError
+import functools
+
+# Import modul lokal
+from roi_engine import PROJECTION_YEARS, compute_roi
+from roi_cashflow import CASHFLOW_DEFAULTS, IRR_DISPLAY_MAX, MAX_HORIZON_YEARS, RAMP_CURVES
+from roi_simulation import DEFAULT_DRAWS, DEFAULT_RANGES, simulate_roi, summary_rows
+from roi_sensitivity import DEFAULT_PERTURBATION_PCT, SENSITIVITY_METRICS, compute_sensitivity
+from number_format import format_number_id
+from proposal_pdf import RAMP_CURVE_LABELS, safe_name, pdf_filename, build_conclusion_text, build_pdf_data
+from roi_charts import SCREEN_DPI, PDF_DPI, PDF_FORMAT, chart_data_uri
+from proposal_cache import cache_key, render_chart_cached, render_fan_chart_cached, render_tornado_chart_cached, render_pdf_cached
+from google_services import REQUIRED_CREDENTIAL_KEYS, decode_credentials_b64, parse_credentials_json, credentials_key, build_drive_service, build_sheets_service
+from cloud_queue import get_cloud_queue
+from sheet_log_buffer import get_sheet_log_buffer
+from proposal_numbers import get_proposal_number_allocator, highest_logged_number, fallback_number
+from warmup import start_background_warmup
+from metrics import ProposalTrace, get_metrics, timed, start_metrics_server
+from batch_proposals import iter_proposals
+from proposal_export import ZIP_MIME_TYPE, export_zip, read_archive, upload_archive
+from scenario_store import GROUP_BY, get_scenario_store
+from render_pool import POOL_ENABLED, RenderQueueFull, get_render_pool
 
 # --- Konfigurasi Halaman Streamlit (Harus menjadi perintah st pertama) ---
 st.set_page_config(layout="wide", page_title="Kalkulator ROI AI Voice Broker")
 
-# --- Konfigurasi Awal Lainnya ---
-PROVIDER_COMPANY_NAME = "MEDIA AI SOLUSI, group of PT. EKUITAS MEDIA INVESTAMA"
-LOG_SHEET_NAME = "Log Proposal" # Nama sheet/tab di dalam Google Sheet
+PROPOSAL_BUTTON_LABEL = "📄 Buat Grafik & Proposal PDF"
+# Panel p50/p95 per tahap untuk admin (atau set show_metrics_panel = true di Secrets)
+METRICS_PANEL_ENABLED = os.environ.get("ROI_METRICS_PANEL") == "1"
+SCENARIO_DASHBOARD_ENABLED = os.environ.get("ROI_SCENARIO_DASHBOARD") == "1"
+
+# Simulasi di-cache per kombinasi input/rentang agar rerun tanpa perubahan tidak mengulang 100k draw
+cached_simulate_roi = st.cache_data(max_entries=16, show_spinner=False)(simulate_roi)
 
 # --- Fungsi Bantuan ---
-def format_number_id(value, precision=2):
-    """Format angka ke format Indonesia (manual, tanpa locale).
-    Memastikan titik sebagai pemisah ribuan dan koma sebagai desimal.
-    """
+def load_scenario(proposal_number):
+    """Callback tombol muat: input skenario tersimpan menjadi nilai awal widget sidebar."""
+    scenario = get_scenario_store().get(proposal_number)
+    if not scenario:
+        return
+    st.session_state["loaded_scenario"] = {
+        **scenario["inputs"],
+        "prospect_name": scenario["admin"]["prospect_name"],
+        "prospect_location": scenario["admin"]["prospect_location"],
+        "proposal_number": proposal_number,
+    }
+    # Key widget baru agar nilai skenario dipakai walaupun widget sudah diubah pengguna
+    st.session_state["scenario_generation"] = st.session_state.get("scenario_generation", 0) + 1
+
+def clear_loaded_scenario():
+    """Callback: kembali ke nilai default sidebar."""
+    st.session_state.pop("loaded_scenario", None)
+    st.session_state["scenario_generation"] = st.session_state.get("scenario_generation", 0) + 1
+
+def scenario_value(field, default, low=None, high=None):
+    """Nilai awal widget dari skenario yang dimuat (tipe sama dengan default, dibatasi low/high), atau default."""
+    value = st.session_state.get("loaded_scenario", {}).get(field, default)
     try:
-        if isinstance(value, (int, float)):
-            if value == float("inf") or value == float("-inf"):
-                return "N/A"
-            formatted_str = f"{value:,.{precision}f}"
-            parts = formatted_str.split(".")
-            int_part = parts[0]
-            dec_part = parts[1] if len(parts) > 1 else ""
-            int_part_swapped = int_part.replace(",", ".")
-            return f"{int_part_swapped},{dec_part}"
-        return str(value)
+        value = type(default)(value)
     except (TypeError, ValueError):
-        return str(value)
-
-def generate_pdf(data):
-    """Menghasilkan PDF dari data menggunakan template Jinja2 dan WeasyPrint."""
+        return default
+    if low is not None:
+        value = max(value, type(default)(low))
+    if high is not None:
+        value = min(value, type(default)(high))
+    return value
+
+def widget_key(field):
+    return f"{field}@{st.session_state.get('scenario_generation', 0)}"
+
+def current_session_id():
+    """ID sesi Streamlit (kunci antrean adil di pool render bersama)."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+def render_runner(status, trace=None, reservation=None):
+    """Fungsi `run` proposal_cache untuk mode multi-tenant: render di pool bersama, status antrean ditulis ke `status`.
+    `reservation` (RenderPool.reserve) menjamin job diterima walau antrean sudah penuh oleh sesi lain.
+    """
+    def progress(stats):
+        status.caption(f"⏳ Menunggu giliran render: {stats['queued']} job dalam antrean, "
+                       f"{stats['running']}/{stats['workers']} worker sibuk.")
+    return functools.partial(get_render_pool().run, current_session_id(), progress=progress, trace=trace,
+                             reservation=reservation)
+
+def generate_pdf(data, trace=None, run=None):
+    """Menghasilkan PDF dari data menggunakan template Jinja2 dan WeasyPrint (memakai cache jika input sama).
+    `run` (lihat render_runner) mengirim render ke pool bersama; default di thread skrip.
+    """
     try:
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-        except NameError:
-            script_dir = os.getcwd()
-        env = Environment(
-            loader=FileSystemLoader(script_dir),
-            autoescape=select_autoescape(["html"])
-        )
-        env.filters["format_number"] = format_number_id
-        template = env.get_template("template.html")
-        html_out = template.render(data)
-        if "chart_path" not in data or not data["chart_path"].startswith("data:image"):
-             data["chart_path"] = ""
-        pdf_bytes = HTML(string=html_out, base_url=script_dir).write_pdf()
+        with timed("pdf_render", trace) as timer:
+            pdf_bytes = render_pdf_cached(data, run=run)
+            timer.bytes = len(pdf_bytes)
         return pdf_bytes
+    except RenderQueueFull:
+        raise
     except Exception as e:
         st.error(f"Error saat membuat PDF: {e}")
         return None
 
 # --- Fungsi Google Drive & Sheets (Auth terpusat) ---
-SCOPES = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
-
 def get_google_credentials(secrets):
     """Mendapatkan kredensial Service Account dari Streamlit Secrets (Base64 atau JSON) atau file upload."""
     credentials_info = None
@@ -86,9 +123,7 @@ def get_google_credentials(secrets):
         try:
             b64_str = secrets["google_service_account_b64"]
             if isinstance(b64_str, str) and b64_str:
-                decoded_bytes = base64.b64decode(b64_str)
-                decoded_str = decoded_bytes.decode("utf-8")
-                credentials_info = json.loads(decoded_str)
+                credentials_info = decode_credentials_b64(b64_str)
                 source = "Streamlit Secrets (Base64)"
                 show_api_settings = False
         except (base64.binascii.Error, json.JSONDecodeError, Exception) as e:
@@ -99,9 +134,13 @@ def get_google_credentials(secrets):
         try:
             secret_content = secrets["google_service_account"]
             if isinstance(secret_content, str):
-                credentials_info = json.loads(secret_content)
-            elif isinstance(secret_content, dict) or isinstance(secret_content, toml.TomlDecoder):
+                credentials_info = parse_credentials_json(secret_content)
+            elif isinstance(secret_content, dict):
                  credentials_info = dict(secret_content)
+            else:
+                import toml # Untuk secrets format TOML; di-import hanya jika bukan dict
+                if isinstance(secret_content, toml.TomlDecoder):
+                    credentials_info = dict(secret_content)
             if credentials_info:
                 source = "Streamlit Secrets (JSON/TOML)"
                 show_api_settings = False
@@ -113,8 +152,7 @@ def get_google_credentials(secrets):
         uploaded_key_file = st.sidebar.file_uploader("Unggah File Kunci JSON Service Account", type=["json"], help="Jika tidak menggunakan Streamlit Secrets.")
         if uploaded_key_file is not None:
             try:
-                stringio = io.StringIO(uploaded_key_file.getvalue().decode("utf-8"))
-                credentials_info = json.load(stringio)
+                credentials_info = parse_credentials_json(uploaded_key_file.getvalue().decode("utf-8"))
                 source = "File Upload"
                 st.sidebar.success("File kunci JSON berhasil dibaca.")
                 show_api_settings = True
@@ -123,8 +161,7 @@ def get_google_credentials(secrets):
                 return None, "Error", True
 
     if credentials_info:
-        required_keys = ("type", "project_id", "private_key_id", "private_key", "client_email", "client_id", "auth_uri", "token_uri")
-        if not all(k in credentials_info for k in required_keys):
+        if not all(k in credentials_info for k in REQUIRED_CREDENTIAL_KEYS):
             # Perbaikan: Menggunakan kutip yang benar di f-string
             st.sidebar.error(f"Format kredensial dari {source} tidak lengkap.")
             return None, "Error", True
@@ -134,120 +171,367 @@ def get_google_credentials(secrets):
              st.sidebar.info("Kredensial Google Service Account tidak ditemukan.")
         return None, "Not Found", show_api_settings
 
-def get_gdrive_service(credentials_info):
-    """Membuat service Google Drive. Return None on failure."""
-    try:
-        credentials = service_account.Credentials.from_service_account_info(credentials_info, scopes=SCOPES)
-        service = build("drive", "v3", credentials=credentials)
-        return service
-    except Exception as e:
-        return None
-
 def get_gsheets_service(credentials_info):
     """Membuat service Google Sheets. Return None on failure."""
     try:
-        credentials = service_account.Credentials.from_service_account_info(credentials_info, scopes=SCOPES)
-        service = build("sheets", "v4", credentials=credentials)
-        return service
+        return build_sheets_service(credentials_info)
     except Exception as e:
         st.sidebar.error(f"DEBUG: Gagal koneksi Google Sheets: {e}")
         return None
 
-def get_next_proposal_number(service, sheet_id):
-    """Mendapatkan nomor proposal berikutnya dari Google Sheet. Menampilkan error detail."""
-    fallback_num = "PROP-" + datetime.now().strftime("%y%m%d") + "-XXX"
-    try:
-        range_name = f"{LOG_SHEET_NAME}!B2:B"
-        result = service.spreadsheets().values().get(spreadsheetId=sheet_id, range=range_name).execute()
-        values = result.get("values", [])
-        today_prefix = "PROP-" + datetime.now().strftime("%y%m%d") + "-"
-        last_number = 0
-        if values:
-            for row in reversed(values):
-                # Perbaikan: Pastikan row tidak kosong dan punya elemen pertama
-                if row and len(row) > 0 and isinstance(row[0], str) and row[0].startswith(today_prefix):
-                    try:
-                        last_number = int(row[0].split("-")[-1])
-                        break
-                    except (IndexError, ValueError):
-                        continue
-        next_number = last_number + 1
-        return f"{today_prefix}{next_number:03d}"
-    except HttpError as e:
-        st.sidebar.error(f"DEBUG: Error API saat baca GSheet (Nomor): {e}")
-        return fallback_num
-    except Exception as e:
-        st.sidebar.error(f"DEBUG: Error umum saat baca GSheet (Nomor): {e}")
-        return fallback_num
+def allocate_proposal_number(service, sheet_id, trace=None):
+    """Memesan nomor proposal berikutnya dari counter lokal.
+    Counter disinkronkan dari Google Sheet hanya sekali per hari; jika sinkronisasi gagal,
+    nomor tetap diambil dari counter lokal. Nomor cadangan (...-XXX) hanya jika SQLite gagal.
+    """
+    from googleapiclient.errors import HttpError
 
-def log_to_gsheet(service, sheet_id, log_data):
-    """Mencatat data proposal ke Google Sheet. Return True on success, False on failure. Menampilkan error detail."""
+    seed = None
+    if service and sheet_id:
+        def seed(prefix):
+            try:
+                with timed("sheets_number_fetch", trace):
+                    return highest_logged_number(service, sheet_id, prefix)
+            except HttpError as e:
+                st.warning(f"DEBUG: Error API saat baca GSheet (Nomor), memakai counter lokal: {e}")
+                raise
     try:
-        values = [
-            [
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                log_data.get("proposal_number", ""),
-                log_data.get("agent_name", ""),
-                log_data.get("agent_email", ""),
-                f"'{log_data.get('agent_phone', '')}" if str(log_data.get('agent_phone', '')).startswith('0') else log_data.get('agent_phone', ''), # Add prefix ' if starts with 0
-                log_data.get("prospect_name", ""),
-                log_data.get("prospect_location", ""),
-                log_data.get("gdrive_link", "")
-            ]
-        ]
-        body = {"values": values}
-        result = service.spreadsheets().values().append(
-            spreadsheetId=sheet_id,
-            range=f"{LOG_SHEET_NAME}!A1",
-            valueInputOption="USER_ENTERED",
-            insertDataOption="INSERT_ROWS",
-            body=body).execute()
-        return True
-    except HttpError as e:
-        st.error(f"DEBUG: Error API saat catat GSheet: {e}")
-        return False
+        return get_proposal_number_allocator().allocate(seed=seed)
     except Exception as e:
-        st.error(f"DEBUG: Error umum saat catat GSheet: {e}")
-        return False
+        st.error(f"DEBUG: Error umum saat alokasi nomor proposal: {e}")
+        return fallback_number()
+
+def register_sheet_log_service(credentials_info):
+    """Mendaftarkan factory service Sheets ke buffer log (murah jika kredensial tidak berubah).
+    Dipanggil saat start agar baris yang tertinggal dari crash sebelumnya langsung dikirim ulang.
+    """
+    get_sheet_log_buffer().set_service_factory(
+        credentials_key(credentials_info),
+        functools.partial(build_sheets_service, credentials_info),
+    )
+
+def render_roi_summary(roi, roi_inputs, prospect_name):
+    """Metrik utama & kesimpulan (murah, ditampilkan ulang setiap input berubah)."""
+    payback_period = roi["payback_period"]
+    st.subheader("Ringkasan Hasil Utama")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(label="ROI Tahun Pertama", value=f"{format_number_id(roi['first_year_roi'])}%")
+        st.metric(label="ROI Tiga Tahun", value=f"{format_number_id(roi['three_year_roi'])}%")
+        st.metric(label="Periode Pengembalian", value=f"{format_number_id(payback_period, 1)} bulan" if payback_period != float("inf") else "Tidak Tercapai")
+    with col2:
+        st.metric(label="Total Penghematan Tahunan (USD)", value=f"$ {format_number_id(roi['total_annual_savings_usd'])}")
+        st.metric(label=f"Manfaat Bersih {len(roi['years'])} Tahun (USD)", value=f"$ {format_number_id(roi['horizon_net_benefit'])}")
+        st.metric(label=f"NPV (diskonto {format_number_id(roi_inputs['discount_rate'], 1)}%)", value=f"$ {format_number_id(roi['npv'])}")
+        st.metric(label="Pengurangan Staf", value=f"{roi_inputs['cs_staff'] - roi['new_staff_count']} orang ({roi_inputs['staff_reduction']}%)")
+    with col3:
+        st.metric(label="Otomatisasi Pertanyaan", value=f"{format_number_id(roi['automated_inquiries'], 0)} ({roi_inputs['automation_rate']}%)")
+        st.metric(label="Peningkatan Loyalitas Klien", value=f"+{roi_inputs['retention_improvement']}% (menjadi {roi['new_retention_rate']}%)")
+        st.metric(label="Penghematan Biaya Tahunan (IDR)", value=f"Rp {format_number_id(roi['labor_savings_idr'])}")
+        irr_text = format_number_id(roi["irr"], 1)
+        if roi["irr"] > IRR_DISPLAY_MAX:
+            irr_text = f">{format_number_id(IRR_DISPLAY_MAX, 0)}%"
+        elif irr_text != "N/A":
+            irr_text += "%"
+        st.metric(label="IRR (tahunan)", value=irr_text)
 
-def find_or_create_folder(service, folder_name, parent_folder_id):
-    """Mencari/membuat folder di Google Drive. Return folder ID or None."""
+    st.subheader("📝 Kesimpulan")
+    st.markdown(build_conclusion_text(prospect_name, roi["first_year_roi"], roi["three_year_roi"], roi["payback_period"]))
+
+def render_simulation_summary(simulation):
+    """Tabel P10/P50/P90 simulasi Monte Carlo (fan chart dibuat bersama proposal)."""
+    st.subheader("🎲 Analisis Sensitivitas (Simulasi Monte Carlo)")
+    st.table([
+        {"Metrik": row["label"], "P10": format_number_id(row["p10"], 1), "P50 (median)": format_number_id(row["p50"], 1), "P90": format_number_id(row["p90"], 1)}
+        for row in summary_rows(simulation)
+    ])
+    st.caption(f"{format_number_id(simulation['draws'], 0)} skenario; peluang ROI tahun pertama positif {format_number_id(simulation['probability_positive_first_year'] * 100, 1)}%.")
+
+def render_proposal_charts(roi_inputs, roi, simulation, sensitivity, trace=None, run=None):
+    """Merender grafik untuk layar dan PDF. Return (list (png, caption) pratinjau, dict data URI untuk PDF)."""
+    images = []
+    chart_uris = {}
+
+    def render(render_func, *args, **kwargs):
+        with timed("chart_render", trace) as timer:
+            image = render_func(*args, run=run, **kwargs)
+            timer.bytes = len(image)
+        return image
+
+    # Pratinjau layar memakai DPI rendah; versi PDF memakai DPI/format tersendiri
     try:
-        safe_folder_name = "".join(c for c in folder_name if c.isalnum() or c in (" ", "_", "-")).strip()
-        if not safe_folder_name:
-             safe_folder_name = "Prospek Tanpa Nama"
-        # Perbaikan: Menggunakan kutip tunggal untuk nilai string dalam query
-        query = f"name='{safe_folder_name}' and mimeType='application/vnd.google-apps.folder' and '{parent_folder_id}' in parents and trashed=false"
-        response = service.files().list(q=query, spaces="drive", fields="files(id, name)").execute()
-        folders = response.get("files", [])
-        if folders:
-            return folders[0].get("id")
-        else:
-            file_metadata = {"name": safe_folder_name, "mimeType": "application/vnd.google-apps.folder", "parents": [parent_folder_id]}
-            folder = service.files().create(body=file_metadata, fields="id").execute()
-            return folder.get("id")
-    except HttpError as e:
-        return None
+        images.append((render(render_chart_cached, roi_inputs, roi, dpi=SCREEN_DPI), "Grafik Analisis ROI"))
+        chart_uris["chart"] = chart_data_uri(render(render_chart_cached, roi_inputs, roi, dpi=PDF_DPI, fmt=PDF_FORMAT), PDF_FORMAT)
+    except RenderQueueFull:
+        raise  # Jangan lanjut membuat PDF tanpa grafik
     except Exception as e:
+        st.error(f"Gagal membuat grafik: {e}")
+    if sensitivity:
+        try:
+            images.append((render(render_tornado_chart_cached, sensitivity, dpi=SCREEN_DPI), "Tornado Chart Sensitivitas Input"))
+            chart_uris["tornado"] = chart_data_uri(render(render_tornado_chart_cached, sensitivity, dpi=PDF_DPI, fmt=PDF_FORMAT), PDF_FORMAT)
+        except RenderQueueFull:
+            raise  # Jangan lanjut membuat PDF tanpa grafik
+        except Exception as e:
+            st.error(f"Gagal membuat tornado chart: {e}")
+    if simulation:
+        try:
+            images.append((render(render_fan_chart_cached, simulation, dpi=SCREEN_DPI), "Fan Chart Manfaat Bersih Kumulatif"))
+            chart_uris["fan"] = chart_data_uri(render(render_fan_chart_cached, simulation, dpi=PDF_DPI, fmt=PDF_FORMAT), PDF_FORMAT)
+        except RenderQueueFull:
+            raise  # Jangan lanjut membuat PDF tanpa grafik
+        except Exception as e:
+            st.error(f"Gagal membuat fan chart: {e}")
+    return images, chart_uris
+
+def create_proposal(proposal_key, admin_inputs, roi_inputs, roi, simulation, sensitivity,
+                    credentials_info, gdrive_parent_folder_id, google_sheet_id, trace=None, use_render_pool=False):
+    """Tahap berat yang hanya dijalankan saat tombol diklik: grafik, nomor proposal, PDF, lalu antrian cloud.
+    Return dict hasil untuk st.session_state["proposal"], atau None jika PDF gagal dibuat.
+    `trace` (metrics.ProposalTrace) ditutup di sini, atau oleh antrian cloud setelah upload/log selesai.
+    `use_render_pool` (mode multi-tenant) merender grafik & PDF di pool proses bersama; slot antrean
+    dipesan lebih dulu sehingga antrean penuh ditolak sebelum nomor proposal dipesan.
+    """
+    trace = trace or ProposalTrace()
+    args = (proposal_key, admin_inputs, roi_inputs, roi, simulation, sensitivity,
+            credentials_info, gdrive_parent_folder_id, google_sheet_id, trace)
+    if not use_render_pool:
+        return build_proposal(*args)
+    try:
+        # Render grafik lalu PDF berurutan: satu slot cukup untuk seluruh proposal
+        with get_render_pool().reserve(current_session_id()) as reservation:
+            return build_proposal(*args, run=render_runner(st.empty(), trace, reservation))
+    except RenderQueueFull as e:
+        st.warning(f"Server sedang sibuk: {e}. Silakan klik lagi dalam beberapa detik.")
+        trace.finish(outcome="queue_full")
         return None
 
-def upload_to_drive(service, pdf_bytes, filename, prospect_folder_id):
-    """Mengunggah file PDF ke Google Drive. Return link or None."""
-    gdrive_link = None
-    try:
-        file_metadata = {"name": filename, "parents": [prospect_folder_id]}
-        media = MediaIoBaseUpload(io.BytesIO(pdf_bytes), mimetype="application/pdf", resumable=True)
-        request = service.files().create(body=file_metadata, media_body=media, fields="id, webViewLink")
-        response = None
-        while response is None:
-            status, response = request.next_chunk()
-        file_id = response.get("id")
-        gdrive_link = response.get("webViewLink")
-    except HttpError as e:
-        pass
-    except Exception as e:
-        pass
-    return gdrive_link
+def build_proposal(proposal_key, admin_inputs, roi_inputs, roi, simulation, sensitivity,
+                   credentials_info, gdrive_parent_folder_id, google_sheet_id, trace, run=None):
+    """Isi create_proposal; `run` (render_runner) mengirim render ke pool bersama."""
+    gsheets_service = None
+    if credentials_info and google_sheet_id:
+        gsheets_service = get_gsheets_service(credentials_info)
+    trigger_gdrive_upload = bool(credentials_info and gdrive_parent_folder_id)
+    trigger_gsheet_log = bool(gsheets_service)
+
+    with st.spinner("Membuat grafik dan file PDF proposal..."):
+        images, chart_uris = render_proposal_charts(roi_inputs, roi, simulation, sensitivity, trace, run)
+        last_proposal = st.session_state.get("last_proposal")
+        is_repeat_proposal = bool(last_proposal and last_proposal["key"] == proposal_key)
+        if is_repeat_proposal:
+            next_proposal_num = last_proposal["number"]
+        else:
+            next_proposal_num = allocate_proposal_number(gsheets_service, google_sheet_id, trace)
+            st.session_state["last_proposal"] = {"key": proposal_key, "number": next_proposal_num}
+            st.session_state.pop("next_proposal_preview", None)
+        trace.proposal_number = next_proposal_num
+        admin_data = {"proposal_number": next_proposal_num, **admin_inputs}
+        pdf_data = build_pdf_data(admin_data, roi_inputs, roi, chart_uris.get("chart"), simulation,
+                                  chart_uris.get("fan"), chart_uris.get("tornado"))
+        pdf_bytes = generate_pdf(pdf_data, trace, run)
+    if not pdf_bytes:
+        trace.finish(outcome="pdf_failed")
+        return None # Error pembuatan PDF sudah ditangani di generate_pdf
+
+    if not is_repeat_proposal:
+        try:
+            if not get_scenario_store().save(admin_data, roi_inputs, roi):
+                st.warning(f"Skenario {next_proposal_num} tidak disimpan: nomor proposal sudah dipakai atau bukan nomor final.")
+        except Exception as e:
+            st.warning(f"Skenario tidak tersimpan di penyimpanan lokal: {e}")
+
+    cloud_job = None
+    proposal_filename = pdf_filename(next_proposal_num, admin_inputs["prospect_name"], admin_inputs["prospect_location"])
+    # --- Operasi Backend (GDrive & GSheet) di antrian background ---
+    if is_repeat_proposal:
+        st.info(f"Proposal {next_proposal_num} dengan input yang sama sudah diproses; tidak diunggah/dicatat ulang.")
+    elif trigger_gdrive_upload or trigger_gsheet_log:
+        if trigger_gsheet_log:
+            register_sheet_log_service(credentials_info)
+        log_data = {"proposal_number": next_proposal_num, **admin_inputs}
+        cloud_job = get_cloud_queue().submit(
+            credentials_info,
+            pdf_bytes,
+            proposal_filename,
+            safe_name(admin_inputs["prospect_name"]),
+            gdrive_parent_folder_id if trigger_gdrive_upload else None,
+            google_sheet_id if trigger_gsheet_log else None,
+            log_data,
+            trace=trace,
+        )
+        st.session_state.setdefault("cloud_jobs", []).append(cloud_job)
+    if cloud_job is None:
+        trace.finish(outcome="repeat" if is_repeat_proposal else "local_only")
+    return {
+        "key": proposal_key,
+        "number": next_proposal_num,
+        "filename": proposal_filename,
+        "pdf_bytes": pdf_bytes,
+        "images": images,
+    }
+
+@st.fragment
+def render_proposal_output(current_key):
+    """Grafik & tombol unduh proposal terakhir dari session_state.
+    Tetap tampil (tanpa render ulang) saat input diubah; klik unduh hanya menjalankan ulang fragment ini.
+    """
+    proposal = st.session_state.get("proposal")
+    if not proposal:
+        st.info(f"Silakan isi data di sidebar kiri dan klik tombol \"{PROPOSAL_BUTTON_LABEL}\" untuk membuat grafik dan proposal PDF.")
+        return
+    if proposal["key"] != current_key:
+        st.warning(f"Input sudah berubah sejak proposal {proposal['number']} dibuat. Grafik dan PDF di bawah masih memakai input lama; klik \"{PROPOSAL_BUTTON_LABEL}\" untuk memperbarui.")
+    st.subheader("📊 Grafik Analisis")
+    for image, caption in proposal["images"]:
+        st.image(image, caption=caption, use_container_width=True)
+    st.subheader("📄 Proposal PDF")
+    st.download_button(
+        label="📥 Unduh PDF",
+        data=proposal["pdf_bytes"],
+        file_name=proposal["filename"],
+        mime="application/pdf"
+    )
+    st.success(f"Proposal PDF ({proposal['filename']}) siap diunduh.")
+
+@st.fragment(run_every="2s")
+def render_cloud_status():
+    """Menampilkan status upload Drive & log Sheets yang berjalan di background."""
+    jobs = st.session_state.get("cloud_jobs", [])
+    if not jobs:
+        return
+    st.subheader("☁️ Status Google Drive & Sheets")
+    for job in reversed(jobs[-5:]):
+        if not job.done:
+            st.info(f"{job.filename}: {job.state}...")
+        elif job.errors:
+            st.warning(f"{job.filename}: " + "; ".join(job.errors))
+        elif job.gdrive_link:
+            st.success(f"{job.filename}: tersimpan di Google Drive — [Buka file]({job.gdrive_link})")
+        else:
+            st.success(f"{job.filename}: masuk antrian log Google Sheets.")
+    log_buffer = get_sheet_log_buffer()
+    pending_rows = log_buffer.pending_count()
+    if pending_rows:
+        st.caption(f"{pending_rows} baris log menunggu dikirim batch ke Google Sheets.")
+    if log_buffer.last_error:
+        st.caption(f"Pengiriman log terakhir gagal: {log_buffer.last_error}")
+    dead_rows = log_buffer.dead_count()
+    if dead_rows:
+        st.caption(f"{dead_rows} baris log ditolak permanen oleh Google Sheets (tersimpan di tabel dead_rows).")
+
+@st.fragment
+def render_bulk_export(defaults, credentials_info, gdrive_parent_folder_id, use_render_pool=False):
+    """Ekspor banyak proposal ke satu ZIP dari file skenario (kolom sama dengan CLI batch_proposals.py).
+    Arsip disimpan di file temp per sesi; isinya baru dibaca saat tombol unduh diklik.
+    Di mode multi-tenant render memakai pool bersama (bergiliran dengan sesi lain).
+    """
+    with st.expander("📦 Ekspor Proposal Massal (ZIP)"):
+        scenario_file = st.file_uploader("File skenario prospek (CSV/Parquet)", type=["csv", "parquet"], key="export_scenarios",
+                                         help="Satu baris per prospek dengan kolom input sidebar; data konsultan yang kosong diisi dari sidebar.")
+        if st.button("Buat Arsip ZIP", disabled=scenario_file is None):
+            status = st.empty()
+            previous = st.session_state.pop("export_archive", None)
+            if previous:
+                previous["file"].close()
+            try:
+                archive, stats = export_zip(
+                    iter_proposals(scenario_file, defaults=defaults, store=get_scenario_store()),
+                    progress=lambda done, failed: status.caption(f"{done} proposal selesai, {failed} gagal..."),
+                    submit=functools.partial(get_render_pool().submit, current_session_id(), block=True) if use_render_pool else None,
+                )
+                st.session_state["export_archive"] = {
+                    "file": archive,
+                    "filename": datetime.now().strftime("Proposal %Y-%m-%d %H%M%S.zip"),
+                    "stats": stats,
+                }
+            except Exception as e:
+                st.error(f"Ekspor gagal: {e}")
+            status.empty()
+        export = st.session_state.get("export_archive")
+        if not export:
+            return
+        stats = export["stats"]
+        st.success(f"{stats['done']} proposal ({format_number_id(stats['zip_bytes'] / 1e6, 1)} MB) siap di {export['filename']}.")
+        for error in stats["errors"][:5]:
+            st.warning(f"Gagal: {error}")
+        st.download_button("📥 Unduh ZIP", data=functools.partial(read_archive, export["file"]),
+                           file_name=export["filename"], mime=ZIP_MIME_TYPE)
+        if credentials_info and gdrive_parent_folder_id and st.button("☁️ Unggah ZIP ke Google Drive"):
+            upload_progress = st.progress(0.0, text="Mengunggah arsip ke Google Drive...")
+            try:
+                link = upload_archive(build_drive_service(credentials_info), export["file"], export["filename"], gdrive_parent_folder_id,
+                                      progress=lambda ratio: upload_progress.progress(ratio, text="Mengunggah arsip ke Google Drive..."))
+                st.success(f"Arsip tersimpan di Google Drive — [Buka file]({link})")
+            except Exception as e:
+                st.error(f"Upload arsip gagal: {e}")
+
+@st.fragment
+def render_scenario_dashboard():
+    """Ringkasan skenario tersimpan per wilayah/konsultan (query lokal, tanpa Sheets API)."""
+    with st.expander("🗺️ Ringkasan Skenario per Wilayah/Konsultan"):
+        group_by = st.radio("Kelompokkan per", list(GROUP_BY), format_func=lambda key: GROUP_BY[key][1], horizontal=True)
+        since = st.date_input("Sejak tanggal", value=None)
+        rows = get_scenario_store().aggregate(group_by, since.isoformat() if since else None)
+        if not rows:
+            st.caption("Belum ada skenario tersimpan.")
+            return
+
+        def number(value, precision=1):
+            return format_number_id(value, precision) if value is not None else "-"
+
+        def irr(value):
+            if value is not None and value >= IRR_DISPLAY_MAX:
+                return f">{format_number_id(IRR_DISPLAY_MAX, 0)}"
+            return number(value)
+
+        st.table([
+            {
+                GROUP_BY[group_by][1]: row["group"] or "-",
+                "Proposal": row["proposals"],
+                "ROI Tahun Pertama (%)": number(row["avg_first_year_roi"]),
+                "Periode Pengembalian (bulan)": number(row["avg_payback_period"]),
+                "Manfaat Bersih 5 Tahun (USD)": number(row["avg_five_year_net_benefit"], 0),
+                "NPV (USD)": number(row["avg_npv"], 0),
+                "IRR (%)": irr(row["avg_irr"]),
+            }
+            for row in rows
+        ])
+        st.caption(
+            "Rata-rata per kelompok; nilai tak terhingga (mis. pengembalian tidak tercapai) tidak dihitung. "
+            f"IRR per proposal dibatasi {format_number_id(IRR_DISPLAY_MAX, 0)}% sebelum dirata-rata."
+        )
+
+@st.fragment(run_every="2s")
+def render_queue_status():
+    """Kedalaman antrean pool render bersama (mode multi-tenant), diperbarui setiap 2 detik."""
+    stats = get_render_pool().stats()
+    waiting = stats["queued"] + stats["reserved"]  # Slot yang sudah dipesan proposal lain ikut terhitung
+    text = (f"🖨️ Antrean render: {stats['running']}/{stats['workers']} worker sibuk, "
+            f"{waiting} job menunggu dari {stats['sessions']} sesi (batas {stats['max_queue']}).")
+    if waiting >= stats["max_queue"]:
+        st.warning(text + " Antrean penuh, tunggu sebentar sebelum membuat proposal.")
+    else:
+        st.caption(text)
+
+def render_metrics_panel():
+    """Panel admin: p50/p95 per tahap dari sampel terakhir di proses ini."""
+    with st.expander("📈 Metrik Kinerja per Tahap (Admin)"):
+        rows = get_metrics().summary()
+        if not rows:
+            st.caption("Belum ada pengukuran di proses ini.")
+            return
+        st.table([
+            {
+                "Tahap": row["stage"],
+                "Jumlah": row["count"],
+                "Error": row["errors"],
+                "p50 (ms)": format_number_id(row["p50_ms"], 1),
+                "p95 (ms)": format_number_id(row["p95_ms"], 1),
+                "Rata-rata ukuran (KB)": format_number_id(row["avg_bytes"] / 1024, 1) if row["avg_bytes"] else "-",
+            }
+            for row in rows
+        ])
 
 # --- Judul dan Deskripsi Aplikasi ---
 st.title("📊 Kalkulator ROI Solusi AI Voice untuk Broker Forex")
@@ -255,47 +539,129 @@ st.markdown("Masukkan data operasional dan asumsi untuk menghitung potensi ROI d
 
 # --- Dapatkan Kredensial & ID dari Secrets --- 
 secrets = st.secrets
-credentials_info, cred_source, show_api_settings_sidebar = get_google_credentials(secrets)
+with timed("credential_load") as credential_timer:
+    credentials_info, cred_source, show_api_settings_sidebar = get_google_credentials(secrets)
+    credential_timer.outcome = {"Error": "error", "Not Found": "missing"}.get(cred_source, "ok")
+if credentials_info:
+    register_sheet_log_service(credentials_info)
 gdrive_parent_folder_id_secret = secrets.get("gdrive_parent_folder_id")
 google_sheet_id_secret = secrets.get("google_sheet_id")
+# Mode multi-tenant: render grafik/PDF di pool proses bersama (ROI_RENDER_POOL=1 atau secrets render_pool)
+use_render_pool = POOL_ENABLED or bool(secrets.get("render_pool", False))
 
-# --- Dapatkan Nomor Proposal Berikutnya (jika memungkinkan) ---
-next_proposal_num = "PROP-" + datetime.now().strftime("%y%m%d") + "-XXX"
-gsheets_service = None
-if credentials_info and google_sheet_id_secret:
-    gsheets_service = get_gsheets_service(credentials_info)
-    if gsheets_service:
-        next_proposal_num = get_next_proposal_number(gsheets_service, google_sheet_id_secret)
+# --- Perkiraan Nomor Proposal (nomor final dipesan saat proposal dibuat; dibaca sekali per sesi) ---
+if "next_proposal_preview" not in st.session_state:
+    try:
+        st.session_state["next_proposal_preview"] = get_proposal_number_allocator().peek()
+    except Exception:
+        st.session_state["next_proposal_preview"] = fallback_number()
+next_proposal_preview = st.session_state["next_proposal_preview"]
 
 # --- Input Data --- 
 with st.sidebar:
     st.header("⚙️ Input Data")
+    with st.expander("🗂️ Skenario Tersimpan"):
+        scenario_query = st.text_input("Cari prospek, email konsultan, atau nomor proposal", "")
+        try:
+            saved_scenarios = get_scenario_store().search(scenario_query)
+        except Exception as e:
+            saved_scenarios = []
+            st.caption(f"Penyimpanan skenario tidak tersedia: {e}")
+        if saved_scenarios:
+            scenario_labels = {
+                row["proposal_number"]: f"{row['proposal_number']} · {row['prospect_name']} ({row['prospect_location']}) · {row['created_date']}"
+                for row in saved_scenarios
+            }
+            selected_scenario = st.selectbox("Skenario", list(scenario_labels), format_func=scenario_labels.get)
+            st.button("Muat & Hitung Ulang", on_click=load_scenario, args=(selected_scenario,))
+        elif scenario_query:
+            st.caption("Tidak ada skenario yang cocok.")
+        loaded_scenario = st.session_state.get("loaded_scenario")
+        if loaded_scenario:
+            st.caption(f"Input dimuat dari {loaded_scenario['proposal_number']}.")
+            st.button("Kembali ke Nilai Default", on_click=clear_loaded_scenario)
     st.subheader("Informasi Konsultan")
     agent_name = st.text_input("Nama Konsultan", "")
     agent_email = st.text_input("Email Konsultan", "")
     agent_phone = st.text_input("No. HP/WA Konsultan", "")
     st.subheader("Informasi Proposal & Prospek")
-    st.text_input("Nomor Proposal (Otomatis)", value=next_proposal_num, disabled=True)
-    prospect_name = st.text_input("Nama Prospek (Broker Forex)", "PT Contoh Broker")
-    prospect_location = st.text_input("Lokasi Prospek", "Jakarta")
+    st.text_input("Nomor Proposal (Otomatis)", value=next_proposal_preview, disabled=True, help="Nomor final dipesan saat proposal PDF dibuat.")
+    prospect_name = st.text_input("Nama Prospek (Broker Forex)", scenario_value("prospect_name", "PT Contoh Broker"), key=widget_key("prospect_name"))
+    prospect_location = st.text_input("Lokasi Prospek", scenario_value("prospect_location", "Jakarta"), key=widget_key("prospect_location"))
     st.subheader("Metrik Operasional Saat Ini")
-    cs_staff = st.number_input("Jumlah staf CS", min_value=1, value=10)
-    avg_monthly_salary = st.number_input("Gaji bulanan/staf (IDR)", min_value=0, value=7000000, step=100000, format="%d")
-    overhead_multiplier = st.number_input("Pengali overhead", min_value=1.0, value=1.3, step=0.1)
-    usd_conversion_rate = st.number_input("Kurs IDR ke USD", min_value=1000, value=15500, step=100, format="%d")
-    monthly_inquiries = st.number_input("Pertanyaan/bulan", min_value=0, value=5000, step=100, format="%d")
-    avg_handling_time = st.number_input("Waktu penanganan/pertanyaan (menit)", min_value=0.0, value=5.0, step=0.5)
-    avg_monthly_clients = st.number_input("Klien aktif/bulan", min_value=0, value=1000, step=50, format="%d")
-    avg_monthly_client_value = st.number_input("Pendapatan/klien/bulan (USD)", min_value=0.0, value=50.0, step=5.0)
-    current_retention_rate = st.number_input("Loyalitas klien tahunan (%) ", min_value=0.0, max_value=100.0, value=85.0, step=1.0)
+    cs_staff = st.number_input("Jumlah staf CS", min_value=1, value=scenario_value("cs_staff", 10, 1), key=widget_key("cs_staff"))
+    avg_monthly_salary = st.number_input("Gaji bulanan/staf (IDR)", min_value=0, value=scenario_value("avg_monthly_salary", 7000000, 0), step=100000, format="%d", key=widget_key("avg_monthly_salary"))
+    overhead_multiplier = st.number_input("Pengali overhead", min_value=1.0, value=scenario_value("overhead_multiplier", 1.3, 1.0), step=0.1, key=widget_key("overhead_multiplier"))
+    usd_conversion_rate = st.number_input("Kurs IDR ke USD", min_value=1000, value=scenario_value("usd_conversion_rate", 15500, 1000), step=100, format="%d", key=widget_key("usd_conversion_rate"))
+    monthly_inquiries = st.number_input("Pertanyaan/bulan", min_value=0, value=scenario_value("monthly_inquiries", 5000, 0), step=100, format="%d", key=widget_key("monthly_inquiries"))
+    avg_handling_time = st.number_input("Waktu penanganan/pertanyaan (menit)", min_value=0.0, value=scenario_value("avg_handling_time", 5.0, 0.0), step=0.5, key=widget_key("avg_handling_time"))
+    avg_monthly_clients = st.number_input("Klien aktif/bulan", min_value=0, value=scenario_value("avg_monthly_clients", 1000, 0), step=50, format="%d", key=widget_key("avg_monthly_clients"))
+    avg_monthly_client_value = st.number_input("Pendapatan/klien/bulan (USD)", min_value=0.0, value=scenario_value("avg_monthly_client_value", 50.0, 0.0), step=5.0, key=widget_key("avg_monthly_client_value"))
+    current_retention_rate = st.number_input("Loyalitas klien tahunan (%) ", min_value=0.0, max_value=100.0, value=scenario_value("current_retention_rate", 85.0, 0.0, 100.0), step=1.0, key=widget_key("current_retention_rate"))
     st.subheader("Investasi Solusi AI Voice")
-    implementation_cost = st.number_input("Biaya implementasi (USD)", min_value=0.0, value=10000.0, step=1000.0)
-    annual_subscription = st.number_input("Biaya langganan tahunan (USD)", min_value=0.0, value=5000.0, step=500.0)
+    implementation_cost = st.number_input("Biaya implementasi (USD)", min_value=0.0, value=scenario_value("implementation_cost", 10000.0, 0.0), step=1000.0, key=widget_key("implementation_cost"))
+    annual_subscription = st.number_input("Biaya langganan tahunan (USD)", min_value=0.0, value=scenario_value("annual_subscription", 5000.0, 0.0), step=500.0, key=widget_key("annual_subscription"))
     st.subheader("Asumsi Dampak Solusi AI Voice")
-    automation_rate = st.slider("Otomatisasi pertanyaan (%) ", 0, 100, 75)
-    staff_reduction = st.slider("Pengurangan staf CS (%) ", 0, 100, 35)
-    retention_improvement = st.slider("Peningkatan loyalitas klien (%) ", 0.0, 20.0, 7.5, 0.5)
-    handling_time_improvement = st.slider("Peningkatan waktu penanganan (%) ", 0, 100, 25)
+    automation_rate = st.slider("Otomatisasi pertanyaan (%) ", 0, 100, scenario_value("automation_rate", 75, 0, 100), key=widget_key("automation_rate"))
+    staff_reduction = st.slider("Pengurangan staf CS (%) ", 0, 100, scenario_value("staff_reduction", 35, 0, 100), key=widget_key("staff_reduction"))
+    retention_improvement = st.slider("Peningkatan loyalitas klien (%) ", 0.0, 20.0, scenario_value("retention_improvement", 7.5, 0.0, 20.0), 0.5, key=widget_key("retention_improvement"))
+    handling_time_improvement = st.slider("Peningkatan waktu penanganan (%) ", 0, 100, scenario_value("handling_time_improvement", 25, 0, 100), key=widget_key("handling_time_improvement"))
+    with st.expander("📆 Proyeksi Arus Kas Bulanan"):
+        horizon_years = st.slider("Horizon proyeksi (tahun)", 1, MAX_HORIZON_YEARS, scenario_value("horizon_years", PROJECTION_YEARS, 1, MAX_HORIZON_YEARS), key=widget_key("horizon_years"))
+        ramp_up_months = st.number_input("Masa adopsi otomatisasi (bulan)", min_value=0, max_value=36, value=scenario_value("ramp_up_months", int(CASHFLOW_DEFAULTS["ramp_up_months"]), 0, 36), key=widget_key("ramp_up_months"), help="0 = manfaat penuh sejak bulan pertama.")
+        loaded_curve = scenario_value("ramp_curve", RAMP_CURVES[0])
+        ramp_curve = st.selectbox("Kurva adopsi", list(RAMP_CURVES), index=RAMP_CURVES.index(loaded_curve) if loaded_curve in RAMP_CURVES else 0,
+                                  format_func=lambda c: RAMP_CURVE_LABELS[c].capitalize(), key=widget_key("ramp_curve"))
+        salary_inflation = st.number_input("Kenaikan gaji per tahun (%)", min_value=0.0, max_value=50.0, value=scenario_value("salary_inflation", CASHFLOW_DEFAULTS["salary_inflation"], 0.0, 50.0), step=0.5, key=widget_key("salary_inflation"))
+        fx_drift = st.number_input("Pelemahan IDR terhadap USD per tahun (%)", min_value=-20.0, max_value=50.0, value=scenario_value("fx_drift", CASHFLOW_DEFAULTS["fx_drift"], -20.0, 50.0), step=0.5, key=widget_key("fx_drift"))
+        discount_rate = st.number_input("Tingkat diskonto NPV (%)", min_value=0.0, max_value=50.0, value=scenario_value("discount_rate", CASHFLOW_DEFAULTS["discount_rate"], 0.0, 50.0), step=0.5, key=widget_key("discount_rate"))
+    roi_inputs = {
+        "cs_staff": cs_staff,
+        "avg_monthly_salary": avg_monthly_salary,
+        "overhead_multiplier": overhead_multiplier,
+        "usd_conversion_rate": usd_conversion_rate,
+        "monthly_inquiries": monthly_inquiries,
+        "avg_handling_time": avg_handling_time,
+        "avg_monthly_clients": avg_monthly_clients,
+        "avg_monthly_client_value": avg_monthly_client_value,
+        "current_retention_rate": current_retention_rate,
+        "implementation_cost": implementation_cost,
+        "annual_subscription": annual_subscription,
+        "automation_rate": automation_rate,
+        "staff_reduction": staff_reduction,
+        "retention_improvement": retention_improvement,
+        "handling_time_improvement": handling_time_improvement,
+        "ramp_up_months": ramp_up_months,
+        "salary_inflation": salary_inflation,
+        "fx_drift": fx_drift,
+        "discount_rate": discount_rate,
+        "horizon_years": horizon_years,
+        "ramp_curve": ramp_curve,
+    }
+    simulation = None
+    with st.expander("🎲 Simulasi Monte Carlo"):
+        simulation_enabled = st.checkbox("Aktifkan simulasi asumsi", value=False, help="Asumsi dampak dan kurs diambil acak dari rentang di bawah; hasil P10/P50/P90 ikut dicetak di PDF.")
+        if simulation_enabled:
+            simulation_distribution = st.selectbox("Distribusi", ["triangular", "uniform"], format_func=lambda d: "Triangular (puncak = nilai slider)" if d == "triangular" else "Seragam")
+            simulation_draws = st.number_input("Jumlah skenario", min_value=10000, max_value=500000, value=DEFAULT_DRAWS, step=10000, format="%d")
+            simulation_ranges = {
+                "automation_rate": st.slider("Rentang otomatisasi (%)", 0, 100, tuple(int(v) for v in DEFAULT_RANGES["automation_rate"])),
+                "staff_reduction": st.slider("Rentang pengurangan staf (%)", 0, 100, tuple(int(v) for v in DEFAULT_RANGES["staff_reduction"])),
+                "retention_improvement": st.slider("Rentang peningkatan loyalitas (%)", 0.0, 20.0, DEFAULT_RANGES["retention_improvement"], 0.5),
+                "handling_time_improvement": st.slider("Rentang peningkatan waktu penanganan (%)", 0, 100, tuple(int(v) for v in DEFAULT_RANGES["handling_time_improvement"])),
+                "usd_conversion_rate": st.slider("Rentang kurs IDR ke USD", 10000, 20000, tuple(int(v) for v in DEFAULT_RANGES["usd_conversion_rate"]), 100),
+            }
+            simulation = cached_simulate_roi(roi_inputs, simulation_ranges, int(simulation_draws), simulation_distribution)
+            for row in summary_rows(simulation):
+                st.caption(f"{row['label']}: P10 {format_number_id(row['p10'], 1)} · P50 {format_number_id(row['p50'], 1)} · P90 {format_number_id(row['p90'], 1)}")
+    sensitivity = None
+    with st.expander("📐 Analisis Sensitivitas (Tornado)"):
+        sensitivity_enabled = st.checkbox("Tampilkan tornado chart", value=True, help="Setiap input digeser ±X% (input lain tetap) untuk melihat input yang paling memengaruhi hasil.")
+        if sensitivity_enabled:
+            sensitivity_pct = st.slider("Pergeseran input (±%)", 1.0, 50.0, DEFAULT_PERTURBATION_PCT, 1.0)
+            sensitivity_metric = st.selectbox("Metrik", list(SENSITIVITY_METRICS), format_func=SENSITIVITY_METRICS.get)
+            # Grid di-memo per set input, jadi rerun tanpa perubahan input tidak menghitung ulang
+            sensitivity = compute_sensitivity(roi_inputs, sensitivity_pct, sensitivity_metric)
     gdrive_parent_folder_id_input = None
     google_sheet_id_input = None
     if show_api_settings_sidebar:
@@ -309,240 +675,63 @@ with st.sidebar:
         else:
             st.info("ID Google Sheet ditemukan di Streamlit Secrets.")
     st.divider()
-    calculate_button = st.button("📊 Hitung ROI & Buat Proposal PDF")
-
-# --- Kalkulasi & Output --- 
+    calculate_button = st.button(PROPOSAL_BUTTON_LABEL)
+    if use_render_pool:
+        render_queue_status()
+
+
+# --- Kalkulasi Langsung (dihitung ulang setiap input berubah, tanpa grafik/PDF) ---
+gdrive_parent_folder_id = gdrive_parent_folder_id_secret or gdrive_parent_folder_id_input
+google_sheet_id = google_sheet_id_secret or google_sheet_id_input
+with timed("roi_compute") as roi_timer:
+    roi = compute_roi(roi_inputs)
+admin_inputs = {
+    "prospect_name": prospect_name,
+    "prospect_location": prospect_location,
+    "agent_name": agent_name,
+    "agent_email": agent_email,
+    "agent_phone": agent_phone,
+}
+# Kunci proposal: klik ulang dengan input identik memakai nomor & PDF yang sama
+proposal_key = cache_key(
+    {**admin_inputs, "simulation": simulation, "sensitivity": sensitivity, **roi_inputs},
+    namespace="proposal",
+)
+
+st.header("📈 Hasil Analisis ROI")
+render_roi_summary(roi, roi_inputs, prospect_name)
+if simulation:
+    render_simulation_summary(simulation)
+
+# --- Grafik, PDF & Cloud (hanya saat tombol diklik) ---
 if calculate_button:
-    gdrive_parent_folder_id = gdrive_parent_folder_id_secret or gdrive_parent_folder_id_input
-    google_sheet_id = google_sheet_id_secret or google_sheet_id_input
     if not agent_name or not agent_email or not agent_phone:
         st.sidebar.error("Harap isi semua informasi Agent/Marketing.")
-        st.stop()
-    if not prospect_name:
+    elif not prospect_name:
         st.sidebar.error("Harap isi Nama Prospek.")
-        st.stop()
-
-    trigger_gdrive_upload = False
-    trigger_gsheet_log = False
-    gdrive_service = None
-
-    if credentials_info:
-        if gdrive_parent_folder_id:
-            gdrive_service = get_gdrive_service(credentials_info)
-            if gdrive_service:
-                trigger_gdrive_upload = True
-        if google_sheet_id:
-            if gsheets_service:
-                trigger_gsheet_log = True
-
-    st.header("📈 Hasil Analisis ROI")
-    with st.spinner("Melakukan kalkulasi ROI..."):
-        # --- Kalkulasi Inti (sama seperti sebelumnya) ---
-        avg_annual_salary = avg_monthly_salary * 12
-        avg_annual_salary_usd = avg_annual_salary / usd_conversion_rate if usd_conversion_rate else 0
-        avg_client_value = avg_monthly_client_value * 12
-        current_annual_labor_cost_usd = cs_staff * avg_annual_salary_usd * overhead_multiplier
-        current_annual_labor_cost_idr = current_annual_labor_cost_usd * usd_conversion_rate
-        current_inquiries_per_year = monthly_inquiries * 12
-        current_handling_hours = (current_inquiries_per_year * avg_handling_time) / 60
-        automated_inquiries = current_inquiries_per_year * (automation_rate / 100)
-        remaining_manual_inquiries = current_inquiries_per_year - automated_inquiries
-        new_handling_time = avg_handling_time * (1 - handling_time_improvement / 100)
-        new_handling_hours = (remaining_manual_inquiries * new_handling_time) / 60
-        new_staff_count = round(cs_staff * (1 - staff_reduction / 100))
-        if new_handling_hours > 0 and new_staff_count == 0:
-            new_staff_count = 1
-        new_annual_labor_cost_usd = new_staff_count * avg_annual_salary_usd * overhead_multiplier
-        new_annual_labor_cost_idr = new_annual_labor_cost_usd * usd_conversion_rate
-        labor_savings_usd = current_annual_labor_cost_usd - new_annual_labor_cost_usd
-        labor_savings_idr = labor_savings_usd * usd_conversion_rate
-        new_retention_rate = min(100.0, current_retention_rate + retention_improvement)
-        avg_annual_clients = avg_monthly_clients
-        current_retained_clients = avg_annual_clients * (current_retention_rate / 100)
-        new_retained_clients = avg_annual_clients * (new_retention_rate / 100)
-        additional_retained_clients = new_retained_clients - current_retained_clients
-        retention_revenue_impact = additional_retained_clients * avg_client_value
-        total_annual_savings_usd = labor_savings_usd + retention_revenue_impact
-        total_annual_savings_idr = labor_savings_idr + (retention_revenue_impact * usd_conversion_rate)
-        first_year_net_usd = total_annual_savings_usd - implementation_cost - annual_subscription
-        subsequent_years_net_usd = total_annual_savings_usd - annual_subscription
-        total_first_year_investment = implementation_cost + annual_subscription
-        total_three_year_investment = implementation_cost + annual_subscription * 3
-        first_year_roi = (first_year_net_usd / total_first_year_investment * 100) if total_first_year_investment > 0 else float("inf")
-        three_year_net_benefit = first_year_net_usd + subsequent_years_net_usd * 2
-        three_year_roi = (three_year_net_benefit / total_three_year_investment * 100) if total_three_year_investment > 0 else float("inf")
-        monthly_savings_usd = total_annual_savings_usd / 12 if total_annual_savings_usd else 0
-        total_investment_usd = implementation_cost + annual_subscription
-        payback_period = (total_investment_usd / monthly_savings_usd) if monthly_savings_usd > 0 else float("inf")
-        years = range(1, 6)
-        costs = [(implementation_cost + annual_subscription) if year == 1 else annual_subscription for year in years]
-        benefits = [total_annual_savings_usd for _ in years]
-        net_benefits = [benefits[i] - costs[i] for i in range(len(years))]
-        cumulative_net = np.cumsum(net_benefits).tolist()
-        five_year_net_benefit = cumulative_net[-1] if cumulative_net else 0
-        five_year_projection_data = []
-        for i in range(len(years)):
-            five_year_projection_data.append({
-                "year": years[i],
-                "cost": costs[i],
-                "benefit": benefits[i],
-                "net_benefit": net_benefits[i],
-                "cumulative_net": cumulative_net[i]
-            })
-
-    st.subheader("📊 Grafik Analisis")
-    chart_buffer = io.BytesIO()
-    chart_data_uri = None
-    try:
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-        plt.style.use("seaborn-v0_8-whitegrid")
-        labels_cost = ["Saat Ini", "Dengan AI Voice"]
-        cs_costs_idr = [current_annual_labor_cost_idr, new_annual_labor_cost_idr]
-        colors_cost = ["#3A86FF", "#8338EC"]
-        bars = ax1.bar(labels_cost, cs_costs_idr, color=colors_cost)
-        ax1.set_title("Perbandingan Biaya Tahunan (IDR)", fontsize=12)
-        ax1.set_ylabel("Biaya (IDR)", fontsize=10)
-        ax1.tick_params(axis="x", labelsize=10)
-        ax1.tick_params(axis="y", labelsize=10)
-        ax1.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: format_number_id(x, 0)))
-        for bar in bars:
-            yval = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2.0, yval * 1.01, f"IDR {format_number_id(yval, 0)}", va="bottom", ha="center", fontsize=9)
-        ax2.plot(years, cumulative_net, marker="o", linewidth=2, color="#FF006E", label="Manfaat Bersih Kumulatif")
-        ax2.set_title("Manfaat Bersih Kumulatif 5 Tahun (USD)", fontsize=12)
-        ax2.set_xlabel("Tahun", fontsize=10)
-        ax2.set_ylabel("USD", fontsize=10)
-        ax2.grid(True, linestyle="--", alpha=0.6)
-        ax2.set_xticks(years)
-        ax2.tick_params(axis="x", labelsize=10)
-        ax2.tick_params(axis="y", labelsize=10)
-        ax2.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f"$ {format_number_id(x, 0)}"))
-        ax2.axhline(0, color="grey", linewidth=0.8, linestyle="--")
-        for i, value in enumerate(cumulative_net):
-             ax2.text(years[i], value, f"$ {format_number_id(value, 0)}", ha="center", va="bottom", fontsize=9)
-        plt.tight_layout(pad=2.0)
-        plt.savefig(chart_buffer, format="png", dpi=300, bbox_inches="tight")
-        plt.close(fig)
-        chart_buffer.seek(0)
-        chart_base64 = base64.b64encode(chart_buffer.read()).decode()
-        chart_data_uri = f"data:image/png;base64,{chart_base64}"
-        st.image(chart_buffer, caption="Grafik Analisis ROI", use_container_width=True)
-    except Exception as e:
-        st.error(f"Gagal membuat grafik: {e}")
-
-    st.subheader("Ringkasan Hasil Utama")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(label="ROI Tahun Pertama", value=f"{format_number_id(first_year_roi)}%")
-        st.metric(label="ROI Tiga Tahun", value=f"{format_number_id(three_year_roi)}%")
-        st.metric(label="Periode Pengembalian", value=f"{format_number_id(payback_period, 1)} bulan" if payback_period != float("inf") else "Tidak Tercapai")
-    with col2:
-        st.metric(label="Total Penghematan Tahunan (USD)", value=f"$ {format_number_id(total_annual_savings_usd)}")
-        st.metric(label="Manfaat Bersih 5 Tahun (USD)", value=f"$ {format_number_id(five_year_net_benefit)}")
-        st.metric(label="Pengurangan Staf", value=f"{cs_staff - new_staff_count} orang ({staff_reduction}%)")
-    with col3:
-        st.metric(label="Otomatisasi Pertanyaan", value=f"{format_number_id(automated_inquiries, 0)} ({automation_rate}%)")
-        st.metric(label="Peningkatan Loyalitas Klien", value=f"+{retention_improvement}% (menjadi {new_retention_rate}%)")
-        st.metric(label="Penghematan Biaya Tahunan (IDR)", value=f"Rp {format_number_id(labor_savings_idr)}")
-
-    st.subheader("📝 Kesimpulan")
-    if first_year_roi != float("inf") and first_year_roi > 50 and payback_period < 18:
-        conclusion_text = f"Implementasi Solusi AI Voice untuk {prospect_name} sangat direkomendasikan. Dengan ROI tahun pertama {format_number_id(first_year_roi)}% dan periode pengembalian hanya {format_number_id(payback_period, 1)} bulan, investasi ini menawarkan nilai finansial yang sangat signifikan dan cepat."
-    elif first_year_roi != float("inf") and first_year_roi > 0:
-        conclusion_text = f"Implementasi Solusi AI Voice untuk {prospect_name} direkomendasikan. ROI tahun pertama sebesar {format_number_id(first_year_roi)}% dan periode pengembalian {format_number_id(payback_period, 1)} bulan menunjukkan potensi pengembalian investasi yang solid dalam jangka menengah."
-    elif three_year_roi != float("inf") and three_year_roi > 0:
-         conclusion_text = f"Implementasi Solusi AI Voice untuk {prospect_name} patut dipertimbangkan. Meskipun ROI tahun pertama mungkin belum positif ({format_number_id(first_year_roi)}%), ROI tiga tahun sebesar {format_number_id(three_year_roi)}% mengindikasikan potensi keuntungan jangka panjang yang menarik."
     else:
-        conclusion_text = f"Berdasarkan data dan asumsi saat ini, ROI untuk implementasi Solusi AI Voice bagi {prospect_name} terlihat kurang menarik ({format_number_id(first_year_roi)}% ROI tahun pertama). Perlu evaluasi lebih lanjut terhadap asumsi atau potensi manfaat lain sebelum melanjutkan."
-    st.markdown(conclusion_text)
-
-    st.subheader("📄 Proposal PDF")
-    pdf_bytes = None
-    with st.spinner("Membuat file PDF proposal..."):
-        # Perbaikan: Memasukkan data yang benar ke generate_pdf
-        current_time = datetime.now() # Define current_time here
-        pdf_data = {
-            "proposal_number": next_proposal_num,
-            "analysis_date": current_time.strftime("%d %B %Y"),
-            "prospect_name": prospect_name,
-            "prospect_location": prospect_location,
-            "provider_company_name": PROVIDER_COMPANY_NAME,
-            "agent_name": agent_name,
-            "agent_email": agent_email,
-            "agent_phone": agent_phone,
-            "cs_staff": cs_staff,
-            "current_annual_labor_cost_idr": current_annual_labor_cost_idr,
-            "current_annual_labor_cost_usd": current_annual_labor_cost_usd,
-            "current_inquiries_per_year": current_inquiries_per_year,
-            "current_handling_hours": current_handling_hours,
-            "current_retention_rate": current_retention_rate,
-            "new_staff_count": new_staff_count,
-            "new_annual_labor_cost_idr": new_annual_labor_cost_idr,
-            "new_annual_labor_cost_usd": new_annual_labor_cost_usd,
-            "automated_inquiries": automated_inquiries,
-            "automation_rate": automation_rate,
-            "new_handling_hours": new_handling_hours,
-            "new_retention_rate": new_retention_rate,
-            "labor_savings_idr": labor_savings_idr,
-            "labor_savings_usd": labor_savings_usd,
-            "retention_revenue_impact": retention_revenue_impact,
-            "total_annual_savings_usd": total_annual_savings_usd,
-            "first_year_net_usd": first_year_net_usd,
-            "subsequent_years_net_usd": subsequent_years_net_usd,
-            "first_year_roi": first_year_roi,
-            "three_year_roi": three_year_roi,
-            "payback_period": payback_period,
-            "five_year_net_benefit": five_year_net_benefit,
-            "five_year_projection": five_year_projection_data,
-            "chart_path": chart_data_uri if chart_data_uri else "",
-            "avg_monthly_salary": avg_monthly_salary,
-            "overhead_multiplier": overhead_multiplier,
-            "usd_conversion_rate": usd_conversion_rate,
-            "staff_reduction": staff_reduction,
-            "retention_improvement": retention_improvement,
-            "handling_time_improvement": handling_time_improvement,
-            "conclusion_text": conclusion_text
-        }
-        pdf_bytes = generate_pdf(pdf_data)
-
-    if pdf_bytes:
-        safe_prospect_name = "".join(c for c in prospect_name if c.isalnum() or c in (" ", "_", "-")).strip()
-        safe_location = "".join(c for c in prospect_location if c.isalnum() or c in (" ", "_", "-")).strip()
-        pdf_filename = f"{next_proposal_num} {safe_prospect_name} {safe_location}.pdf"
-
-        st.download_button(
-            label="📥 Unduh PDF",
-            data=pdf_bytes,
-            file_name=pdf_filename,
-            mime="application/pdf"
+        trace = ProposalTrace()
+        trace.add(roi_timer)
+        proposal = create_proposal(
+            proposal_key, admin_inputs, roi_inputs, roi, simulation, sensitivity,
+            credentials_info, gdrive_parent_folder_id, google_sheet_id, trace, use_render_pool,
         )
-        st.success(f"Proposal PDF ({pdf_filename}) siap diunduh.")
-
-        # --- Operasi Backend (GDrive & GSheet) ---
-        gdrive_pdf_link = None
-        if trigger_gdrive_upload and gdrive_service:
-            prospect_folder_id = find_or_create_folder(gdrive_service, safe_prospect_name, gdrive_parent_folder_id)
-            if prospect_folder_id:
-                gdrive_pdf_link = upload_to_drive(gdrive_service, pdf_bytes, pdf_filename, prospect_folder_id)
-
-        # --- Log ke Google Sheet (Menampilkan error jika gagal) --- 
-        if trigger_gsheet_log and gsheets_service:
-            log_data = {
-                "proposal_number": next_proposal_num,
-                "agent_name": agent_name,
-                "agent_email": agent_email,
-                "agent_phone": agent_phone,
-                "prospect_name": prospect_name,
-                "prospect_location": prospect_location,
-                "gdrive_link": gdrive_pdf_link or "Upload Gagal/Tidak Dilakukan"
-            }
-            log_success = log_to_gsheet(gsheets_service, google_sheet_id, log_data)
-            # Pesan error sudah ditangani di dalam log_to_gsheet
-
-    else:
-        pass # Error pembuatan PDF sudah ditangani di generate_pdf
-
-else:
-    # Perbaikan: Menggunakan kutip yang benar di f-string
-    st.info("Silakan isi data di sidebar kiri dan klik tombol \"📊 Hitung ROI & Buat Proposal PDF\" untuk melihat hasil.")
-
+        if proposal:
+            st.session_state["proposal"] = proposal
+
+render_proposal_output(proposal_key)
+render_cloud_status()
+render_bulk_export(
+    {"agent_name": agent_name, "agent_email": agent_email, "agent_phone": agent_phone},
+    credentials_info, gdrive_parent_folder_id, use_render_pool,
+)
+if SCENARIO_DASHBOARD_ENABLED or secrets.get("show_scenario_dashboard", False):
+    render_scenario_dashboard()
+if METRICS_PANEL_ENABLED or secrets.get("show_metrics_panel", False):
+    render_metrics_panel()
+
+# --- Endpoint /metrics Prometheus (hanya jika ROI_METRICS_PORT diset) ---
+start_metrics_server()
+
+# --- Warm-up renderer PDF/grafik di background setelah halaman pertama tampil ---
+start_background_warmup()
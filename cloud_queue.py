@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Antrian background untuk efek samping cloud setelah PDF jadi:
+cari/buat folder Drive, unggah PDF, lalu catat ke Google Sheets.
+Pekerjaan dijalankan di thread pool dengan konkurensi terbatas dan retry
+exponential backoff untuk HttpError 429/5xx, sehingga thread skrip
+Streamlit tidak menunggu round trip Google.
+"""
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from google_services import (
+    build_drive_service, build_sheets_service, call_with_retry, find_or_create_folder, upload_to_drive, log_to_gsheet,
+)
+from sheet_log_buffer import get_sheet_log_buffer
+from drive_folder_index import get_drive_folder_index
+from metrics import timed
+
+# --- Konfigurasi ---
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_RETRIES = 5
+UPLOAD_FAILED_LINK = "Upload Gagal/Tidak Dilakukan"
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class CloudJob:
+    """Status satu pekerjaan upload + log yang dapat dibaca dari thread UI."""
+
+    def __init__(self, proposal_number, filename, trace=None):
+        self.proposal_number = proposal_number
+        self.filename = filename
+        self.trace = trace
+        self.created_at = datetime.now()
+        self.state = "antri"
+        self.gdrive_link = None
+        self.logged = False
+        self.errors = []
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Menunggu pekerjaan selesai (dipakai di CLI/pengujian)."""
+        return self._done.wait(timeout)
+
+
+class CloudQueue:
+    """Thread pool berukuran tetap untuk upload Drive dan log Sheets.
+
+    Service Drive/Sheets diambil dari pool client per proses di google_services
+    (aman dipakai lintas thread). Untuk pengujian, `service_factory(credentials_info)`
+    dapat mengembalikan tuple (drive_service, sheets_service) palsu (lihat google_fakes.py).
+
+    Jika `log_sink` (mis. SheetLogBuffer) diberikan, baris log dititipkan ke
+    sink tersebut untuk dikirim batch, bukan di-append satu per satu. Jika
+    `folder_index` (DriveFolderIndex) diberikan, ID folder prospek diambil
+    dari indeks tersebut alih-alih query Drive setiap upload.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, retries=DEFAULT_RETRIES, base_delay=1.0, sleep=None,
+                 log_sink=None, folder_index=None, service_factory=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cloud-queue")
+        self.log_sink = log_sink
+        self.folder_index = folder_index
+        self.service_factory = service_factory
+        self.retry_options = {"retries": retries, "base_delay": base_delay}
+        if sleep is not None:
+            self.retry_options["sleep"] = sleep
+
+    def _services(self, credentials_info):
+        if self.service_factory is not None:
+            return self.service_factory(credentials_info)
+        return build_drive_service(credentials_info), build_sheets_service(credentials_info)
+
+    def submit(self, credentials_info, pdf_bytes, filename, folder_name, parent_folder_id, sheet_id, log_data, trace=None):
+        """Menjadwalkan upload (jika parent_folder_id ada) lalu log (jika sheet_id ada). Return CloudJob.
+        `trace` (metrics.ProposalTrace) dilengkapi tahap cloud lalu ditutup saat pekerjaan selesai.
+        """
+        job = CloudJob(log_data.get("proposal_number", ""), filename, trace)
+        self._executor.submit(self._run, job, credentials_info, pdf_bytes, filename, folder_name,
+                              parent_folder_id, sheet_id, dict(log_data))
+        return job
+
+    def _run(self, job, credentials_info, pdf_bytes, filename, folder_name, parent_folder_id, sheet_id, log_data):
+        try:
+            drive_service, sheets_service = self._services(credentials_info)
+            if parent_folder_id and drive_service is not None:
+                job.state = "mengunggah"
+                try:
+                    job.gdrive_link = self._upload(drive_service, pdf_bytes, filename, folder_name, parent_folder_id, job.trace)
+                except Exception as e:
+                    job.errors.append(f"Upload Google Drive gagal: {e}")
+            if sheet_id and sheets_service is not None:
+                job.state = "mencatat"
+                log_data["gdrive_link"] = job.gdrive_link or UPLOAD_FAILED_LINK
+                try:
+                    if self.log_sink is not None:
+                        # Durasi kirim batch dicatat buffer saat flush (tahap sheets_log)
+                        self.log_sink.add(sheet_id, log_data)
+                    else:
+                        with timed("sheets_log", job.trace):
+                            call_with_retry(log_to_gsheet, sheets_service, sheet_id, log_data, **self.retry_options)
+                    job.logged = True
+                except Exception as e:
+                    job.errors.append(f"Log Google Sheets gagal: {e}")
+            job.state = "gagal" if job.errors else "selesai"
+        except Exception as e:
+            job.errors.append(f"Error umum: {e}")
+            job.state = "gagal"
+        finally:
+            job._done.set()
+            if job.trace is not None:
+                job.trace.finish(cloud_state=job.state, logged=job.logged, errors=len(job.errors))
+
+    def _upload(self, drive_service, pdf_bytes, filename, folder_name, parent_folder_id, trace=None):
+        """Upload ke folder prospek. ID dari indeks divalidasi lazy: 404 -> buang entri, cari/buat ulang sekali."""
+        from googleapiclient.errors import HttpError
+
+        resolve_folder = self.folder_index.get_or_create if self.folder_index is not None else find_or_create_folder
+
+        def resolve():
+            with timed("drive_folder_lookup", trace):
+                return call_with_retry(resolve_folder, drive_service, folder_name, parent_folder_id, **self.retry_options)
+
+        def upload(folder_id):
+            with timed("drive_upload", trace) as timer:
+                # Bukan call_with_retry: files().create tidak idempoten; hanya chunk upload yang di-retry
+                link = upload_to_drive(drive_service, pdf_bytes, filename, folder_id, **self.retry_options)
+                timer.bytes = len(pdf_bytes)
+                return link
+
+        try:
+            return upload(resolve())
+        except HttpError as e:
+            if self.folder_index is None or getattr(e.resp, "status", None) != 404:
+                raise
+            self.folder_index.invalidate(parent_folder_id, folder_name)
+            return upload(resolve())
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def get_cloud_queue():
+    """Antrian tunggal per proses, dipakai bersama semua sesi Streamlit.
+    Log Sheets dikirim lewat buffer batch (sheet_log_buffer) dan ID folder
+    prospek diambil dari indeks folder Drive (drive_folder_index).
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = CloudQueue(log_sink=get_sheet_log_buffer(), folder_index=get_drive_folder_index())
+    return _queue
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Indeks persisten nama prospek (sudah disanitasi) -> ID folder Google Drive
+di bawah gdrive_parent_folder_id. Indeks dihangatkan dengan satu listing
+berhalaman dari folder induk, sehingga proposal ulang untuk broker yang sama
+tidak perlu query files().list lagi. ID yang tersimpan divalidasi secara lazy
+(dibuang jika upload ke folder itu gagal 404), dan pembuatan folder baru
+dilindungi lock per nama agar upload paralel tidak membuat folder ganda.
+"""
+import time
+import threading
+
+from storage import data_path, sqlite_connection
+from google_services import FOLDER_MIME_TYPE, safe_folder_name, find_or_create_folder
+
+# --- Konfigurasi ---
+DEFAULT_DB_FILENAME = "drive_folder_index.sqlite3"
+LIST_PAGE_SIZE = 1000
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class DriveFolderIndex:
+    """Cache ID folder prospek per folder induk, disimpan di SQLite lokal."""
+
+    def __init__(self, path=None):
+        self.path = path or data_path(DEFAULT_DB_FILENAME)
+        self._name_locks = {}
+        self._name_locks_guard = threading.Lock()
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS drive_folders ("
+                "parent_id TEXT NOT NULL, name TEXT NOT NULL, folder_id TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (parent_id, name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS drive_parents (parent_id TEXT PRIMARY KEY, warmed_at REAL NOT NULL)"
+            )
+
+    def _name_lock(self, parent_folder_id, name):
+        with self._name_locks_guard:
+            return self._name_locks.setdefault((parent_folder_id, name), threading.Lock())
+
+    def lookup(self, parent_folder_id, folder_name):
+        """ID folder dari indeks, atau None."""
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT folder_id FROM drive_folders WHERE parent_id = ? AND name = ?",
+                (parent_folder_id, safe_folder_name(folder_name)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _remember(self, parent_folder_id, name, folder_id):
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO drive_folders (parent_id, name, folder_id, updated_at) VALUES (?, ?, ?, ?)",
+                (parent_folder_id, name, folder_id, time.time()),
+            )
+
+    def invalidate(self, parent_folder_id, folder_name):
+        """Membuang entri (mis. folder sudah dihapus dari Drive)."""
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "DELETE FROM drive_folders WHERE parent_id = ? AND name = ?",
+                (parent_folder_id, safe_folder_name(folder_name)),
+            )
+
+    def is_warm(self, parent_folder_id):
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute("SELECT 1 FROM drive_parents WHERE parent_id = ?", (parent_folder_id,)).fetchone()
+        return row is not None
+
+    def warm(self, service, parent_folder_id):
+        """Mengisi indeks dari semua subfolder folder induk (satu listing berhalaman). Return jumlah folder."""
+        query = f"'{parent_folder_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
+        folders = {}
+        page_token = None
+        while True:
+            response = service.files().list(
+                q=query, spaces="drive", fields="nextPageToken, files(id, name)",
+                pageSize=LIST_PAGE_SIZE, pageToken=page_token,
+            ).execute()
+            for folder in response.get("files", []):
+                # Jika ada nama ganda, pertahankan yang pertama (sama dengan find_or_create_folder)
+                folders.setdefault(folder["name"], folder["id"])
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO drive_folders (parent_id, name, folder_id, updated_at) VALUES (?, ?, ?, ?)",
+                [(parent_folder_id, name, folder_id, now) for name, folder_id in folders.items()],
+            )
+            conn.execute("INSERT OR REPLACE INTO drive_parents (parent_id, warmed_at) VALUES (?, ?)", (parent_folder_id, now))
+        return len(folders)
+
+    def get_or_create(self, service, folder_name, parent_folder_id):
+        """ID folder prospek: dari indeks jika ada, jika tidak cari/buat di Drive tepat sekali."""
+        if not self.is_warm(parent_folder_id):
+            self.warm(service, parent_folder_id)
+        name = safe_folder_name(folder_name)
+        folder_id = self.lookup(parent_folder_id, name)
+        if folder_id:
+            return folder_id
+        with self._name_lock(parent_folder_id, name):
+            # Cek ulang: thread lain mungkin baru saja membuat folder ini
+            folder_id = self.lookup(parent_folder_id, name)
+            if folder_id:
+                return folder_id
+            folder_id = find_or_create_folder(service, name, parent_folder_id)
+            self._remember(parent_folder_id, name, folder_id)
+        return folder_id
+
+
+def get_drive_folder_index():
+    """Indeks tunggal per proses."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DriveFolderIndex()
+    return _index
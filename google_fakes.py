@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Tiruan in-process untuk service Google Drive v3 dan Sheets v4 yang dipakai
+aplikasi ini. Berguna untuk pengembangan lokal tanpa kredensial, benchmark,
+dan pengujian antrian cloud. Hanya subset API yang dipakai yang ditiru.
+"""
+import re
+import threading
+import itertools
+from googleapiclient.errors import HttpError
+
+
+class FakeResponse(dict):
+    """Objek resp minimal untuk HttpError (status + reason)."""
+
+    def __init__(self, status, reason=""):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = reason
+
+
+def make_http_error(status, reason="Fake error"):
+    return HttpError(FakeResponse(status, reason), reason.encode("utf-8"))
+
+
+class _Request:
+    """Request yang dieksekusi dengan execute() atau next_chunk() (upload resumable)."""
+
+    def __init__(self, service, func):
+        self._service = service
+        self._func = func
+
+    def execute(self):
+        self._service._before_call()
+        return self._func()
+
+    def next_chunk(self):
+        return None, self.execute()
+
+
+class _FakeBase:
+    def __init__(self, latency=0.0, sleep=None):
+        self._lock = threading.Lock()
+        self._failures = []
+        self.latency = latency
+        self._sleep = sleep
+        self.calls = 0
+
+    def fail_next(self, status=503, count=1):
+        """Membuat `count` panggilan berikutnya gagal dengan HttpError `status`."""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def _before_call(self):
+        with self._lock:
+            self.calls += 1
+            status = self._failures.pop(0) if self._failures else None
+        if self.latency and self._sleep:
+            self._sleep(self.latency)
+        if status is not None:
+            raise make_http_error(status)
+
+
+class FakeDriveService(_FakeBase):
+    """Tiruan drive v3: files().list / files().create (folder dan upload)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.files_by_id = {}
+        self._ids = itertools.count(1)
+
+    def files(self):
+        return self
+
+    def list(self, q="", spaces=None, fields=None, pageSize=None, pageToken=None):
+        def run():
+            name = re.search(r"name='((?:[^'\\]|\\.)*)'", q)
+            parent = re.search(r"'([^']+)' in parents", q)
+            with self._lock:
+                matches = [
+                    {"id": file_id, "name": f["name"]}
+                    for file_id, f in self.files_by_id.items()
+                    if (name is None or f["name"] == name.group(1))
+                    and (parent is None or parent.group(1) in f["parents"])
+                    and ("mimeType='application/vnd.google-apps.folder'" not in q or f["mimeType"] == "application/vnd.google-apps.folder")
+                ]
+            return {"files": matches}
+        return _Request(self, run)
+
+    def create(self, body=None, media_body=None, fields=None):
+        def run():
+            with self._lock:
+                # Seperti Drive: parent berupa file palsu yang sudah dihapus -> 404
+                missing = [p for p in body.get("parents", []) if p.startswith("fake-") and p not in self.files_by_id]
+                if missing:
+                    raise make_http_error(404)
+                file_id = f"fake-{next(self._ids)}"
+                self.files_by_id[file_id] = {
+                    "name": body.get("name"),
+                    "mimeType": body.get("mimeType", "application/pdf"),
+                    "parents": list(body.get("parents", [])),
+                    "size": media_body.size() if media_body is not None else 0,
+                }
+            return {"id": file_id, "webViewLink": f"https://drive.google.com/file/d/{file_id}/view"}
+        return _Request(self, run)
+
+
+class FakeSheetsService(_FakeBase):
+    """Tiruan sheets v4: spreadsheets().values().get / append."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = [["Timestamp", "Nomor Proposal"]]  # Baris header
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId=None, range=None):
+        def run():
+            column = re.search(r"!([A-Z]+)\d*:", range or "")
+            index = ord(column.group(1)[0]) - ord("A") if column else 0
+            with self._lock:
+                values = [[row[index]] if len(row) > index else [] for row in self.rows[1:]]
+            return {"values": values}
+        return _Request(self, run)
+
+    def append(self, spreadsheetId=None, range=None, valueInputOption=None, insertDataOption=None, body=None):
+        def run():
+            with self._lock:
+                self.rows.extend(list(row) for row in body.get("values", []))
+            return {"updates": {"updatedRows": len(body.get("values", []))}}
+        return _Request(self, run)
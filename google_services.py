@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Operasi Google Drive & Sheets tanpa ketergantungan pada Streamlit.
+Fungsi di sini melempar HttpError apa adanya agar pemanggil (antrian
+background, CLI) dapat melakukan retry dan menampilkan status sendiri.
+Library Google API (discovery, oauth2, httplib2) baru di-import saat
+pertama dipakai agar start aplikasi tanpa kredensial tetap ringan.
+"""
+import io
+import json
+import time
+import base64
+import random
+import threading
+import functools
+from datetime import datetime
+
+# --- Konfigurasi ---
+SCOPES = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
+LOG_SHEET_NAME = "Log Proposal" # Nama sheet/tab di dalam Google Sheet
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+DEFAULT_FOLDER_NAME = "Prospek Tanpa Nama"
+# Ukuran chunk upload resumable untuk file besar (kelipatan 256 KB sesuai syarat Drive)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Status HTTP yang layak dicoba ulang (kuota/rate limit dan error server)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+REQUIRED_CREDENTIAL_KEYS = ("type", "project_id", "private_key_id", "private_key", "client_email", "client_id", "auth_uri", "token_uri")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+# --- Kredensial ---
+@functools.lru_cache(maxsize=8)
+def decode_credentials_b64(b64_str):
+    """Decode secret Base64 berisi JSON Service Account (di-cache; jangan ubah dict hasilnya)."""
+    return json.loads(base64.b64decode(b64_str).decode("utf-8"))
+
+@functools.lru_cache(maxsize=8)
+def parse_credentials_json(json_str):
+    """Parse JSON Service Account (di-cache; jangan ubah dict hasilnya)."""
+    return json.loads(json_str)
+
+def credentials_key(credentials_info):
+    """Kunci identitas kredensial untuk pooling client."""
+    return (credentials_info.get("client_email"), credentials_info.get("private_key_id"))
+
+# --- Service (pool per proses) ---
+def _thread_local_request_builder(credentials):
+    """requestBuilder yang memberi setiap thread transport httplib2 sendiri.
+    httplib2.Http tidak thread-safe, sedangkan objek credentials (dan token
+    OAuth-nya) dipakai bersama sehingga refresh hanya terjadi saat token kedaluwarsa.
+    """
+    import httplib2
+    import google_auth_httplib2
+    from googleapiclient.http import HttpRequest
+
+    local = threading.local()
+
+    def build_request(http, *args, **kwargs):
+        authed_http = getattr(local, "http", None)
+        if authed_http is None:
+            authed_http = local.http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        return HttpRequest(authed_http, *args, **kwargs)
+
+    return build_request
+
+def _pooled_client(credentials_info, api, version):
+    key = credentials_key(credentials_info) + (api, version)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import httplib2
+                import google_auth_httplib2
+                from google.oauth2 import service_account
+                from googleapiclient.discovery import build
+
+                creds_key = credentials_key(credentials_info) + ("credentials",)
+                credentials = _clients.get(creds_key)
+                if credentials is None:
+                    credentials = service_account.Credentials.from_service_account_info(credentials_info, scopes=SCOPES)
+                    _clients[creds_key] = credentials
+                # static_discovery memakai dokumen discovery bawaan paket (tanpa request jaringan)
+                client = build(
+                    api, version,
+                    http=google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http()),
+                    requestBuilder=_thread_local_request_builder(credentials),
+                    static_discovery=True,
+                    cache_discovery=False,
+                )
+                _clients[key] = client
+    return client
+
+def build_drive_service(credentials_info):
+    """Service Google Drive v3 bersama per proses (aman dipakai lintas thread)."""
+    return _pooled_client(credentials_info, "drive", "v3")
+
+def build_sheets_service(credentials_info):
+    """Service Google Sheets v4 bersama per proses (aman dipakai lintas thread)."""
+    return _pooled_client(credentials_info, "sheets", "v4")
+
+# --- Retry ---
+def is_retryable(error):
+    """True jika HttpError bersifat sementara (429/5xx)."""
+    status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        return int(status) in RETRYABLE_STATUSES
+    except (TypeError, ValueError):
+        return False
+
+def call_with_retry(func, *args, retries=5, base_delay=1.0, max_delay=32.0, sleep=time.sleep, **kwargs):
+    """Memanggil func dengan exponential backoff (+ jitter) untuk HttpError 429/5xx."""
+    from googleapiclient.errors import HttpError
+
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except HttpError as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            sleep(delay + random.uniform(0, delay / 2))
+            attempt += 1
+
+# --- Google Drive ---
+def safe_folder_name(folder_name):
+    """Nama folder prospek yang aman untuk query Drive."""
+    safe_name = "".join(c for c in folder_name if c.isalnum() or c in (" ", "_", "-")).strip()
+    return safe_name or DEFAULT_FOLDER_NAME
+
+def find_or_create_folder(service, folder_name, parent_folder_id):
+    """Mencari/membuat folder prospek di Google Drive. Return folder ID."""
+    safe_name = safe_folder_name(folder_name)
+    query = f"name='{safe_name}' and mimeType='{FOLDER_MIME_TYPE}' and '{parent_folder_id}' in parents and trashed=false"
+    response = service.files().list(q=query, spaces="drive", fields="files(id, name)").execute()
+    folders = response.get("files", [])
+    if folders:
+        return folders[0].get("id")
+    file_metadata = {"name": safe_name, "mimeType": FOLDER_MIME_TYPE, "parents": [parent_folder_id]}
+    folder = service.files().create(body=file_metadata, fields="id").execute()
+    return folder.get("id")
+
+def upload_to_drive(service, pdf_bytes, filename, prospect_folder_id, **retry_options):
+    """Mengunggah file PDF ke Google Drive (resumable). Return webViewLink.
+    Hanya next_chunk yang di-retry (melanjutkan sesi upload yang sama), sehingga
+    timeout setelah Drive menyimpan file tidak membuat file duplikat.
+    """
+    return upload_file_to_drive(service, io.BytesIO(pdf_bytes), filename, prospect_folder_id, "application/pdf",
+                                **retry_options)
+
+def upload_file_to_drive(service, fileobj, filename, folder_id, mimetype, chunk_size=UPLOAD_CHUNK_SIZE,
+                         progress=None, **retry_options):
+    """Mengunggah file object (mis. arsip ZIP di disk) per chunk secara resumable. Return webViewLink.
+    Setiap chunk di-retry sendiri (429/5xx) dan melanjutkan dari byte terakhir yang diterima Drive;
+    isi file tidak pernah dimuat utuh ke memori. `progress(rasio)` dipanggil setelah setiap chunk.
+    """
+    from googleapiclient.http import MediaIoBaseUpload
+
+    fileobj.seek(0)
+    file_metadata = {"name": filename, "parents": [folder_id]}
+    media = MediaIoBaseUpload(fileobj, mimetype=mimetype, chunksize=chunk_size, resumable=True)
+    request = service.files().create(body=file_metadata, media_body=media, fields="id, webViewLink")
+    response = None
+    while response is None:
+        status, response = call_with_retry(request.next_chunk, **retry_options)
+        if status is not None and progress is not None:
+            progress(status.progress())
+    if progress is not None:
+        progress(1.0)
+    return response.get("webViewLink")
+
+# --- Google Sheets ---
+def build_log_row(log_data, logged_at=None):
+    """Menyusun satu baris log proposal sesuai kolom sheet Log Proposal."""
+    logged_at = logged_at or datetime.now()
+    agent_phone = log_data.get("agent_phone", "")
+    return [
+        logged_at.strftime("%Y-%m-%d %H:%M:%S"),
+        log_data.get("proposal_number", ""),
+        log_data.get("agent_name", ""),
+        log_data.get("agent_email", ""),
+        f"'{agent_phone}" if str(agent_phone).startswith("0") else agent_phone, # Add prefix ' if starts with 0
+        log_data.get("prospect_name", ""),
+        log_data.get("prospect_location", ""),
+        log_data.get("gdrive_link", "")
+    ]
+
+def append_log_rows(service, sheet_id, rows):
+    """Menambahkan baris ke sheet Log Proposal dalam satu panggilan append."""
+    body = {"values": rows}
+    return service.spreadsheets().values().append(
+        spreadsheetId=sheet_id,
+        range=f"{LOG_SHEET_NAME}!A1",
+        valueInputOption="USER_ENTERED",
+        insertDataOption="INSERT_ROWS",
+        body=body).execute()
+
+def log_to_gsheet(service, sheet_id, log_data):
+    """Mencatat satu proposal ke Google Sheet."""
+    return append_log_rows(service, sheet_id, [build_log_row(log_data)])
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentasi per tahap pipeline proposal (kredensial, nomor dari Sheets,
+kalkulasi ROI, grafik, PDF, folder Drive, upload, log Sheets).
+Durasi, ukuran byte (PNG/PDF) dan jumlah hasil (ok/error) dikumpulkan di
+registry per proses, diekspor dalam format teks Prometheus (opsional lewat
+HTTP di ROI_METRICS_PORT) dan sebagai satu baris log JSON per proposal.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# --- Konfigurasi ---
+STAGES = (
+    "credential_load",
+    "sheets_number_fetch",
+    "roi_compute",
+    "render_queue_wait",
+    "chart_render",
+    "pdf_render",
+    "drive_folder_lookup",
+    "drive_upload",
+    "sheets_log",
+)
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 500  # Jumlah durasi terakhir per tahap untuk p50/p95
+METRICS_PORT = os.environ.get("ROI_METRICS_PORT")  # Kosong = endpoint HTTP tidak dijalankan
+JSON_LOG_ENABLED = os.environ.get("ROI_METRICS_JSON_LOG", "1") != "0"
+
+_registry = None
+_registry_lock = threading.Lock()
+_server = None
+_server_lock = threading.Lock()
+_logger = logging.getLogger("roi.metrics")
+
+
+class StageTimer:
+    """Hasil satu pengukuran; isi `bytes` atau ubah `outcome` di dalam blok timed()."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.seconds = 0.0
+        self.bytes = None
+        self.outcome = "ok"
+
+
+class MetricsRegistry:
+    """Agregat metrik per tahap yang aman dipakai lintas thread."""
+
+    def __init__(self, recent_samples=RECENT_SAMPLES):
+        self._lock = threading.Lock()
+        self._bucket_counts = defaultdict(lambda: [0] * len(HISTOGRAM_BUCKETS))
+        self._duration_sum = defaultdict(float)
+        self._duration_count = defaultdict(int)
+        self._outcomes = defaultdict(int)  # (stage, outcome) -> jumlah
+        self._bytes = defaultdict(int)
+        self._recent = defaultdict(lambda: deque(maxlen=recent_samples))
+
+    def record(self, stage, seconds, outcome="ok", nbytes=None):
+        with self._lock:
+            buckets = self._bucket_counts[stage]
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self._duration_sum[stage] += seconds
+            self._duration_count[stage] += 1
+            self._outcomes[(stage, outcome)] += 1
+            if nbytes:
+                self._bytes[stage] += nbytes
+            self._recent[stage].append(seconds)
+
+    @contextmanager
+    def timed(self, stage, trace=None):
+        """Mengukur blok sebagai satu eksekusi `stage`; exception dicatat sebagai outcome error lalu dilempar ulang."""
+        timer = StageTimer(stage)
+        start = time.perf_counter()
+        try:
+            yield timer
+        except BaseException:
+            timer.outcome = "error"
+            raise
+        finally:
+            timer.seconds = time.perf_counter() - start
+            self.record(stage, timer.seconds, timer.outcome, timer.bytes)
+            if trace is not None:
+                trace.add(timer)
+
+    def summary(self):
+        """Ringkasan per tahap untuk panel admin: jumlah, error, p50/p95 (ms) dari sampel terakhir, rata-rata byte."""
+        with self._lock:
+            stages = [s for s in STAGES if s in self._duration_count] + sorted(set(self._duration_count) - set(STAGES))
+            rows = []
+            for stage in stages:
+                recent = np.asarray(self._recent[stage]) * 1000
+                count = self._duration_count[stage]
+                rows.append({
+                    "stage": stage,
+                    "count": count,
+                    "errors": sum(n for (s, outcome), n in self._outcomes.items() if s == stage and outcome == "error"),
+                    "p50_ms": float(np.percentile(recent, 50)) if recent.size else None,
+                    "p95_ms": float(np.percentile(recent, 95)) if recent.size else None,
+                    "avg_bytes": self._bytes[stage] / count if self._bytes.get(stage) else None,
+                })
+        return rows
+
+    def prometheus_text(self):
+        """Semua metrik dalam format eksposisi teks Prometheus 0.0.4."""
+        lines = [
+            "# HELP roi_stage_duration_seconds Durasi tahap pipeline proposal.",
+            "# TYPE roi_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self._duration_count):
+                for bound, count in zip(HISTOGRAM_BUCKETS, self._bucket_counts[stage]):
+                    lines.append(f'roi_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'roi_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {self._duration_count[stage]}')
+                lines.append(f'roi_stage_duration_seconds_sum{{stage="{stage}"}} {self._duration_sum[stage]:.6f}')
+                lines.append(f'roi_stage_duration_seconds_count{{stage="{stage}"}} {self._duration_count[stage]}')
+            lines += ["# HELP roi_stage_total Jumlah eksekusi tahap per hasil.", "# TYPE roi_stage_total counter"]
+            for (stage, outcome), count in sorted(self._outcomes.items()):
+                lines.append(f'roi_stage_total{{stage="{stage}",outcome="{outcome}"}} {count}')
+            lines += ["# HELP roi_stage_bytes_total Total byte keluaran tahap (PNG, PDF, upload).", "# TYPE roi_stage_bytes_total counter"]
+            for stage, nbytes in sorted(self._bytes.items()):
+                lines.append(f'roi_stage_bytes_total{{stage="{stage}"}} {nbytes}')
+        return "\n".join(lines) + "\n"
+
+
+class ProposalTrace:
+    """Kumpulan pengukuran satu proposal; finish() menulis satu baris log JSON (sekali saja)."""
+
+    def __init__(self, proposal_number=None):
+        self.proposal_number = proposal_number
+        self.started_at = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def add(self, timer):
+        with self._lock:
+            entry = self.stages.setdefault(timer.stage, {"ms": 0.0, "count": 0, "outcome": "ok"})
+            entry["ms"] += timer.seconds * 1000
+            entry["count"] += 1
+            if timer.bytes:
+                entry["bytes"] = entry.get("bytes", 0) + timer.bytes
+            if timer.outcome != "ok":
+                entry["outcome"] = timer.outcome
+
+    def finish(self, **fields):
+        """Menulis baris log JSON proposal. Panggilan kedua diabaikan."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            record = {
+                "event": "proposal",
+                "proposal_number": self.proposal_number,
+                "started_at": round(self.started_at, 3),
+                "total_ms": round((time.time() - self.started_at) * 1000, 1),
+                "stages": {name: {k: round(v, 1) if isinstance(v, float) else v for k, v in entry.items()}
+                           for name, entry in self.stages.items()},
+                **fields,
+            }
+        if JSON_LOG_ENABLED:
+            _json_logger().info(json.dumps(record, ensure_ascii=False))
+
+
+def _json_logger():
+    """Logger baris JSON ke stderr (tidak bergantung pada konfigurasi logging Streamlit)."""
+    if not _logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+    return _logger
+
+
+def get_metrics():
+    """Registry tunggal per proses."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def timed(stage, trace=None):
+    """Singkatan get_metrics().timed(stage, trace)."""
+    return get_metrics().timed(stage, trace)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrape berkala tidak perlu masuk log
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Menjalankan endpoint /metrics sekali per proses. Return server, atau None jika port tidak diset/terpakai."""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                _logger.warning("Endpoint metrik di port %s tidak bisa dijalankan: %s", port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Format angka Indonesia (titik pemisah ribuan, koma desimal) tanpa locale.
+format_number_id untuk satu nilai (metrik, sel template, label grafik) dan
+format_array_id untuk seluruh array/kolom sekaligus (tabel, ekspor CSV):
+satu str.format atas template gabungan, lalu pemisah ditukar sekali untuk
+seluruh teks. Nilai tak hingga/NaN menjadi "N/A"; -0 hasil pembulatan
+ditampilkan tanpa tanda minus.
+"""
+import functools
+
+import numpy as np
+
+# --- Konfigurasi ---
+NOT_AVAILABLE = "N/A"
+ARRAY_CHUNK = 65_536  # Nilai per str.format pada format_array_id (membatasi memori sementara)
+
+_NUMBER_TYPES = (int, float, np.integer, np.floating)
+
+
+def _format_spec(precision):
+    """Spec format per presisi; "_" sebagai pemisah ribuan sementara (ditukar ke titik)."""
+    return f"_.{int(precision)}f"
+
+
+# Spec presisi umum dibuat sekali; presisi lain dibuat saat dipakai
+_SPECS = {precision: _format_spec(precision) for precision in range(7)}
+
+
+@functools.lru_cache(maxsize=32)
+def _template(precision, count):
+    """Template str.format gabungan untuk `count` nilai (dipakai ulang antar chunk)."""
+    return ("{:" + _format_spec(precision) + "}\n") * count
+
+
+def _to_id(text):
+    return text.replace(".", ",").replace("_", ".")
+
+
+def _is_negative_zero(text):
+    return text[0] == "-" and not text.strip("-0.,_")
+
+
+def format_number_id(value, precision=2):
+    """Format angka ke format Indonesia (manual, tanpa locale).
+    Memastikan titik sebagai pemisah ribuan dan koma sebagai desimal.
+    Nilai non-angka dikembalikan sebagai str(value).
+
+    >>> format_number_id(1234567.891)
+    '1.234.567,89'
+    >>> format_number_id(-0.0), format_number_id(-0.004), format_number_id(-0.0, 0)
+    ('0,00', '0,00', '0')
+    """
+    if not isinstance(value, _NUMBER_TYPES):
+        return str(value)
+    try:
+        text = format(value, _SPECS.get(precision) or _format_spec(precision))
+    except (TypeError, ValueError, OverflowError):
+        return str(value)
+    if text[-1] in "fn":  # inf, -inf, nan
+        return NOT_AVAILABLE
+    if _is_negative_zero(text):
+        text = text[1:]
+    return _to_id(text)
+
+
+def format_array_id(values, precision=2):
+    """Format seluruh array/kolom (list, ndarray, pandas Series) sekaligus.
+    Return ndarray object berisi str dengan bentuk yang sama seperti input;
+    hasil per elemen identik dengan format_number_id.
+
+    >>> format_array_id([-0.0, -0.004, -1.5, float("nan")], 1).tolist()
+    ['0,0', '0,0', '-1,5', 'N/A']
+    """
+    array = np.asarray(values)
+    if array.dtype.kind not in "iuf":
+        array = np.asarray(values, dtype=object)  # Campuran tipe: format per elemen tanpa konversi ke str
+        out = np.array([format_number_id(v, precision) for v in array.ravel().tolist()], dtype=object)
+        return out.reshape(array.shape)
+
+    flat = array.ravel()
+    out = np.full(flat.shape, NOT_AVAILABLE, dtype=object)
+    finite = np.isfinite(flat) if array.dtype.kind == "f" else np.ones(flat.shape, dtype=bool)
+    positions = np.flatnonzero(finite)
+    for start in range(0, positions.size, ARRAY_CHUNK):
+        chunk = positions[start:start + ARRAY_CHUNK]
+        numbers = flat[chunk].tolist()
+        out[chunk] = _to_id(_template(precision, len(numbers)).format(*numbers)).split("\n")[:-1]
+    # Hanya nilai bertanda minus di atas -1 (termasuk -0.0) yang dapat dibulatkan menjadi -0
+    for i in np.flatnonzero(np.signbit(flat) & (flat > -1)):
+        if _is_negative_zero(out[i]):
+            out[i] = out[i][1:]
+    return out.reshape(array.shape)
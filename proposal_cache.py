@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Cache berbasis isi (content-addressed) untuk grafik PNG dan PDF proposal.
+Klik berulang dengan input yang sama tidak perlu merender ulang matplotlib
+dan WeasyPrint. Cache dibatasi ukuran byte dengan eviksi LRU, dan opsional
+disimpan di folder lokal agar tetap ada setelah worker restart.
+Parameter `run` menentukan tempat render saat cache miss: default langsung di
+thread pemanggil, atau mis. render_pool.RenderPool.run (pool proses bersama).
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from proposal_pdf import SCRIPT_DIR, TEMPLATE_NAME, render_pdf
+from roi_charts import PDF_DPI, render_roi_chart, render_fan_chart, render_tornado_chart
+
+# --- Konfigurasi ---
+DEFAULT_MAX_BYTES = int(float(os.environ.get("ROI_PDF_CACHE_MAX_MB", "64")) * 1024 * 1024)
+DEFAULT_DISK_DIR = os.environ.get("ROI_PDF_CACHE_DIR") or None
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _json_default(value):
+    """Normalisasi nilai non-JSON (array/skalar NumPy, dsb.) sebelum di-hash."""
+    # tolist dulu: ndarray multi-elemen tidak bisa .item(); skalar NumPy juga punya tolist
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def cache_key(data, namespace="", exclude=()):
+    """Hash SHA-256 dari dict yang dinormalisasi (urutan key tidak berpengaruh)."""
+    normalized = {k: v for k, v in data.items() if k not in exclude}
+    payload = json.dumps(normalized, sort_keys=True, default=_json_default, ensure_ascii=False)
+    return hashlib.sha256(f"{namespace}\n{payload}".encode("utf-8")).hexdigest()
+
+
+class ProposalCache:
+    """Cache LRU bytes dengan batas ukuran total, opsional dengan salinan di disk."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=DEFAULT_DISK_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.bin")
+
+    def get(self, key):
+        """Mengembalikan bytes untuk key, atau None jika tidak ada."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        """Menyimpan bytes; entri yang lebih besar dari batas cache diabaikan."""
+        if value is None or len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._store(key, value)
+        self._write_disk(key, value)
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)  # Tandai baru dipakai untuk eviksi LRU di disk
+            return value
+        except OSError:
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _prune_disk(self):
+        """Menghapus file tertua (mtime) hingga total ukuran folder di bawah batas."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".bin"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def get_proposal_cache():
+    """Cache tunggal per proses (dikonfigurasi lewat ROI_PDF_CACHE_MAX_MB / ROI_PDF_CACHE_DIR)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ProposalCache()
+    return _cache
+
+
+def _call(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+def render_chart_cached(roi_inputs, roi, dpi=PDF_DPI, fmt="png", cache=None, run=None):
+    """Grafik PNG/SVG untuk input ROI; dirender hanya jika belum ada di cache."""
+    cache = cache or get_proposal_cache()
+    key = cache_key(roi_inputs, namespace=f"chart-{fmt}-dpi{dpi}")
+    chart_bytes = cache.get(key)
+    if chart_bytes is None:
+        chart_bytes = (run or _call)(render_roi_chart, roi, dpi=dpi, fmt=fmt)
+        cache.put(key, chart_bytes)
+    return chart_bytes
+
+
+def render_fan_chart_cached(simulation, dpi=PDF_DPI, fmt="png", cache=None, run=None):
+    """Fan chart simulasi; key dari ringkasan simulasi (persentil sudah menentukan gambar)."""
+    cache = cache or get_proposal_cache()
+    key = cache_key(simulation, namespace=f"fan-{fmt}-dpi{dpi}")
+    chart_bytes = cache.get(key)
+    if chart_bytes is None:
+        chart_bytes = (run or _call)(render_fan_chart, simulation, dpi=dpi, fmt=fmt)
+        cache.put(key, chart_bytes)
+    return chart_bytes
+
+
+def render_tornado_chart_cached(sensitivity, dpi=PDF_DPI, fmt="png", cache=None, run=None):
+    """Tornado chart; key dari hasil sensitivitas (sudah menentukan gambar)."""
+    cache = cache or get_proposal_cache()
+    key = cache_key(sensitivity, namespace=f"tornado-{fmt}-dpi{dpi}")
+    chart_bytes = cache.get(key)
+    if chart_bytes is None:
+        chart_bytes = (run or _call)(render_tornado_chart, sensitivity, dpi=dpi, fmt=fmt)
+        cache.put(key, chart_bytes)
+    return chart_bytes
+
+
+def render_pdf_cached(pdf_data, cache=None, run=None):
+    """PDF untuk pdf_data; dirender hanya jika belum ada di cache.
+    analysis_date & proposal_number sengaja ikut di-hash karena tercetak di dokumen,
+    begitu pula mtime template.html agar perubahan template tidak memakai PDF lama.
+    """
+    cache = cache or get_proposal_cache()
+    template_mtime = os.path.getmtime(os.path.join(SCRIPT_DIR, TEMPLATE_NAME))
+    key = cache_key(pdf_data, namespace=f"pdf-{template_mtime}")
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = (run or _call)(render_pdf, pdf_data)
+        cache.put(key, pdf_bytes)
+    return pdf_bytes
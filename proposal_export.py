@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Ekspor banyak proposal sekaligus ke satu arsip ZIP.
+Skenario prospek (lihat batch_proposals.iter_proposals) dirender paralel di
+ProcessPoolExecutor dengan jumlah job berjalan terbatas, dan setiap PDF yang
+selesai langsung ditulis ke ZIP di SpooledTemporaryFile (di memori sampai
+SPOOL_MAX_BYTES, lalu pindah ke disk). Memori tetap sebesar beberapa PDF
+berapa pun jumlah proposal. Arsip dapat diunduh atau diunggah ke Google Drive
+per chunk (google_services.upload_file_to_drive).
+"""
+import io
+import os
+import csv
+import time
+import zipfile
+import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from batch_proposals import render_proposal_bytes
+from google_services import call_with_retry, find_or_create_folder, upload_file_to_drive
+from number_format import format_array_id
+from roi_charts import PDF_DPI, PDF_FORMAT
+from warmup import warm_up
+
+# --- Konfigurasi ---
+DEFAULT_WORKERS = int(os.environ.get("ROI_EXPORT_WORKERS", "2"))
+SPOOL_MAX_BYTES = int(os.environ.get("ROI_EXPORT_SPOOL_MB", "32")) * 1024 * 1024
+MANIFEST_NAME = "daftar_proposal.csv"
+ZIP_MIME_TYPE = "application/zip"
+EXPORT_FOLDER_NAME = "Ekspor Proposal"  # Subfolder di folder induk Drive untuk arsip ZIP
+# Kolom angka manifest: key hasil ROI -> (judul kolom, presisi)
+MANIFEST_METRICS = {
+    "first_year_roi": ("ROI Tahun Pertama (%)", 1),
+    "payback_period": ("Periode Pengembalian (bulan)", 1),
+    "five_year_net_benefit": ("Manfaat Bersih 5 Tahun (USD)", 2),
+}
+
+
+def _unique_name(filename, used):
+    """Nama entri ZIP unik: duplikat diberi akhiran ' (2)', ' (3)', ..."""
+    name, ext = os.path.splitext(filename)
+    candidate, n = filename, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{name} ({n}){ext}"
+    used.add(candidate)
+    return candidate
+
+
+def _write_manifest(archive, rows):
+    """Daftar proposal (CSV ';' dengan angka format Indonesia, siap dibuka di Excel lokal)."""
+    columns = {key: format_array_id([row[key] for row in rows], precision) for key, (_, precision) in MANIFEST_METRICS.items()}
+    text = io.StringIO()
+    writer = csv.writer(text, delimiter=";")
+    writer.writerow(["Nomor Proposal", "Prospek", "Lokasi", "File"] + [label for label, _ in MANIFEST_METRICS.values()])
+    for i, row in enumerate(rows):
+        writer.writerow([row["proposal_number"], row["prospect_name"], row["prospect_location"], row["file"]]
+                        + [columns[key][i] for key in MANIFEST_METRICS])
+    archive.writestr(MANIFEST_NAME, text.getvalue().encode("utf-8-sig"))
+
+
+def export_zip(proposals, workers=None, chart_dpi=PDF_DPI, chart_format=PDF_FORMAT, progress=None, target=None,
+               submit=None):
+    """Merender `proposals` (iterable (pdf_data, roi, filename)) ke satu arsip ZIP.
+
+    Return (archive, stats): archive = `target` (file biner yang dapat di-seek) atau
+    SpooledTemporaryFile baru, di posisi 0 (tutup setelah dipakai); stats = dict
+    rows, done, failed, zip_bytes, wall_seconds, errors.
+    `progress(done, failed)` dipanggil dari thread pemanggil setiap ada PDF selesai.
+    `submit(fn, *args)` (mis. render_pool bersama) menggantikan ProcessPoolExecutor milik ekspor ini.
+    """
+    workers = workers or DEFAULT_WORKERS
+    max_in_flight = workers * 2
+    spool = target if target is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, suffix=".zip")
+    stats = {"rows": 0, "done": 0, "failed": 0, "errors": []}
+    manifest_rows = []
+    used_names = set()
+    pending = {}
+    wall_started = time.perf_counter()
+
+    # PDF WeasyPrint sudah terkompresi; ZIP_STORED menghindari kompresi ulang yang sia-sia
+    with zipfile.ZipFile(spool, "w", compression=zipfile.ZIP_STORED) as archive:
+        def collect(done_futures):
+            for future in done_futures:
+                pdf_data, roi, filename = pending.pop(future)
+                try:
+                    _, _, pdf_bytes = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    stats["errors"].append(f"{filename}: {e}")
+                else:
+                    entry = _unique_name(filename, used_names)
+                    archive.writestr(entry, pdf_bytes)
+                    stats["done"] += 1
+                    manifest_rows.append({
+                        "proposal_number": pdf_data["proposal_number"],
+                        "prospect_name": pdf_data["prospect_name"],
+                        "prospect_location": pdf_data["prospect_location"],
+                        "file": entry,
+                        **{key: roi[key] for key in MANIFEST_METRICS},
+                    })
+                if progress is not None:
+                    progress(stats["done"], stats["failed"])
+
+        with contextlib.ExitStack() as stack:
+            if submit is None:
+                submit = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=warm_up)).submit
+            for pdf_data, roi, filename in proposals:
+                # Back-pressure: PDF yang selesai tetapi belum ditulis ke ZIP dibatasi max_in_flight
+                while len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = submit(render_proposal_bytes, pdf_data, roi, chart_dpi, chart_format)
+                pending[future] = (pdf_data, roi, filename)
+                stats["rows"] += 1
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        _write_manifest(archive, manifest_rows)
+
+    stats["zip_bytes"] = spool.tell()
+    stats["wall_seconds"] = time.perf_counter() - wall_started
+    spool.seek(0)
+    return spool, stats
+
+
+def read_archive(archive):
+    """Isi arsip sebagai bytes (untuk tombol unduh; dipanggil hanya saat unduhan diminta)."""
+    archive.seek(0)
+    return archive.read()
+
+
+def upload_archive(drive_service, archive, filename, parent_folder_id, progress=None):
+    """Mengunggah arsip ke subfolder EXPORT_FOLDER_NAME per chunk (resumable). Return webViewLink."""
+    folder_id = call_with_retry(find_or_create_folder, drive_service, EXPORT_FOLDER_NAME, parent_folder_id)
+    return upload_file_to_drive(drive_service, archive, filename, folder_id, ZIP_MIME_TYPE, progress=progress)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Alokasi nomor proposal PROP-yymmdd-NNN dengan counter harian di SQLite lokal.
+Alokasi bersifat O(1) dan atomik antar thread/proses (BEGIN IMMEDIATE).
+Counter hari baru disinkronkan sekali dari kolom nomor di sheet Log Proposal,
+sehingga nomor tetap melanjutkan log yang sudah ada.
+"""
+import logging
+import threading
+from datetime import datetime
+
+from storage import data_path, sqlite_connection
+from google_services import LOG_SHEET_NAME
+
+# --- Konfigurasi ---
+PROPOSAL_PREFIX = "PROP-"
+DEFAULT_DB_FILENAME = "proposal_counter.sqlite3"
+FALLBACK_SUFFIX = "XXX"
+
+_allocator = None
+_allocator_lock = threading.Lock()
+_logger = logging.getLogger(__name__)
+
+
+def day_prefix(now=None):
+    """Prefix nomor untuk hari ini, mis. 'PROP-250131-'."""
+    return PROPOSAL_PREFIX + (now or datetime.now()).strftime("%y%m%d") + "-"
+
+def fallback_number(now=None):
+    """Nomor placeholder jika alokasi gagal."""
+    return day_prefix(now) + FALLBACK_SUFFIX
+
+def is_fallback_number(number):
+    """True untuk nomor placeholder (tidak unik, tidak boleh dipakai sebagai kunci)."""
+    return str(number).endswith("-" + FALLBACK_SUFFIX)
+
+def highest_logged_number(service, sheet_id, prefix):
+    """Nomor urut tertinggi dengan prefix hari ini di kolom B sheet Log Proposal (0 jika belum ada)."""
+    range_name = f"{LOG_SHEET_NAME}!B2:B"
+    result = service.spreadsheets().values().get(spreadsheetId=sheet_id, range=range_name).execute()
+    highest = 0
+    for row in result.get("values", []):
+        if row and isinstance(row[0], str) and row[0].startswith(prefix):
+            try:
+                highest = max(highest, int(row[0].split("-")[-1]))
+            except (IndexError, ValueError):
+                continue
+    return highest
+
+
+class ProposalNumberAllocator:
+    """Counter nomor proposal per hari yang aman untuk konkurensi."""
+
+    def __init__(self, path=None):
+        self.path = path or data_path(DEFAULT_DB_FILENAME)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS proposal_counters ("
+                "day TEXT PRIMARY KEY, last_number INTEGER NOT NULL, synced INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def _is_synced(self, prefix):
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute("SELECT synced FROM proposal_counters WHERE day = ?", (prefix,)).fetchone()
+        return bool(row and row[0])
+
+    def peek(self, now=None):
+        """Perkiraan nomor berikutnya tanpa memesan (untuk tampilan sidebar)."""
+        prefix = day_prefix(now)
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute("SELECT last_number FROM proposal_counters WHERE day = ?", (prefix,)).fetchone()
+        return f"{prefix}{(row[0] if row else 0) + 1:03d}"
+
+    def allocate(self, seed=None, now=None):
+        """Memesan nomor berikutnya untuk hari ini.
+
+        `seed(prefix)` (opsional) mengembalikan nomor tertinggi yang sudah
+        tercatat di tempat lain (mis. highest_logged_number) dan hanya dipanggil
+        sekali per hari, saat counter hari itu belum tersinkron. Jika seed gagal,
+        nomor tetap dialokasikan dari counter lokal dan sinkronisasi dicoba lagi
+        pada alokasi berikutnya.
+        """
+        return self.allocate_block(1, seed, now)[0]
+
+    def allocate_block(self, count, seed=None, now=None):
+        """Memesan `count` nomor berurutan sekaligus (satu transaksi), mis. untuk ekspor/batch.
+        Return list nomor; `seed` sama seperti allocate.
+        """
+        prefix = day_prefix(now)
+        if count <= 0:
+            return []
+        seed_value = None
+        if seed is not None and not self._is_synced(prefix):
+            try:
+                seed_value = int(seed(prefix))
+            except Exception as e:
+                _logger.warning("Sinkronisasi counter %s gagal, memakai counter lokal: %s", prefix, e)
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM proposal_counters WHERE day < ?", (prefix,))
+            conn.execute("INSERT OR IGNORE INTO proposal_counters (day, last_number) VALUES (?, 0)", (prefix,))
+            if seed_value is not None:
+                conn.execute(
+                    "UPDATE proposal_counters SET last_number = MAX(last_number, ?), synced = 1 WHERE day = ?",
+                    (seed_value, prefix),
+                )
+            conn.execute("UPDATE proposal_counters SET last_number = last_number + ? WHERE day = ?", (count, prefix))
+            last = conn.execute("SELECT last_number FROM proposal_counters WHERE day = ?", (prefix,)).fetchone()[0]
+        return [f"{prefix}{number:03d}" for number in range(last - count + 1, last + 1)]
+
+def get_proposal_number_allocator():
+    """Allocator tunggal per proses."""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = ProposalNumberAllocator()
+    return _allocator
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Pembuatan proposal PDF (Jinja2 + WeasyPrint) tanpa ketergantungan pada Streamlit,
+sehingga dapat dipakai oleh aplikasi Streamlit maupun CLI batch.
+WeasyPrint dan Jinja2 baru di-import saat PDF pertama dirender (lihat warm_up).
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from roi_cashflow import CASHFLOW_DEFAULTS, IRR_DISPLAY_MAX
+from roi_simulation import summary_rows
+from number_format import format_number_id
+
+# --- Konfigurasi ---
+PROVIDER_COMPANY_NAME = "MEDIA AI SOLUSI, group of PT. EKUITAS MEDIA INVESTAMA"
+TEMPLATE_NAME = "template.html"
+RAMP_CURVE_LABELS = {"linear": "linier", "s_curve": "kurva S"}
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Cache bytecode template di disk agar worker yang baru start tidak perlu kompilasi ulang
+TEMPLATE_CACHE_DIR = os.environ.get("ROI_TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "roi_template_cache"))
+
+_environment = None
+_environment_lock = threading.Lock()
+
+# --- Fungsi Bantuan ---
+def safe_name(name):
+    """Membersihkan nama untuk dipakai sebagai nama file/folder."""
+    return "".join(c for c in name if c.isalnum() or c in (" ", "_", "-")).strip()
+
+def pdf_filename(proposal_number, prospect_name, prospect_location):
+    """Nama file PDF standar: '<nomor> <prospek> <lokasi>.pdf'."""
+    return f"{proposal_number} {safe_name(prospect_name)} {safe_name(prospect_location)}.pdf"
+
+def build_conclusion_text(prospect_name, first_year_roi, three_year_roi, payback_period):
+    """Menyusun teks kesimpulan berdasarkan ROI dan periode pengembalian."""
+    if first_year_roi != float("inf") and first_year_roi > 50 and payback_period < 18:
+        return f"Implementasi Solusi AI Voice untuk {prospect_name} sangat direkomendasikan. Dengan ROI tahun pertama {format_number_id(first_year_roi)}% dan periode pengembalian hanya {format_number_id(payback_period, 1)} bulan, investasi ini menawarkan nilai finansial yang sangat signifikan dan cepat."
+    elif first_year_roi != float("inf") and first_year_roi > 0:
+        return f"Implementasi Solusi AI Voice untuk {prospect_name} direkomendasikan. ROI tahun pertama sebesar {format_number_id(first_year_roi)}% dan periode pengembalian {format_number_id(payback_period, 1)} bulan menunjukkan potensi pengembalian investasi yang solid dalam jangka menengah."
+    elif three_year_roi != float("inf") and three_year_roi > 0:
+        return f"Implementasi Solusi AI Voice untuk {prospect_name} patut dipertimbangkan. Meskipun ROI tahun pertama mungkin belum positif ({format_number_id(first_year_roi)}%), ROI tiga tahun sebesar {format_number_id(three_year_roi)}% mengindikasikan potensi keuntungan jangka panjang yang menarik."
+    else:
+        return f"Berdasarkan data dan asumsi saat ini, ROI untuk implementasi Solusi AI Voice bagi {prospect_name} terlihat kurang menarik ({format_number_id(first_year_roi)}% ROI tahun pertama). Perlu evaluasi lebih lanjut terhadap asumsi atau potensi manfaat lain sebelum melanjutkan."
+
+def build_pdf_data(admin, roi_inputs, roi, chart_data_uri=None, simulation=None, fan_chart_data_uri=None,
+                   tornado_chart_data_uri=None):
+    """Menyusun dict data untuk template.html.
+
+    `admin` berisi proposal_number, prospect_name, prospect_location, agent_name,
+    agent_email dan agent_phone (analysis_date opsional). `roi` adalah hasil
+    skalar dari roi_engine.compute_roi. `simulation` (opsional) adalah hasil
+    roi_simulation.simulate_roi untuk bagian simulasi; tornado_chart_data_uri
+    (opsional) adalah grafik dari roi_sensitivity.compute_sensitivity.
+    """
+    analysis_date = admin.get("analysis_date") or datetime.now().strftime("%d %B %Y")
+    data = {
+        "proposal_number": admin.get("proposal_number", ""),
+        "analysis_date": analysis_date,
+        "prospect_name": admin.get("prospect_name", ""),
+        "prospect_location": admin.get("prospect_location", ""),
+        "provider_company_name": PROVIDER_COMPANY_NAME,
+        "agent_name": admin.get("agent_name", ""),
+        "agent_email": admin.get("agent_email", ""),
+        "agent_phone": admin.get("agent_phone", ""),
+        "cs_staff": roi_inputs["cs_staff"],
+        "current_annual_labor_cost_idr": roi["current_annual_labor_cost_idr"],
+        "current_annual_labor_cost_usd": roi["current_annual_labor_cost_usd"],
+        "current_inquiries_per_year": roi["current_inquiries_per_year"],
+        "current_handling_hours": roi["current_handling_hours"],
+        "current_retention_rate": roi_inputs["current_retention_rate"],
+        "new_staff_count": roi["new_staff_count"],
+        "new_annual_labor_cost_idr": roi["new_annual_labor_cost_idr"],
+        "new_annual_labor_cost_usd": roi["new_annual_labor_cost_usd"],
+        "automated_inquiries": roi["automated_inquiries"],
+        "automation_rate": roi_inputs["automation_rate"],
+        "new_handling_hours": roi["new_handling_hours"],
+        "new_retention_rate": roi["new_retention_rate"],
+        "labor_savings_idr": roi["labor_savings_idr"],
+        "labor_savings_usd": roi["labor_savings_usd"],
+        "retention_revenue_impact": roi["retention_revenue_impact"],
+        "total_annual_savings_usd": roi["total_annual_savings_usd"],
+        "first_year_net_usd": roi["first_year_net_usd"],
+        "subsequent_years_net_usd": roi["subsequent_years_net_usd"],
+        "first_year_roi": roi["first_year_roi"],
+        "three_year_roi": roi["three_year_roi"],
+        "payback_period": roi["payback_period"],
+        "five_year_net_benefit": roi["five_year_net_benefit"],
+        "five_year_projection": roi["five_year_projection"],
+        "horizon_years": len(roi["years"]),
+        "horizon_net_benefit": roi["horizon_net_benefit"],
+        "npv": roi["npv"],
+        "irr": roi["irr"],
+        "irr_display_max": IRR_DISPLAY_MAX,
+        "chart_path": chart_data_uri if chart_data_uri else "",
+        "tornado_chart_path": tornado_chart_data_uri or "",
+        "avg_monthly_salary": roi_inputs["avg_monthly_salary"],
+        "overhead_multiplier": roi_inputs["overhead_multiplier"],
+        "usd_conversion_rate": roi_inputs["usd_conversion_rate"],
+        "staff_reduction": roi_inputs["staff_reduction"],
+        "retention_improvement": roi_inputs["retention_improvement"],
+        "handling_time_improvement": roi_inputs["handling_time_improvement"],
+        # Asumsi arus kas opsional (input lama/CSV tanpa kolom ini memakai default)
+        **{field: roi_inputs.get(field, default) for field, default in CASHFLOW_DEFAULTS.items()},
+        "ramp_curve": RAMP_CURVE_LABELS.get(roi_inputs.get("ramp_curve", "linear"), roi_inputs.get("ramp_curve", "linear")),
+        "conclusion_text": build_conclusion_text(
+            admin.get("prospect_name", ""), roi["first_year_roi"], roi["three_year_roi"], roi["payback_period"]
+        ),
+        "simulation": None,
+        "fan_chart_path": "",
+    }
+    if simulation:
+        data["simulation"] = {
+            "draws": simulation["draws"],
+            "distribution": simulation["distribution"],
+            "ranges": simulation["ranges"],
+            "rows": summary_rows(simulation),
+            "probability_positive_first_year": simulation["probability_positive_first_year"] * 100,
+        }
+        data["fan_chart_path"] = fan_chart_data_uri or ""
+    return data
+
+def _bytecode_cache():
+    """Bytecode cache Jinja2 di disk; None jika folder cache tidak bisa dibuat."""
+    from jinja2 import FileSystemBytecodeCache
+
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    except OSError:
+        return None
+
+def get_environment():
+    """Environment Jinja2 tunggal per proses (dibuat sekali, aman untuk banyak thread).
+    auto_reload memastikan template dikompilasi ulang jika mtime template.html berubah.
+    """
+    global _environment
+    if _environment is None:
+        with _environment_lock:
+            if _environment is None:
+                from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+                env = Environment(
+                    loader=FileSystemLoader(SCRIPT_DIR),
+                    autoescape=select_autoescape(["html"]),
+                    auto_reload=True,
+                    bytecode_cache=_bytecode_cache()
+                )
+                env.filters["format_number"] = format_number_id
+                _environment = env
+    return _environment
+
+def get_template():
+    """Template proposal yang sudah dikompilasi (dari cache environment)."""
+    return get_environment().get_template(TEMPLATE_NAME)
+
+def render_pdf(data):
+    """Merender template.html dengan `data` dan mengembalikan bytes PDF. Melempar exception jika gagal."""
+    for key in ("chart_path", "fan_chart_path", "tornado_chart_path"):
+        if key not in data or not str(data[key]).startswith("data:image"):
+            data[key] = ""
+    from weasyprint import HTML
+
+    html_out = get_template().render(data)
+    return HTML(string=html_out, base_url=SCRIPT_DIR).write_pdf()
+
+def warm_up():
+    """Memuat Jinja2 + WeasyPrint dan menginisialisasi fontconfig/Pango dengan satu PDF kecil."""
+    from weasyprint import HTML
+
+    get_template()
+    HTML(string="<p>warm-up</p>", base_url=SCRIPT_DIR).write_pdf()
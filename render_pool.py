@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Pool proses bersama untuk render grafik dan PDF (mode multi-tenant).
+Jika satu instance Streamlit melayani banyak konsultan, render di thread
+skrip setiap sesi saling berebut GIL/CPU. Dengan ROI_RENDER_POOL=1, render
+yang tidak ada di cache dikirim ke satu ProcessPoolExecutor berukuran tetap.
+Job menunggu di antrean per sesi yang dilayani bergiliran (round-robin),
+sehingga ekspor massal satu sesi tidak menahan proposal sesi lain. Antrean
+dibatasi (total dan per sesi): saat penuh, submit ditolak dengan
+RenderQueueFull (atau menunggu jika block=True) dan UI menampilkan
+kedalaman antrean. Proposal interaktif memesan slot (reserve) lebih dulu
+agar penolakan terjadi sebelum efek samping seperti nomor proposal.
+"""
+import os
+import sys
+import time
+import types
+import functools
+import threading
+import contextlib
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import StageTimer, get_metrics
+from warmup import warm_up
+
+# --- Konfigurasi ---
+POOL_ENABLED = os.environ.get("ROI_RENDER_POOL") == "1"
+DEFAULT_WORKERS = int(os.environ.get("ROI_RENDER_WORKERS", "0")) or os.cpu_count() or 1
+DEFAULT_MAX_QUEUE = int(os.environ.get("ROI_RENDER_MAX_QUEUE", "32"))        # Job menunggu (semua sesi)
+DEFAULT_SESSION_QUEUE = int(os.environ.get("ROI_RENDER_SESSION_QUEUE", "8"))  # Job menunggu per sesi
+# forkserver: worker tidak di-fork dari server Streamlit multi-thread (lock logging/SQLite/client
+# Google yang sedang dipegang thread lain tidak ikut terwariskan dalam keadaan terkunci)
+MP_START_METHOD = "forkserver"
+LAUNCH_ATTEMPTS = 3      # Peluncuran ulang worker jika run skrip lain memasang __main__ di tengah peluncuran
+PROGRESS_INTERVAL = 0.5  # Detik antar panggilan progress saat menunggu hasil
+
+_pool = None
+_pool_lock = threading.Lock()
+_main_swap_lock = threading.Lock()
+
+
+class RenderQueueFull(Exception):
+    """Antrean render penuh; coba lagi setelah beberapa job selesai."""
+
+    def __init__(self, queued, max_queue):
+        super().__init__(f"Antrean render penuh ({queued} job menunggu, batas {max_queue})")
+        self.queued = queued
+        self.max_queue = max_queue
+
+
+@contextlib.contextmanager
+def _without_script_main():
+    """Streamlit memasang skrip aplikasi sebagai __main__, dan proses forkserver/spawn
+    menjalankan ulang __main__ saat start. Selama worker diluncurkan, __main__ diganti modul kosong
+    (yield modul itu; jika sys.modules["__main__"] bukan lagi modul tersebut, run skrip lain menimpanya).
+    """
+    with _main_swap_lock:
+        script_main = sys.modules.get("__main__")
+        stub = types.ModuleType("__main__")
+        sys.modules["__main__"] = stub
+        try:
+            yield stub
+        finally:
+            if sys.modules.get("__main__") is stub:
+                sys.modules["__main__"] = script_main
+
+
+def _start_executor(workers):
+    """ProcessPoolExecutor dengan semua worker sudah diluncurkan (lambat: dipanggil tanpa lock antrean).
+    Setelah itu executor tidak meluncurkan proses baru, jadi __main__ hanya diganti selama fungsi ini.
+    """
+    context = multiprocessing.get_context(MP_START_METHOD)
+    context.set_forkserver_preload(["warmup"])
+    for _ in range(LAUNCH_ATTEMPTS):
+        # Worker memuat WeasyPrint/matplotlib saat start (lihat warmup.warm_up)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=warm_up)
+        with _without_script_main() as stub:
+            for _ in range(workers):
+                executor.submit(os.getpid)
+            intact = sys.modules.get("__main__") is stub
+        if intact:
+            break
+        # Worker mungkin mendapat skrip aplikasi sebagai __main__ dan menjalankannya ulang: luncurkan ulang
+        executor.shutdown(wait=False, cancel_futures=True)
+    return executor
+
+
+class RenderReservation:
+    """Slot antrean yang dipesan satu sesi sebelum efek samping (mis. memesan nomor proposal).
+
+    Submit dengan reservasi memakai slot ini tanpa pemeriksaan batas antrean; slot
+    kembali ke reservasi saat job selesai sehingga render berurutan (grafik lalu PDF)
+    cukup satu slot. Lepaskan dengan release() atau blok `with`.
+    """
+
+    def __init__(self, pool, session_id, slots):
+        self.pool = pool
+        self.session_id = session_id
+        self.slots = slots
+        self.closed = False
+
+    def release(self):
+        self.pool._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class RenderPool:
+    """ProcessPoolExecutor bersama dengan antrean adil per sesi dan batas kedalaman antrean.
+
+    Pool proses tidak pernah diberi lebih dari `workers` job sekaligus; sisanya
+    menunggu di antrean per sesi sehingga urutan eksekusi ditentukan round-robin
+    di sini, bukan FIFO internal ProcessPoolExecutor. Slot yang dipesan
+    (reserve) dihitung sebagai antrean.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, session_queue=DEFAULT_SESSION_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.session_queue = session_queue
+        self.completed = 0
+        self._executor = None
+        self._queues = OrderedDict()  # session_id -> deque job; urutan = giliran berikutnya
+        self._queued = 0
+        self._reserved = 0
+        self._session_reserved = {}
+        self._running = 0
+        self._room = threading.Condition()
+        self._executor_lock = threading.Lock()  # Hanya satu peluncuran executor; _room tidak ditahan selama itu
+
+    def start(self):
+        """Meluncurkan worker di thread latar (tidak menahan skrip). Return self."""
+        if self._executor is None:
+            threading.Thread(target=self._ensure_executor, name="render-pool-start", daemon=True).start()
+        return self
+
+    def _ensure_executor(self):
+        """Membuat executor jika belum ada (di luar _room), lalu memasangnya dan menjalankan job yang menunggu."""
+        if self._executor is not None:
+            return
+        with self._executor_lock:
+            if self._executor is not None:
+                return
+            executor = _start_executor(self.workers)
+            with self._room:
+                self._executor = executor
+                self._dispatch()
+
+    def _discard_executor(self, executor):
+        """Membuang executor yang rusak (worker mati) beserta prosesnya; dibuat ulang lewat _ensure_executor."""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _session_depth(self, session_id):
+        return len(self._queues.get(session_id, ()))
+
+    def _check_room(self, session_id, count=1):
+        """RenderQueueFull jika `count` job baru untuk `session_id` melampaui batas (dipanggil dengan _room terkunci)."""
+        queued = self._queued + self._reserved
+        if queued + count > self.max_queue:
+            raise RenderQueueFull(queued, self.max_queue)
+        if session_id is not None:
+            depth = self._session_depth(session_id) + self._session_reserved.get(session_id, 0)
+            if depth + count > self.session_queue:
+                raise RenderQueueFull(depth, self.session_queue)
+
+    def stats(self, session_id=None):
+        """Snapshot antrean untuk UI: workers, running, queued, reserved, sessions, max_queue, completed (+ session_queued)."""
+        with self._room:
+            stats = {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._queued,
+                "reserved": self._reserved,
+                "sessions": len(self._queues),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+            }
+            if session_id is not None:
+                stats["session_queued"] = self._session_depth(session_id) + self._session_reserved.get(session_id, 0)
+        return stats
+
+    def reserve(self, session_id, slots=1):
+        """Memesan `slots` slot antrean secara atomik. Return RenderReservation, atau RenderQueueFull jika penuh."""
+        with self._room:
+            self._check_room(session_id, slots)
+            self._reserved += slots
+            self._session_reserved[session_id] = self._session_reserved.get(session_id, 0) + slots
+        return RenderReservation(self, session_id, slots)
+
+    def _adjust_reserved(self, reservation, delta):
+        """Menambah/mengurangi slot reservasi terbuka (dipanggil dengan _room terkunci)."""
+        reservation.slots += delta
+        self._reserved += delta
+        remaining = self._session_reserved.get(reservation.session_id, 0) + delta
+        if remaining:
+            self._session_reserved[reservation.session_id] = remaining
+        else:
+            self._session_reserved.pop(reservation.session_id, None)
+
+    def _return_slot(self, reservation):
+        if reservation is not None and not reservation.closed:
+            self._adjust_reserved(reservation, 1)
+
+    def _release(self, reservation):
+        with self._room:
+            if not reservation.closed:
+                self._adjust_reserved(reservation, -reservation.slots)
+                reservation.closed = True
+                self._room.notify_all()
+
+    def submit(self, session_id, fn, *args, block=False, reservation=None, **kwargs):
+        """Menjadwalkan fn(*args, **kwargs) di proses worker. Return Future.
+        Dengan `reservation` yang masih punya slot, job selalu diterima. Tanpa itu, jika
+        antrean penuh: RenderQueueFull, atau menunggu ada tempat jika `block=True`.
+        """
+        self._ensure_executor()
+        future = Future()
+        future.queued_at = time.perf_counter()
+        with self._room:
+            if reservation is not None and not reservation.closed and reservation.slots > 0:
+                self._adjust_reserved(reservation, -1)
+            else:
+                reservation = None
+                while True:
+                    try:
+                        self._check_room(session_id)
+                        break
+                    except RenderQueueFull:
+                        if not block:
+                            raise
+                        self._room.wait()
+            self._queues.setdefault(session_id, deque()).append((future, fn, args, kwargs, reservation))
+            self._queued += 1
+            self._dispatch()
+        self._ensure_executor()  # Executor rusak saat dispatch: job berikutnya menunggu executor baru
+        return future
+
+    def _dispatch(self):
+        """Mengisi slot worker kosong secara bergiliran antar sesi (dipanggil dengan _room terkunci).
+        Tanpa executor, job tetap di antrean sampai _ensure_executor memasang yang baru.
+        """
+        while self._running < self.workers and self._queues and self._executor is not None:
+            executor = self._executor
+            session_id, jobs = self._queues.popitem(last=False)
+            future, fn, args, kwargs, reservation = jobs.popleft()
+            if jobs:
+                self._queues[session_id] = jobs  # Sesi ini kembali ke belakang giliran
+            self._queued -= 1
+            if not future.set_running_or_notify_cancel():
+                self._return_slot(reservation)
+                continue
+            future.queue_seconds = time.perf_counter() - future.queued_at
+            try:
+                inner = executor.submit(fn, *args, **kwargs)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._discard_executor(executor)
+                self._return_slot(reservation)
+                future.set_exception(e)
+                continue
+            self._running += 1
+            inner.add_done_callback(functools.partial(self._finished, executor, future, reservation))
+        self._room.notify_all()
+
+    def _finished(self, executor, future, reservation, inner):
+        error = inner.exception()
+        with self._room:
+            self._running -= 1
+            self.completed += 1
+            self._return_slot(reservation)
+            if isinstance(error, BrokenProcessPool):
+                self._discard_executor(executor)
+            self._dispatch()
+            recover = self._executor is None and self._queued
+        if recover:
+            self.start()  # Callback berjalan di thread executor lama: peluncuran ulang di thread lain
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(inner.result())
+
+    def run(self, session_id, fn, *args, progress=None, trace=None, reservation=None, **kwargs):
+        """Submit lalu tunggu hasilnya (dipakai sebagai `run` di proposal_cache).
+        `progress(stats)` dipanggil berkala selama menunggu; waktu antre dicatat sebagai
+        tahap render_queue_wait (metrics, dan `trace` jika ada).
+        """
+        future = self.submit(session_id, fn, *args, reservation=reservation, **kwargs)
+        while True:
+            try:
+                result = future.result(timeout=PROGRESS_INTERVAL)
+                break
+            except FutureTimeoutError:
+                if progress is not None:
+                    progress(self.stats(session_id))
+        timer = StageTimer("render_queue_wait")
+        timer.seconds = getattr(future, "queue_seconds", 0.0)
+        get_metrics().record(timer.stage, timer.seconds)
+        if trace is not None:
+            trace.add(timer)
+        return result
+
+    def shutdown(self):
+        with self._room:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def get_render_pool():
+    """Pool render tunggal per proses (ROI_RENDER_WORKERS / ROI_RENDER_MAX_QUEUE / ROI_RENDER_SESSION_QUEUE).
+    Worker langsung diluncurkan di latar agar siap sebelum proposal pertama.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RenderPool().start()
+    return _pool
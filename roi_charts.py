@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Pembuatan grafik analisis ROI (perbandingan biaya & manfaat bersih kumulatif,
+fan chart simulasi Monte Carlo dan tornado chart sensitivitas) tanpa
+ketergantungan pada Streamlit.
+
+matplotlib baru di-import saat grafik pertama dibuat; backend dipaku ke Agg
+(non-interaktif) dan style diset sekali pada saat itu. Figure disimpan di pool kecil per jenis grafik (per
+proses, dengan lock; Streamlit menjalankan setiap rerun di thread baru) lalu
+artist-nya (bar, garis, label) hanya diperbarui untuk setiap proposal,
+sehingga tidak ada biaya plt.subplots berulang. DPI pratinjau layar dan DPI/format untuk PDF dapat diatur terpisah.
+"""
+import os
+import io
+import base64
+import threading
+import contextlib
+from types import SimpleNamespace
+
+from number_format import format_number_id
+
+# --- Konfigurasi ---
+SCREEN_DPI = int(os.environ.get("ROI_CHART_SCREEN_DPI", "100"))
+PDF_DPI = int(os.environ.get("ROI_CHART_PDF_DPI", "150"))
+# "png" atau "svg" (vektor, dirender langsung oleh WeasyPrint)
+PDF_FORMAT = os.environ.get("ROI_CHART_PDF_FORMAT", "png")
+
+CHART_STYLE = "seaborn-v0_8-whitegrid"
+COST_LABELS = ["Saat Ini", "Dengan AI Voice"]
+COST_COLORS = ["#3A86FF", "#8338EC"]
+LINE_COLOR = "#FF006E"
+
+MIME_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+TEMPLATE_POOL_SIZE = 4  # Figure menganggur maksimal per jenis grafik
+
+_templates = {}  # kelas template -> list figure menganggur
+_templates_lock = threading.Lock()
+_mpl = None
+_mpl_lock = threading.Lock()
+
+
+def _matplotlib():
+    """Import matplotlib (backend Agg + style) sekali per proses, saat pertama dibutuhkan."""
+    global _mpl
+    if _mpl is None:
+        with _mpl_lock:
+            if _mpl is None:
+                import matplotlib
+                matplotlib.use("Agg")
+                import matplotlib.style
+                from matplotlib.figure import Figure
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                from matplotlib.ticker import FuncFormatter
+                matplotlib.style.use(CHART_STYLE)
+                _mpl = SimpleNamespace(Figure=Figure, FigureCanvasAgg=FigureCanvasAgg, FuncFormatter=FuncFormatter)
+    return _mpl
+
+
+class RoiChartTemplate:
+    """Figure grafik ROI yang dibuat sekali lalu diperbarui untuk setiap data baru."""
+
+    def __init__(self):
+        mpl = _matplotlib()
+        self.fig = mpl.Figure(figsize=(12, 5))
+        mpl.FigureCanvasAgg(self.fig)
+        self.ax1, self.ax2 = self.fig.subplots(1, 2)
+        self.fig.subplots_adjust(left=0.13, right=0.97, bottom=0.12, top=0.9, wspace=0.3)
+        ax1, ax2 = self.ax1, self.ax2
+
+        self.bars = ax1.bar(COST_LABELS, [0, 0], color=COST_COLORS)
+        self.bar_labels = [ax1.text(0, 0, "", va="bottom", ha="center", fontsize=9) for _ in self.bars]
+        ax1.set_title("Perbandingan Biaya Tahunan (IDR)", fontsize=12)
+        ax1.set_ylabel("Biaya (IDR)", fontsize=10)
+        ax1.tick_params(axis="x", labelsize=10)
+        ax1.tick_params(axis="y", labelsize=10)
+        ax1.yaxis.set_major_formatter(mpl.FuncFormatter(lambda x, p: format_number_id(x, 0)))
+        ax1.margins(y=0.1)
+
+        self.line, = ax2.plot([], [], marker="o", linewidth=2, color=LINE_COLOR, label="Manfaat Bersih Kumulatif")
+        self.point_labels = []
+        ax2.set_xlabel("Tahun", fontsize=10)
+        ax2.set_ylabel("USD", fontsize=10)
+        ax2.grid(True, linestyle="--", alpha=0.6)
+        ax2.tick_params(axis="x", labelsize=10)
+        ax2.tick_params(axis="y", labelsize=10)
+        ax2.yaxis.set_major_formatter(mpl.FuncFormatter(lambda x, p: f"$ {format_number_id(x, 0)}"))
+        ax2.axhline(0, color="grey", linewidth=0.8, linestyle="--")
+        ax2.margins(x=0.08, y=0.12)
+
+    def update(self, roi):
+        """Memperbarui artist dengan hasil skalar roi_engine.compute_roi."""
+        cs_costs_idr = [roi["current_annual_labor_cost_idr"], roi["new_annual_labor_cost_idr"]]
+        for bar, label, yval in zip(self.bars, self.bar_labels, cs_costs_idr):
+            bar.set_height(yval)
+            label.set_position((bar.get_x() + bar.get_width() / 2.0, yval * 1.01))
+            label.set_text(f"IDR {format_number_id(yval, 0)}")
+        self.ax1.relim()
+        self.ax1.autoscale_view()
+
+        years = list(roi["years"])
+        cumulative_net = list(roi["cumulative_net"])
+        self.line.set_data(years, cumulative_net)
+        self.ax2.set_title(f"Manfaat Bersih Kumulatif {len(years)} Tahun (USD)", fontsize=12)
+        self.ax2.set_xticks(years)
+        # Jumlah label titik mengikuti panjang proyeksi
+        while len(self.point_labels) < len(years):
+            self.point_labels.append(self.ax2.text(0, 0, "", ha="center", va="bottom", fontsize=9))
+        while len(self.point_labels) > len(years):
+            self.point_labels.pop().remove()
+        for label, year, value in zip(self.point_labels, years, cumulative_net):
+            label.set_position((year, value))
+            label.set_text(f"$ {format_number_id(value, 0)}")
+        self.ax2.relim()
+        self.ax2.autoscale_view()
+
+    def render(self, dpi, fmt="png"):
+        """Menyimpan figure ke bytes (png/svg)."""
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format=fmt, dpi=dpi)
+        return buffer.getvalue()
+
+
+class FanChartTemplate:
+    """Fan chart manfaat bersih kumulatif hasil simulasi Monte Carlo (pita P10-P90 dan garis P50)."""
+
+    def __init__(self):
+        mpl = _matplotlib()
+        self.fig = mpl.Figure(figsize=(12, 4))
+        mpl.FigureCanvasAgg(self.fig)
+        self.ax = self.fig.subplots()
+        self.fig.subplots_adjust(left=0.13, right=0.97, bottom=0.14, top=0.88)
+        ax = self.ax
+        self.band = None
+        self.median_line, = ax.plot([], [], marker="o", linewidth=2, color=LINE_COLOR, label="P50 (median)")
+        self.bound_lines = [ax.plot([], [], linewidth=1, linestyle="--", color=COST_COLORS[1])[0] for _ in range(2)]
+        ax.set_xlabel("Tahun", fontsize=10)
+        ax.set_ylabel("USD", fontsize=10)
+        ax.grid(True, linestyle="--", alpha=0.6)
+        ax.tick_params(axis="x", labelsize=10)
+        ax.tick_params(axis="y", labelsize=10)
+        ax.yaxis.set_major_formatter(mpl.FuncFormatter(lambda x, p: f"$ {format_number_id(x, 0)}"))
+        ax.axhline(0, color="grey", linewidth=0.8, linestyle="--")
+        ax.margins(x=0.05, y=0.12)
+
+    def update(self, simulation):
+        """Memperbarui artist dengan hasil roi_simulation.simulate_roi."""
+        years = list(simulation["years"])
+        bands = simulation["cumulative_net_bands"]
+        if self.band is not None:
+            self.band.remove()
+        self.band = self.ax.fill_between(years, bands["p10"], bands["p90"], color=COST_COLORS[0], alpha=0.25,
+                                         label="Rentang P10-P90")
+        self.bound_lines[0].set_data(years, bands["p10"])
+        self.bound_lines[1].set_data(years, bands["p90"])
+        self.median_line.set_data(years, bands["p50"])
+        self.ax.set_title(
+            f"Simulasi Manfaat Bersih Kumulatif ({simulation['draws']} skenario, USD)", fontsize=12
+        )
+        self.ax.set_xticks(years)
+        self.ax.legend(handles=[self.band, self.median_line], loc="upper left", fontsize=9)
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def render(self, dpi, fmt="png"):
+        """Menyimpan figure ke bytes (png/svg)."""
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format=fmt, dpi=dpi)
+        return buffer.getvalue()
+
+
+class TornadoChartTemplate:
+    """Tornado chart hasil roi_sensitivity.compute_sensitivity (input paling berpengaruh di atas)."""
+
+    def __init__(self):
+        mpl = _matplotlib()
+        self.fig = mpl.Figure(figsize=(12, 5))
+        mpl.FigureCanvasAgg(self.fig)
+        self.ax = self.fig.subplots()
+        self.fig.subplots_adjust(left=0.25, right=0.95, bottom=0.12, top=0.88)
+        self.ax.grid(True, axis="x", linestyle="--", alpha=0.6)
+        self.ax.tick_params(axis="x", labelsize=10)
+        self.ax.tick_params(axis="y", labelsize=9)
+        self.ax.xaxis.set_major_formatter(mpl.FuncFormatter(lambda x, p: format_number_id(x, 0)))
+        self.base_line = self.ax.axvline(0, color="grey", linewidth=1, linestyle="--")
+        self.artists = []
+
+    def update(self, sensitivity):
+        """Menggambar ulang bar (jumlah bar bisa berubah, jadi bar lama dibuang)."""
+        for artist in self.artists:
+            artist.remove()
+        self.artists = []
+        ax = self.ax
+        base = sensitivity["base"] or 0.0
+        rows = [row for row in sensitivity["rows"] if row["low"] is not None and row["high"] is not None]
+        rows = rows[::-1]  # barh menggambar dari bawah; pengaruh terbesar di atas
+        positions = list(range(len(rows)))
+        pct = format_number_id(sensitivity["pct"], 1)
+        low_bars = ax.barh(positions, [row["low"] - base for row in rows], left=base, color=COST_COLORS[0], label=f"Input -{pct}%")
+        high_bars = ax.barh(positions, [row["high"] - base for row in rows], left=base, color=LINE_COLOR, alpha=0.8, label=f"Input +{pct}%")
+        self.artists.extend([low_bars, high_bars])
+        ax.set_yticks(positions)
+        ax.set_yticklabels([row["label"] for row in rows])
+        self.base_line.set_xdata([base, base])
+        ax.set_title(f"Sensitivitas {sensitivity['label']} terhadap Input ±{pct}%", fontsize=12)
+        self.artists.append(ax.legend(loc="lower right", fontsize=9))
+        ax.relim()
+        ax.autoscale_view()
+
+    def render(self, dpi, fmt="png"):
+        """Menyimpan figure ke bytes (png/svg)."""
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format=fmt, dpi=dpi)
+        return buffer.getvalue()
+
+
+@contextlib.contextmanager
+def _template(template_class=RoiChartTemplate):
+    """Meminjam template figure dari pool per proses; satu figure hanya dipakai satu thread sekaligus."""
+    with _templates_lock:
+        idle = _templates.setdefault(template_class, [])
+        template = idle.pop() if idle else None
+    if template is None:
+        template = template_class()
+    yield template
+    with _templates_lock:
+        if len(idle) < TEMPLATE_POOL_SIZE:
+            idle.append(template)
+
+def render_roi_chart(roi, dpi=PDF_DPI, fmt="png"):
+    """Merender grafik dari hasil skalar roi_engine.compute_roi dan mengembalikan bytes PNG/SVG."""
+    with _template() as template:
+        template.update(roi)
+        return template.render(dpi, fmt)
+
+def render_fan_chart(simulation, dpi=PDF_DPI, fmt="png"):
+    """Merender fan chart dari hasil roi_simulation.simulate_roi dan mengembalikan bytes PNG/SVG."""
+    with _template(FanChartTemplate) as template:
+        template.update(simulation)
+        return template.render(dpi, fmt)
+
+def render_tornado_chart(sensitivity, dpi=PDF_DPI, fmt="png"):
+    """Merender tornado chart dari hasil roi_sensitivity.compute_sensitivity dan mengembalikan bytes PNG/SVG."""
+    with _template(TornadoChartTemplate) as template:
+        template.update(sensitivity)
+        return template.render(dpi, fmt)
+
+def warm_up():
+    """Memuat matplotlib dan cache font-nya (dipanggil dari thread warm-up)."""
+    _matplotlib()
+    import matplotlib.font_manager
+    matplotlib.font_manager.findfont("DejaVu Sans")
+
+def chart_data_uri(chart_bytes, fmt="png"):
+    """Mengubah bytes grafik menjadi data URI untuk disisipkan ke template PDF."""
+    return f"data:{MIME_TYPES[fmt]};base64,{base64.b64encode(chart_bytes).decode()}"
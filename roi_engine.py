@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Mesin kalkulasi ROI AI Voice yang terpisah dari skrip Streamlit.
+Semua rumus dihitung dengan operasi array NumPy, sehingga satu panggilan
+`compute_roi` dapat menghitung satu prospek (nilai skalar) maupun ribuan
+skenario prospek sekaligus (array kolom atau DataFrame). Proyeksi tahunan,
+periode pengembalian, NPV dan IRR berasal dari model arus kas bulanan
+(roi_cashflow).
+"""
+import numpy as np
+
+from roi_cashflow import (
+    CASHFLOW_DEFAULTS, CASHFLOW_FIELDS, MAX_HORIZON_YEARS,
+    irr, npv, payback_months, project_cashflows,
+)
+
+# --- Konfigurasi ---
+# Urutan field mengikuti urutan input di sidebar broker_roi.py
+INPUT_FIELDS = (
+    "cs_staff",
+    "avg_monthly_salary",
+    "overhead_multiplier",
+    "usd_conversion_rate",
+    "monthly_inquiries",
+    "avg_handling_time",
+    "avg_monthly_clients",
+    "avg_monthly_client_value",
+    "current_retention_rate",
+    "implementation_cost",
+    "annual_subscription",
+    "automation_rate",
+    "staff_reduction",
+    "retention_improvement",
+    "handling_time_improvement",
+)
+
+# Nilai default sama dengan nilai awal widget di sidebar
+DEFAULT_INPUTS = {
+    "cs_staff": 10,
+    "avg_monthly_salary": 7000000,
+    "overhead_multiplier": 1.3,
+    "usd_conversion_rate": 15500,
+    "monthly_inquiries": 5000,
+    "avg_handling_time": 5.0,
+    "avg_monthly_clients": 1000,
+    "avg_monthly_client_value": 50.0,
+    "current_retention_rate": 85.0,
+    "implementation_cost": 10000.0,
+    "annual_subscription": 5000.0,
+    "automation_rate": 75,
+    "staff_reduction": 35,
+    "retention_improvement": 7.5,
+    "handling_time_improvement": 25,
+}
+
+PROJECTION_YEARS = 5  # Horizon default; metrik 3 & 5 tahun selalu dihitung
+DEFAULT_RAMP_CURVE = "linear"
+
+# Field hasil per tahun (bentuk array: [..., horizon tahun]) dan per bulan ([..., 12 * horizon + 1])
+YEARLY_FIELDS = ("costs", "benefits", "net_benefits", "cumulative_net")
+MONTHLY_FIELDS = ("monthly_benefits", "monthly_costs", "monthly_net", "monthly_cumulative")
+
+# Opsi arus kas di luar INPUT_FIELDS yang ikut diteruskan ke simulasi/grid sensitivitas
+OPTION_FIELDS = CASHFLOW_FIELDS + ("horizon_years", "ramp_curve")
+
+_DEFAULTS = {**DEFAULT_INPUTS, **CASHFLOW_DEFAULTS}
+
+
+def _as_array(inputs, field):
+    """Ambil satu kolom input sebagai array float64. Field yang hilang memakai nilai default."""
+    try:
+        value = inputs[field]
+    except KeyError:
+        value = _DEFAULTS[field]
+    return np.asarray(value, dtype=np.float64)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, (float, np.floating)) and np.isnan(value))
+
+
+def _option(inputs, key, default):
+    """Opsi yang berlaku untuk semua skenario (horizon, kurva ramp-up); sel kosong memakai default.
+    Kolom array harus bernilai sama di semua baris (kelompokkan dulu, lihat batch_proposals).
+    """
+    try:
+        values = np.asarray(inputs[key], dtype=object).ravel()
+    except KeyError:
+        return default
+    values = [value.item() if hasattr(value, "item") else value for value in values]
+    values = [default if _is_missing(value) else value for value in values]
+    if not values:
+        return default
+    if any(value != values[0] for value in values[1:]):
+        raise ValueError(f"{key} harus sama untuk semua skenario dalam satu panggilan compute_roi")
+    return values[0]
+
+
+def compute_roi(inputs, detail=True):
+    """Menghitung seluruh metrik ROI dalam satu pass vektor NumPy.
+
+    `inputs` berupa mapping (dict, DataFrame, dsb.) dari nama field di
+    INPUT_FIELDS dan CASHFLOW_FIELDS ke nilai skalar atau array. Semua kolom
+    di-broadcast bersama. `horizon_years` (1-10, default 5) dan `ramp_curve`
+    ("linear"/"s_curve") berlaku untuk semua skenario. Jika semua input
+    skalar, hasil dikembalikan sebagai skalar Python (kompatibel dengan
+    tampilan Streamlit dan template PDF), lengkap dengan `five_year_projection`
+    (satu baris per tahun horizon). Jika tidak, hasil berupa array NumPy
+    dengan field per tahun berbentuk [n, horizon] dan per bulan [n, 12 * horizon + 1].
+    `detail=False` (simulasi/grid besar) melewati iterasi IRR (diisi NaN) serta
+    monthly_benefits/monthly_costs.
+    """
+    arrays = np.broadcast_arrays(*(_as_array(inputs, f) for f in INPUT_FIELDS + CASHFLOW_FIELDS))
+    (cs_staff, avg_monthly_salary, overhead_multiplier, usd_conversion_rate,
+     monthly_inquiries, avg_handling_time, avg_monthly_clients, avg_monthly_client_value,
+     current_retention_rate, implementation_cost, annual_subscription, automation_rate,
+     staff_reduction, retention_improvement, handling_time_improvement,
+     ramp_up_months, salary_inflation, fx_drift, discount_rate) = arrays
+    horizon_years = min(max(int(_option(inputs, "horizon_years", PROJECTION_YEARS)), 1), MAX_HORIZON_YEARS)
+    ramp_curve = _option(inputs, "ramp_curve", DEFAULT_RAMP_CURVE)
+    scalar_mode = cs_staff.ndim == 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_annual_salary = avg_monthly_salary * 12
+        avg_annual_salary_usd = np.where(
+            usd_conversion_rate != 0,
+            avg_annual_salary / np.where(usd_conversion_rate != 0, usd_conversion_rate, 1),
+            0.0,
+        )
+        avg_client_value = avg_monthly_client_value * 12
+        current_annual_labor_cost_usd = cs_staff * avg_annual_salary_usd * overhead_multiplier
+        current_annual_labor_cost_idr = current_annual_labor_cost_usd * usd_conversion_rate
+        current_inquiries_per_year = monthly_inquiries * 12
+        current_handling_hours = (current_inquiries_per_year * avg_handling_time) / 60
+        automated_inquiries = current_inquiries_per_year * (automation_rate / 100)
+        remaining_manual_inquiries = current_inquiries_per_year - automated_inquiries
+        new_handling_time = avg_handling_time * (1 - handling_time_improvement / 100)
+        new_handling_hours = (remaining_manual_inquiries * new_handling_time) / 60
+        new_staff_count = np.rint(cs_staff * (1 - staff_reduction / 100))
+        # Minimal satu staf jika masih ada pertanyaan yang ditangani manual
+        new_staff_count = np.where((new_handling_hours > 0) & (new_staff_count == 0), 1.0, new_staff_count)
+        new_annual_labor_cost_usd = new_staff_count * avg_annual_salary_usd * overhead_multiplier
+        new_annual_labor_cost_idr = new_annual_labor_cost_usd * usd_conversion_rate
+        labor_savings_usd = current_annual_labor_cost_usd - new_annual_labor_cost_usd
+        labor_savings_idr = labor_savings_usd * usd_conversion_rate
+        new_retention_rate = np.minimum(100.0, current_retention_rate + retention_improvement)
+        avg_annual_clients = avg_monthly_clients
+        current_retained_clients = avg_annual_clients * (current_retention_rate / 100)
+        new_retained_clients = avg_annual_clients * (new_retention_rate / 100)
+        additional_retained_clients = new_retained_clients - current_retained_clients
+        retention_revenue_impact = additional_retained_clients * avg_client_value
+        total_annual_savings_usd = labor_savings_usd + retention_revenue_impact
+        total_annual_savings_idr = labor_savings_idr + (retention_revenue_impact * usd_conversion_rate)
+
+        # Arus kas bulanan; minimal 5 tahun agar metrik 3 & 5 tahun tetap tersedia untuk horizon pendek
+        cashflow = project_cashflows(
+            labor_savings_idr, retention_revenue_impact, usd_conversion_rate, implementation_cost,
+            annual_subscription, ramp_up_months, salary_inflation, fx_drift,
+            max(horizon_years, PROJECTION_YEARS), ramp_curve, detail,
+        )
+        first_year_net_usd = cashflow["net_benefits"][..., 0]
+        subsequent_years_net_usd = cashflow["net_benefits"][..., 1]
+        total_first_year_investment = implementation_cost + annual_subscription
+        total_three_year_investment = implementation_cost + annual_subscription * 3
+        first_year_roi = np.where(
+            total_first_year_investment > 0,
+            first_year_net_usd / total_first_year_investment * 100,
+            np.inf,
+        )
+        three_year_net_benefit = cashflow["cumulative_net"][..., 2]
+        three_year_roi = np.where(
+            total_three_year_investment > 0,
+            three_year_net_benefit / total_three_year_investment * 100,
+            np.inf,
+        )
+        monthly_savings_usd = total_annual_savings_usd / 12
+        total_investment_usd = implementation_cost + annual_subscription
+        # Bulan saat kumulatif arus kas bersih (termasuk biaya implementasi di bulan 0) menjadi >= 0
+        payback_period = payback_months(cashflow["monthly_cumulative"])
+        five_year_net_benefit = cashflow["cumulative_net"][..., PROJECTION_YEARS - 1]
+
+        # Hasil proyeksi, NPV & IRR dipotong sesuai horizon
+        n_months = 12 * horizon_years
+        projection = {key: cashflow[key][..., :horizon_years] for key in YEARLY_FIELDS}
+        projection.update({key: cashflow[key][..., :n_months + 1] for key in MONTHLY_FIELDS if key in cashflow})
+        npv_usd = npv(projection["monthly_net"], discount_rate)
+        irr_pct = irr(projection["monthly_net"]) if detail else np.full(npv_usd.shape, np.nan)
+
+    result = {
+        "avg_annual_salary_usd": avg_annual_salary_usd,
+        "current_annual_labor_cost_usd": current_annual_labor_cost_usd,
+        "current_annual_labor_cost_idr": current_annual_labor_cost_idr,
+        "current_inquiries_per_year": current_inquiries_per_year,
+        "current_handling_hours": current_handling_hours,
+        "automated_inquiries": automated_inquiries,
+        "new_handling_hours": new_handling_hours,
+        "new_staff_count": new_staff_count.astype(np.int64),
+        "new_annual_labor_cost_usd": new_annual_labor_cost_usd,
+        "new_annual_labor_cost_idr": new_annual_labor_cost_idr,
+        "labor_savings_usd": labor_savings_usd,
+        "labor_savings_idr": labor_savings_idr,
+        "new_retention_rate": new_retention_rate,
+        "retention_revenue_impact": retention_revenue_impact,
+        "total_annual_savings_usd": total_annual_savings_usd,
+        "total_annual_savings_idr": total_annual_savings_idr,
+        "first_year_net_usd": first_year_net_usd,
+        "subsequent_years_net_usd": subsequent_years_net_usd,
+        "first_year_roi": first_year_roi,
+        "three_year_roi": three_year_roi,
+        "monthly_savings_usd": monthly_savings_usd,
+        "total_investment_usd": total_investment_usd,
+        "payback_period": payback_period,
+        "five_year_net_benefit": five_year_net_benefit,
+        "horizon_net_benefit": projection["cumulative_net"][..., -1],
+        "npv": npv_usd,
+        "irr": irr_pct,
+        **projection,
+    }
+
+    if not scalar_mode:
+        return result
+    return _to_scalar_result(result)
+
+
+def _to_scalar_result(result):
+    """Mengubah hasil array 0-dimensi menjadi nilai Python biasa beserta tabel proyeksi."""
+    scalar_result = {}
+    for key, value in result.items():
+        scalar_result[key] = value.tolist() if key in YEARLY_FIELDS or key in MONTHLY_FIELDS else value.item()
+    scalar_result["years"] = list(range(1, len(scalar_result["costs"]) + 1))
+    scalar_result["five_year_projection"] = projection_rows(scalar_result)
+    return scalar_result
+
+
+def result_row(result, index):
+    """Mengambil hasil satu skenario dari hasil batch `compute_roi` dalam bentuk skalar."""
+    return _to_scalar_result({key: np.asarray(value[index]) for key, value in result.items()})
+
+
+def projection_rows(result):
+    """Menyusun baris tabel proyeksi (format `five_year_projection` di template.html) dari hasil skalar."""
+    rows = []
+    for i, year in enumerate(result["years"]):
+        rows.append({
+            "year": year,
+            "cost": result["costs"][i],
+            "benefit": result["benefits"][i],
+            "net_benefit": result["net_benefits"][i],
+            "cumulative_net": result["cumulative_net"][i],
+        })
+    return rows
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Analisis sensitivitas (tornado) satu-per-satu atas 15 input sidebar.
+Setiap input digeser -X% dan +X% sementara input lain tetap, lalu seluruh
+2 x 15 skenario (ditambah skenario dasar) dihitung sebagai satu grid batch
+roi_engine.compute_roi. Grid di-memo per set input dasar dan persentase.
+"""
+import functools
+
+import numpy as np
+
+from roi_engine import INPUT_FIELDS, OPTION_FIELDS, compute_roi
+
+# --- Konfigurasi ---
+DEFAULT_PERTURBATION_PCT = 10.0
+
+# Label singkat per input (mengikuti label sidebar)
+FIELD_LABELS = {
+    "cs_staff": "Jumlah staf CS",
+    "avg_monthly_salary": "Gaji bulanan/staf",
+    "overhead_multiplier": "Pengali overhead",
+    "usd_conversion_rate": "Kurs IDR ke USD",
+    "monthly_inquiries": "Pertanyaan/bulan",
+    "avg_handling_time": "Waktu penanganan",
+    "avg_monthly_clients": "Klien aktif/bulan",
+    "avg_monthly_client_value": "Pendapatan/klien/bulan",
+    "current_retention_rate": "Loyalitas klien saat ini",
+    "implementation_cost": "Biaya implementasi",
+    "annual_subscription": "Biaya langganan tahunan",
+    "automation_rate": "Otomatisasi pertanyaan",
+    "staff_reduction": "Pengurangan staf CS",
+    "retention_improvement": "Peningkatan loyalitas",
+    "handling_time_improvement": "Peningkatan waktu penanganan",
+}
+
+# Metrik yang dapat dianalisis: key hasil compute_roi -> label
+SENSITIVITY_METRICS = {
+    "first_year_roi": "ROI Tahun Pertama (%)",
+    "five_year_net_benefit": "Manfaat Bersih 5 Tahun (USD)",
+    "payback_period": "Periode Pengembalian (bulan)",
+}
+
+# Batas nilai input setelah digeser (persentase tidak boleh keluar 0-100)
+FIELD_BOUNDS = {
+    "cs_staff": (1, None),
+    "overhead_multiplier": (1.0, None),
+    "current_retention_rate": (0.0, 100.0),
+    "automation_rate": (0.0, 100.0),
+    "staff_reduction": (0.0, 100.0),
+    "retention_improvement": (0.0, 100.0),
+    "handling_time_improvement": (0.0, 100.0),
+}
+
+
+def build_grid(base_inputs, pct=DEFAULT_PERTURBATION_PCT):
+    """Input grid untuk compute_roi: baris 0 = dasar, baris 1+2i / 2+2i = field i digeser -pct / +pct."""
+    base = np.array([float(base_inputs[f]) for f in INPUT_FIELDS])
+    n_fields = len(INPUT_FIELDS)
+    grid = np.tile(base, (1 + 2 * n_fields, 1))
+    field_index = np.arange(n_fields)
+    grid[1 + 2 * field_index, field_index] = base * (1 - pct / 100)
+    grid[2 + 2 * field_index, field_index] = base * (1 + pct / 100)
+    for i, field in enumerate(INPUT_FIELDS):
+        low, high = FIELD_BOUNDS.get(field, (0.0, None))
+        grid[:, i] = np.clip(grid[:, i], low, high)
+    return {field: grid[:, i] for i, field in enumerate(INPUT_FIELDS)}
+
+
+@functools.lru_cache(maxsize=128)
+def _grid_results(base_items, pct, option_items=()):
+    """Hasil metrik sensitivitas untuk grid (di-memo; array read-only).
+    `option_items` = opsi arus kas (OPTION_FIELDS) yang sama untuk seluruh baris grid."""
+    grid = build_grid(dict(base_items), pct)
+    result = compute_roi({**grid, **dict(option_items)}, detail=False)
+    outputs = {"inputs": np.column_stack([grid[f] for f in INPUT_FIELDS])}
+    outputs.update({metric: result[metric] for metric in SENSITIVITY_METRICS})
+    for array in outputs.values():
+        array.setflags(write=False)
+    return outputs
+
+
+def compute_sensitivity(base_inputs, pct=DEFAULT_PERTURBATION_PCT, metric="first_year_roi"):
+    """Dampak pergeseran setiap input terhadap `metric`, diurutkan dari yang paling besar.
+
+    Return dict berisi `metric`, `label`, `pct`, `base` (nilai metrik dasar) dan
+    `rows`: list {field, label, low_input, high_input, low, high, swing} dengan
+    low/high = nilai metrik saat input digeser -pct/+pct. Nilai tak hingga
+    (mis. payback tidak tercapai) dijadikan None dan swing-nya dianggap 0.
+    """
+    base_items = tuple((f, float(base_inputs[f])) for f in INPUT_FIELDS)
+    option_items = tuple((f, base_inputs[f]) for f in OPTION_FIELDS if f in base_inputs)
+    outputs = _grid_results(base_items, float(pct), option_items)
+    values = outputs[metric]
+    inputs = outputs["inputs"]
+
+    def _finite(value):
+        return float(value) if np.isfinite(value) else None
+
+    rows = []
+    for i, field in enumerate(INPUT_FIELDS):
+        low, high = _finite(values[1 + 2 * i]), _finite(values[2 + 2 * i])
+        base = _finite(values[0])
+        swing = abs(high - low) if None not in (low, high, base) else 0.0
+        rows.append({
+            "field": field,
+            "label": FIELD_LABELS[field],
+            "low_input": float(inputs[1 + 2 * i, i]),
+            "high_input": float(inputs[2 + 2 * i, i]),
+            "low": low,
+            "high": high,
+            "swing": swing,
+        })
+    rows.sort(key=lambda row: row["swing"], reverse=True)
+    return {
+        "metric": metric,
+        "label": SENSITIVITY_METRICS[metric],
+        "pct": float(pct),
+        "base": _finite(values[0]),
+        "rows": rows,
+    }
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Simulasi Monte Carlo atas asumsi dampak solusi AI Voice.
+Asumsi (otomatisasi, pengurangan staf, peningkatan loyalitas, peningkatan
+waktu penanganan) dan kurs diambil acak dari rentang yang ditentukan
+pengguna, lalu draw dihitung per blok SIMULATION_CHUNK dengan pass vektor
+roi_engine.compute_roi (matriks arus kas bulanan tidak pernah dibuat untuk
+seluruh draw sekaligus). Hasilnya berupa persentil P10/P50/P90.
+"""
+import numpy as np
+
+from roi_engine import compute_roi
+
+# --- Konfigurasi ---
+DEFAULT_DRAWS = 100_000
+SIMULATION_CHUNK = 10_000  # Draw per pass compute_roi (membatasi memori matriks bulanan)
+DEFAULT_SEED = 2024  # Seed tetap: input sama -> persentil sama (ramah cache PDF)
+PERCENTILES = (10, 50, 90)
+DISTRIBUTIONS = ("triangular", "uniform")
+
+# Field yang disimulasikan dan rentang default (batas bawah, batas atas)
+SIMULATED_FIELDS = (
+    "automation_rate",
+    "staff_reduction",
+    "retention_improvement",
+    "handling_time_improvement",
+    "usd_conversion_rate",
+)
+
+DEFAULT_RANGES = {
+    "automation_rate": (50.0, 90.0),
+    "staff_reduction": (20.0, 45.0),
+    "retention_improvement": (2.5, 10.0),
+    "handling_time_improvement": (10.0, 40.0),
+    "usd_conversion_rate": (15000.0, 16500.0),
+}
+
+# Metrik ringkasan: (key hasil compute_roi, label)
+SUMMARY_METRICS = (
+    ("first_year_roi", "ROI Tahun Pertama (%)"),
+    ("payback_period", "Periode Pengembalian (bulan)"),
+    ("five_year_net_benefit", "Manfaat Bersih 5 Tahun (USD)"),
+)
+
+
+def sample_field(rng, low, high, mode, draws, distribution="triangular"):
+    """Mengambil `draws` sampel satu asumsi. Mode triangular = nilai titik dari sidebar."""
+    low, high = float(min(low, high)), float(max(low, high))
+    if low == high:
+        return np.full(draws, low)
+    if distribution == "uniform":
+        return rng.uniform(low, high, draws)
+    if distribution != "triangular":
+        raise ValueError(f"Distribusi tidak dikenal: {distribution}")
+    return rng.triangular(low, min(max(float(mode), low), high), high, draws)
+
+
+def sample_inputs(base_inputs, ranges=None, draws=DEFAULT_DRAWS, distribution="triangular", seed=DEFAULT_SEED):
+    """Input compute_roi dengan field SIMULATED_FIELDS berupa array sampel; field lain tetap skalar."""
+    ranges = {**DEFAULT_RANGES, **(ranges or {})}
+    rng = np.random.default_rng(seed)
+    inputs = dict(base_inputs)
+    for field in SIMULATED_FIELDS:
+        low, high = ranges[field]
+        inputs[field] = sample_field(rng, low, high, base_inputs[field], draws, distribution)
+    return inputs
+
+
+def simulate_roi(base_inputs, ranges=None, draws=DEFAULT_DRAWS, distribution="triangular", seed=DEFAULT_SEED):
+    """Menjalankan simulasi dan mengembalikan ringkasan persentil.
+
+    Return dict berisi `draws`, `distribution`, `ranges`, `percentiles`,
+    `summary` ({metrik: {"p10":.., "p50":.., "p90":..}}), `years`,
+    `cumulative_net_bands` ({"p10": [...], ...} per tahun, untuk fan chart)
+    dan `probability_positive_first_year` (porsi draw dengan ROI tahun pertama > 0).
+    Semua nilai berupa float Python agar mudah di-hash/disimpan.
+    """
+    ranges = {**DEFAULT_RANGES, **(ranges or {})}
+    inputs = sample_inputs(base_inputs, ranges, draws, distribution, seed)
+    samples = {key: [] for key, _ in SUMMARY_METRICS}
+    samples["cumulative_net"] = []
+    for start in range(0, draws, SIMULATION_CHUNK):
+        chunk = {key: value[start:start + SIMULATION_CHUNK] if key in SIMULATED_FIELDS else value
+                 for key, value in inputs.items()}
+        chunk_result = compute_roi(chunk, detail=False)  # IRR & matriks bulanan tidak diringkas
+        for key, values in samples.items():
+            values.append(chunk_result[key])
+    result = {key: np.concatenate(values) for key, values in samples.items()}
+    labels = [f"p{p}" for p in PERCENTILES]
+    # method="nearest" agar draw payback tak hingga tidak menghasilkan NaN saat interpolasi
+    summary = {}
+    for key, _ in SUMMARY_METRICS:
+        values = np.percentile(result[key], PERCENTILES, method="nearest")
+        summary[key] = dict(zip(labels, values.tolist()))
+    bands = np.percentile(result["cumulative_net"], PERCENTILES, axis=0, method="nearest")
+    return {
+        "draws": int(draws),
+        "distribution": distribution,
+        "ranges": {field: [float(v) for v in ranges[field]] for field in SIMULATED_FIELDS},
+        "percentiles": list(PERCENTILES),
+        "summary": summary,
+        "years": list(range(1, result["cumulative_net"].shape[-1] + 1)),
+        "cumulative_net_bands": dict(zip(labels, bands.tolist())),
+        "probability_positive_first_year": float(np.mean(result["first_year_roi"] > 0)),
+    }
+
+
+def summary_rows(simulation):
+    """Baris tabel ringkasan (label, P10, P50, P90) untuk tampilan dan template PDF."""
+    rows = []
+    for key, label in SUMMARY_METRICS:
+        values = simulation["summary"][key]
+        rows.append({"metric": key, "label": label, "p10": values["p10"], "p50": values["p50"], "p90": values["p90"]})
+    return rows
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Penyimpanan skenario proposal di SQLite lokal.
+Setiap proposal disimpan lengkap (input ROI + opsi arus kas, hasil skalar dan
+proyeksi tahunan) sehingga konsultan dapat mencari skenario lama (nama
+prospek, email konsultan, nomor proposal) dan memuatnya ulang di sidebar.
+Metrik utama juga disimpan sebagai kolom agar ringkasan per wilayah/konsultan
+untuk dashboard manajemen cukup satu query GROUP BY, tanpa Sheets API.
+Nomor proposal dimiliki penulis pertamanya: simpan ulang dengan nomor yang
+sama (dari sumber mana pun) dilewati, bukan menimpa skenario lama.
+
+Contoh:
+    python scenario_store.py --by region
+    python scenario_store.py --by agent --since 2025-01-01
+"""
+import json
+import math
+import time
+import argparse
+import threading
+from datetime import datetime
+
+from storage import data_path, sqlite_connection
+from proposal_numbers import is_fallback_number
+from roi_engine import INPUT_FIELDS, OPTION_FIELDS, YEARLY_FIELDS
+from roi_cashflow import IRR_DISPLAY_MAX
+
+# --- Konfigurasi ---
+DEFAULT_DB_FILENAME = "scenario_store.sqlite3"
+SEARCH_LIMIT = 20
+ADMIN_FIELDS = ("proposal_number", "prospect_name", "prospect_location", "agent_name", "agent_email", "agent_phone")
+# Metrik yang disimpan sebagai kolom (untuk agregat); nilai tak hingga/NaN disimpan NULL
+METRIC_COLUMNS = (
+    "first_year_roi",
+    "three_year_roi",
+    "payback_period",
+    "five_year_net_benefit",
+    "npv",
+    "irr",
+    "total_annual_savings_usd",
+)
+# Pengelompokan agregat: nama -> (kolom, label)
+GROUP_BY = {
+    "region": ("prospect_location", "Wilayah"),
+    "agent": ("agent_email", "Konsultan"),
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _finite(value):
+    """Angka Python untuk kolom metrik; None jika bukan angka hingga."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _plain(value):
+    """Nilai NumPy/pandas -> tipe Python biasa agar bisa di-JSON-kan."""
+    return value.item() if hasattr(value, "item") else value
+
+
+class ScenarioStore:
+    """Riwayat skenario proposal dengan indeks pencarian dan agregat per wilayah/konsultan."""
+
+    def __init__(self, path=None):
+        self.path = path or data_path(DEFAULT_DB_FILENAME)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenarios ("
+                "proposal_number TEXT PRIMARY KEY COLLATE NOCASE, created_at REAL NOT NULL, created_date TEXT NOT NULL, "
+                "prospect_name TEXT NOT NULL COLLATE NOCASE, prospect_location TEXT NOT NULL COLLATE NOCASE, "
+                "agent_name TEXT NOT NULL, agent_email TEXT NOT NULL COLLATE NOCASE, agent_phone TEXT NOT NULL, "
+                "source TEXT NOT NULL, inputs_json TEXT NOT NULL, outputs_json TEXT NOT NULL, "
+                + ", ".join(f"{column} REAL" for column in METRIC_COLUMNS) + ")"
+            )
+            # proposal_number sudah terindeks sebagai PRIMARY KEY
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scenarios_prospect ON scenarios (prospect_name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scenarios_agent ON scenarios (agent_email, created_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scenarios_location ON scenarios (prospect_location, created_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scenarios_date ON scenarios (created_date)")
+
+    @staticmethod
+    def _row(admin, roi_inputs, roi, source, created_at):
+        inputs = {field: _plain(roi_inputs[field]) for field in INPUT_FIELDS + OPTION_FIELDS if field in roi_inputs}
+        # Matriks bulanan tidak disimpan: dihitung ulang instan dari input
+        outputs = {key: value for key, value in roi.items()
+                   if key in YEARLY_FIELDS or key == "years" or not isinstance(value, (list, tuple))}
+        return (
+            admin["proposal_number"],
+            created_at,
+            datetime.fromtimestamp(created_at).strftime("%Y-%m-%d"),
+            *(admin.get(field) or "" for field in ADMIN_FIELDS[1:]),
+            source,
+            json.dumps(inputs),
+            json.dumps(outputs),
+            *(_finite(roi.get(column)) for column in METRIC_COLUMNS),
+        )
+
+    def _insert(self, rows):
+        """Menyisipkan baris baru; nomor yang sudah ada tidak ditimpa. Return jumlah baris tersimpan."""
+        placeholders = ", ".join("?" * (len(ADMIN_FIELDS) + 5 + len(METRIC_COLUMNS)))
+        with sqlite_connection(self.path) as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO scenarios (proposal_number, created_at, created_date, "
+                "prospect_name, prospect_location, agent_name, agent_email, agent_phone, source, "
+                f"inputs_json, outputs_json, {', '.join(METRIC_COLUMNS)}) VALUES ({placeholders}) "
+                "ON CONFLICT (proposal_number) DO NOTHING",
+                rows,
+            )
+            return conn.total_changes - before
+
+    def save(self, admin, roi_inputs, roi, source="app"):
+        """Menyimpan satu proposal. `admin` minimal berisi proposal_number; `roi` = hasil skalar compute_roi.
+        Return False jika nomor sudah dipakai skenario lain atau berupa nomor placeholder (…-XXX).
+        """
+        return self.save_many([(admin, roi_inputs, roi)], source) == 1
+
+    def save_many(self, items, source="batch"):
+        """Menyimpan banyak proposal (iterable (admin, roi_inputs, roi)) dalam satu transaksi.
+        Nomor placeholder dan nomor yang sudah tersimpan dilewati. Return jumlah baris tersimpan.
+        """
+        now = time.time()
+        rows = [self._row(admin, roi_inputs, roi, source, now) for admin, roi_inputs, roi in items
+                if not is_fallback_number(admin["proposal_number"])]
+        return self._insert(rows) if rows else 0
+
+    def search(self, text="", limit=SEARCH_LIMIT):
+        """Skenario terbaru yang nama prospek, email konsultan atau nomor proposalnya diawali `text`.
+        Return list dict (tanpa input/hasil lengkap) untuk daftar pilihan.
+        """
+        columns = "proposal_number, created_date, prospect_name, prospect_location, agent_email, first_year_roi"
+        text = (text or "").strip()
+        with sqlite_connection(self.path) as conn:
+            if not text:
+                cursor = conn.execute(
+                    f"SELECT {columns} FROM scenarios ORDER BY created_date DESC, created_at DESC LIMIT ?", (limit,)
+                )
+            else:
+                # Awalan + kolom COLLATE NOCASE: LIKE memakai indeks, bukan scan tabel
+                pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                cursor = conn.execute(
+                    f"SELECT {columns} FROM scenarios WHERE prospect_name LIKE ?1 ESCAPE '\\' "
+                    f"UNION SELECT {columns} FROM scenarios WHERE agent_email LIKE ?1 ESCAPE '\\' "
+                    f"UNION SELECT {columns} FROM scenarios WHERE proposal_number LIKE ?1 ESCAPE '\\' "
+                    "ORDER BY created_date DESC, proposal_number DESC LIMIT ?2",
+                    (pattern, limit),
+                )
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def get(self, proposal_number):
+        """Skenario lengkap (admin, inputs, outputs, created_date, source), atau None."""
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(ADMIN_FIELDS)}, created_date, source, inputs_json, outputs_json "
+                "FROM scenarios WHERE proposal_number = ?",
+                (proposal_number,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "admin": dict(zip(ADMIN_FIELDS, row[:len(ADMIN_FIELDS)])),
+            "created_date": row[-4],
+            "source": row[-3],
+            "inputs": json.loads(row[-2]),
+            "outputs": json.loads(row[-1]),
+        }
+
+    def aggregate(self, by="region", since=None, until=None):
+        """Rata-rata metrik per wilayah (`by="region"`) atau konsultan (`by="agent"`).
+        `since`/`until` = tanggal "YYYY-MM-DD" (inklusif). Return list dict:
+        group, proposals, lalu avg_<metrik> untuk setiap METRIC_COLUMNS. IRR dibatasi
+        IRR_DISPLAY_MAX per baris sebelum dirata-rata agar satu outlier tidak mendominasi.
+        """
+        column, _ = GROUP_BY[by]
+        where, params = [], []
+        if since:
+            where.append("created_date >= ?")
+            params.append(since)
+        if until:
+            where.append("created_date <= ?")
+            params.append(until)
+        averages = ", ".join(
+            f"AVG(MIN(irr, {IRR_DISPLAY_MAX!r})) AS avg_irr" if metric == "irr" else f"AVG({metric}) AS avg_{metric}"
+            for metric in METRIC_COLUMNS
+        )
+        with sqlite_connection(self.path) as conn:
+            cursor = conn.execute(
+                f"SELECT {column} AS grp, COUNT(*) AS proposals, {averages} FROM scenarios "
+                + (f"WHERE {' AND '.join(where)} " if where else "")
+                + f"GROUP BY {column} ORDER BY proposals DESC, grp",
+                params,
+            )
+            names = ["group"] + [d[0] for d in cursor.description[1:]]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def get_scenario_store():
+    """Penyimpanan skenario tunggal per proses."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ScenarioStore()
+    return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ringkasan skenario proposal per wilayah atau konsultan.")
+    parser.add_argument("--by", choices=sorted(GROUP_BY), default="region")
+    parser.add_argument("--since", help="Tanggal awal YYYY-MM-DD (inklusif)")
+    parser.add_argument("--until", help="Tanggal akhir YYYY-MM-DD (inklusif)")
+    args = parser.parse_args(argv)
+
+    rows = get_scenario_store().aggregate(args.by, args.since, args.until)
+    print(f"{GROUP_BY[args.by][1]:<32} {'proposal':>8} {'ROI th-1 (%)':>13} {'payback (bln)':>14} {'NPV (USD)':>14} "
+          f"{'IRR (%)':>9}")
+    for row in rows:
+        values = [row["avg_first_year_roi"], row["avg_payback_period"], row["avg_npv"], row["avg_irr"]]
+        cells = [f"{v:>{w}.1f}" if v is not None else f"{'-':>{w}}" for v, w in zip(values, (13, 14, 14, 9))]
+        if row["avg_irr"] is not None and row["avg_irr"] >= IRR_DISPLAY_MAX:
+            cells[-1] = f"{'>' + format(IRR_DISPLAY_MAX, '.0f'):>9}"
+        print(f"{(row['group'] or '-')[:32]:<32} {row['proposals']:>8} {' '.join(cells)}")
+
+
+if __name__ == "__main__":
+    main()
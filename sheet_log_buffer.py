@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Buffer tulis-dulu (write-ahead) untuk log proposal ke Google Sheets.
+Setiap baris disimpan dulu ke SQLite lokal, lalu dikirim ke sheet
+Log Proposal dalam satu append batch setiap N baris atau T detik.
+Baris hanya dihapus setelah append berhasil, sehingga baris yang belum
+terkirim (mis. worker crash atau kuota habis) dikirim ulang saat flush berikutnya.
+Batch yang ditolak permanen (mis. 400/403/404) dipindah ke tabel dead_rows agar
+tidak menahan baris sheet lain di belakangnya.
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+
+from storage import data_path, sqlite_connection
+from google_services import build_log_row, append_log_rows, call_with_retry, is_retryable
+from metrics import timed
+
+# --- Konfigurasi ---
+DEFAULT_DB_FILENAME = "sheet_log_buffer.sqlite3"
+DEFAULT_FLUSH_ROWS = 20
+DEFAULT_FLUSH_SECONDS = 10.0
+MAX_BATCH_ROWS = 500
+# Klaim batch yang lebih tua dari ini dianggap milik proses yang crash dan boleh diambil ulang
+CLAIM_TIMEOUT_SECONDS = 300
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+class SheetLogBuffer:
+    """Antrian log proposal yang tahan crash dengan flush batch ke Google Sheets."""
+
+    def __init__(self, path=None, flush_rows=DEFAULT_FLUSH_ROWS, flush_seconds=DEFAULT_FLUSH_SECONDS, retry_options=None):
+        self.path = path or data_path(DEFAULT_DB_FILENAME)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.retry_options = retry_options or {}
+        self.last_error = None
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._service = None
+        self._services_key = None
+        self._service_factory = None
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_rows ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, sheet_id TEXT NOT NULL, "
+                "row_json TEXT NOT NULL, created_at REAL NOT NULL, "
+                "claim TEXT, claimed_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_rows ("
+                "id INTEGER PRIMARY KEY, sheet_id TEXT NOT NULL, "
+                "row_json TEXT NOT NULL, created_at REAL NOT NULL, "
+                "error TEXT NOT NULL, failed_at REAL NOT NULL)"
+            )
+
+    def set_service_factory(self, services_key, service_factory):
+        """Mengatur factory service Sheets; service dibuat ulang hanya jika services_key berubah."""
+        if services_key != self._services_key:
+            self._services_key = services_key
+            self._service_factory = service_factory
+            self._service = None
+            self._wake.set()  # Kirim baris yang tertunda (mis. sisa crash) tanpa menunggu proposal baru
+
+    def add(self, sheet_id, log_data):
+        """Menyimpan satu baris log secara durable. Flush dipicu jika antrian mencapai flush_rows."""
+        row = build_log_row(log_data)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT INTO pending_rows (sheet_id, row_json, created_at) VALUES (?, ?, ?)",
+                (sheet_id, json.dumps(row, ensure_ascii=False), time.time()),
+            )
+        if self.pending_count() >= self.flush_rows:
+            self._wake.set()
+
+    def pending_count(self):
+        with sqlite_connection(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM pending_rows").fetchone()[0]
+
+    def dead_count(self):
+        """Jumlah baris yang ditolak permanen oleh Google Sheets (tidak dikirim ulang)."""
+        with sqlite_connection(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM dead_rows").fetchone()[0]
+
+    def flush(self):
+        """Mengirim semua baris tertunda (dikelompokkan per sheet) dengan append batch.
+        Return jumlah baris yang terkirim. Error disimpan di last_error: error sementara
+        menghentikan flush (baris tetap di buffer), error permanen memindah batch itu ke
+        dead_rows lalu flush lanjut ke batch berikutnya.
+        """
+        if self._service_factory is None:
+            return 0
+        sent = 0
+        error = None
+        with self._flush_lock:
+            while True:
+                sheet_id, claim, rows = self._claim_batch()
+                if not rows:
+                    break
+                try:
+                    with timed("sheets_log"):
+                        if self._service is None:
+                            self._service = self._service_factory()
+                        call_with_retry(append_log_rows, self._service, sheet_id, rows, **self.retry_options)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    if _is_permanent(e):
+                        self._bury(claim, error)
+                        error = f"{len(rows)} baris ke sheet {sheet_id} ditolak permanen: {error}"
+                        continue
+                    with sqlite_connection(self.path) as conn:
+                        conn.execute("UPDATE pending_rows SET claim = NULL, claimed_at = NULL WHERE claim = ?", (claim,))
+                    break
+                with sqlite_connection(self.path) as conn:
+                    conn.execute("DELETE FROM pending_rows WHERE claim = ?", (claim,))
+                sent += len(rows)
+            self.last_error = error
+        return sent
+
+    def _bury(self, claim, error):
+        """Memindah batch yang diklaim ke dead_rows (satu transaksi)."""
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT INTO dead_rows (id, sheet_id, row_json, created_at, error, failed_at) "
+                "SELECT id, sheet_id, row_json, created_at, ?, ? FROM pending_rows WHERE claim = ?",
+                (error, time.time(), claim),
+            )
+            conn.execute("DELETE FROM pending_rows WHERE claim = ?", (claim,))
+
+    def _claim_batch(self):
+        """Mengklaim satu batch baris (satu sheet) secara atomik agar proses lain tidak mengirim baris yang sama."""
+        claim = f"{os.getpid()}-{uuid.uuid4().hex}"
+        now = time.time()
+        available = "(claim IS NULL OR claimed_at < ?)"
+        with sqlite_connection(self.path) as conn:
+            first = conn.execute(
+                f"SELECT sheet_id FROM pending_rows WHERE {available} ORDER BY id LIMIT 1",
+                (now - CLAIM_TIMEOUT_SECONDS,),
+            ).fetchone()
+            if first is None:
+                return None, claim, []
+            conn.execute(
+                f"UPDATE pending_rows SET claim = ?, claimed_at = ? WHERE id IN ("
+                f"SELECT id FROM pending_rows WHERE sheet_id = ? AND {available} ORDER BY id LIMIT ?)",
+                (claim, now, first[0], now - CLAIM_TIMEOUT_SECONDS, MAX_BATCH_ROWS),
+            )
+            rows = conn.execute("SELECT row_json FROM pending_rows WHERE claim = ? ORDER BY id", (claim,)).fetchall()
+        return first[0], claim, [json.loads(row_json) for (row_json,) in rows]
+
+    def start(self):
+        """Menjalankan thread flush periodik (sekali per proses)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sheet-log-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Menghentikan thread dan mencoba flush terakhir."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+def _is_permanent(error):
+    """True untuk HttpError yang tidak akan berhasil jika diulang (4xx selain 429)."""
+    from googleapiclient.errors import HttpError
+
+    return isinstance(error, HttpError) and not is_retryable(error)
+
+
+def get_sheet_log_buffer():
+    """Buffer tunggal per proses dengan thread flush yang sudah berjalan."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = SheetLogBuffer().start()
+    return _buffer
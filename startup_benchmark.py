@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark waktu import saat start aplikasi (laporan gaya `python -X importtime`).
+Modul lokal yang dimuat broker_roi.py di-import di proses Python baru, lalu
+ditampilkan total waktu import dan modul termahal. Skrip gagal (exit 1) jika
+total melebihi anggaran atau jika dependensi berat yang seharusnya dimuat
+lazy (WeasyPrint, matplotlib, Google API client, pandas, ...) ikut ter-import.
+
+Contoh:
+    python startup_benchmark.py
+    python startup_benchmark.py --budget-ms 300 --repeat 5 --with-streamlit
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# --- Konfigurasi ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modul lokal yang di-import broker_roi.py saat start
+APP_MODULES = (
+    "roi_engine",
+    "roi_simulation",
+    "roi_sensitivity",
+    "proposal_pdf",
+    "roi_charts",
+    "proposal_cache",
+    "google_services",
+    "cloud_queue",
+    "sheet_log_buffer",
+    "proposal_numbers",
+    "drive_folder_index",
+    "warmup",
+    "metrics",
+    "batch_proposals",
+    "proposal_export",
+    "scenario_store",
+    "render_pool",
+)
+
+# Dependensi yang hanya boleh dimuat saat pertama dipakai
+LAZY_MODULES = (
+    "weasyprint",
+    "matplotlib",
+    "jinja2",
+    "googleapiclient",
+    "google.oauth2",
+    "google_auth_httplib2",
+    "httplib2",
+    "pandas",
+    "pyarrow",
+    "toml",
+)
+
+DEFAULT_BUDGET_MS = float(os.environ.get("ROI_STARTUP_BUDGET_MS", "250"))
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def run_importtime(modules):
+    """Menjalankan `python -X importtime` untuk modul di proses baru. Return stderr."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=SCRIPT_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Import gagal:\n{completed.stderr[-2000:]}")
+    return completed.stderr
+
+
+def parse_importtime(output):
+    """Baris laporan importtime -> list (nama, self_ms, cumulative_ms, depth)."""
+    entries = []
+    for line in output.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, (len(indent) - 1) // 2))
+    return entries
+
+
+def summarize(entries, modules):
+    """Total waktu import modul yang diminta (tanpa startup interpreter) dan daftar modul yang ter-import."""
+    start = next(i for i, (name, _, _, depth) in enumerate(entries) if depth == 0 and name in modules)
+    measured = entries[start:]
+    total_ms = sum(cumulative for _, _, cumulative, depth in measured if depth == 0)
+    return total_ms, measured
+
+
+def loaded_lazy_modules(entries):
+    """Dependensi di LAZY_MODULES (atau submodulnya) yang ikut ter-import."""
+    names = {name for name, _, _, _ in entries}
+    return [lazy for lazy in LAZY_MODULES if any(n == lazy or n.startswith(lazy + ".") for n in names)]
+
+
+def format_report(total_ms, entries, top=15):
+    lines = [f"Total waktu import: {total_ms:.1f} ms", "", f"{'kumulatif':>10} {'self':>8}  modul"]
+    for name, self_ms, cumulative_ms, depth in sorted(entries, key=lambda e: e[2], reverse=True)[:top]:
+        lines.append(f"{cumulative_ms:>8.1f}ms {self_ms:>6.1f}ms  {'  ' * depth}{name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark waktu import saat start aplikasi ROI.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Batas total waktu import (ms).")
+    parser.add_argument("--repeat", type=int, default=3, help="Jumlah pengukuran; yang tercepat dipakai.")
+    parser.add_argument("--top", type=int, default=15, help="Jumlah modul termahal yang ditampilkan.")
+    parser.add_argument("--with-streamlit", action="store_true", help="Ikut mengukur import streamlit (sesuaikan --budget-ms).")
+    args = parser.parse_args(argv)
+
+    modules = (("streamlit",) if args.with_streamlit else ()) + APP_MODULES
+    best = None
+    for _ in range(max(1, args.repeat)):
+        entries = parse_importtime(run_importtime(modules))
+        total_ms, measured = summarize(entries, modules)
+        if best is None or total_ms < best[0]:
+            best = (total_ms, measured)
+    total_ms, measured = best
+
+    print(format_report(total_ms, measured, args.top))
+    failed = False
+    lazy_loaded = loaded_lazy_modules(measured)
+    if lazy_loaded:
+        print(f"\nGAGAL: dependensi lazy ikut ter-import saat start: {', '.join(lazy_loaded)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nGAGAL: total {total_ms:.1f} ms melebihi anggaran {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"\nOK: di bawah anggaran {args.budget_ms:.0f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Lokasi data lokal aplikasi (buffer log, counter, indeks, dsb.) dan helper SQLite.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# --- Konfigurasi ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("ROI_DATA_DIR", os.path.join(SCRIPT_DIR, "data"))
+
+
+def data_path(filename):
+    """Path file di DATA_DIR (folder dibuat jika belum ada)."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, filename)
+
+
+@contextmanager
+def sqlite_connection(path):
+    """Koneksi SQLite singkat (mode WAL) yang di-commit otomatis jika tidak ada error.
+    Koneksi baru per operasi membuatnya aman dipakai dari banyak thread/proses.
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Warm-up opsional di thread background: setelah halaman pertama tampil,
+WeasyPrint (beserta fontconfig/Pango), Jinja2 dan matplotlib dimuat lebih
+dulu sehingga klik "Buat Proposal" pertama tidak menanggung biaya import.
+Matikan dengan ROI_BACKGROUND_WARMUP=0.
+"""
+import os
+import logging
+import threading
+
+import proposal_pdf
+import roi_charts
+
+# --- Konfigurasi ---
+WARMUP_ENABLED = os.environ.get("ROI_BACKGROUND_WARMUP", "1") != "0"
+
+_started = False
+_started_lock = threading.Lock()
+_logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Memuat renderer PDF dan grafik. Kegagalan hanya dicatat (render sungguhan akan melaporkannya)."""
+    for step in (proposal_pdf.warm_up, roi_charts.warm_up):
+        try:
+            step()
+        except Exception as e:
+            _logger.warning("Warm-up %s gagal: %s", step.__module__, e)
+
+
+def start_background_warmup():
+    """Menjalankan warm_up sekali per proses di thread daemon. Return True jika thread baru dimulai."""
+    global _started
+    if not WARMUP_ENABLED or _started:
+        return False
+    with _started_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=warm_up, name="renderer-warmup", daemon=True).start()
+    return True